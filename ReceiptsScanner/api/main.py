@@ -16,6 +16,7 @@ from workers.tasks import process_receipt_task, retrain_model_task
 from data_manager.json_adapter import JSONDataAdapter
 from data_manager.s3_adapter import S3DataAdapter
 from data_manager.jobs_adapter import JobsAdapter
+from data_manager.merchant_index import create_merchant_index
 from monitoring.logging_config import get_logger
 from monitoring.metrics import (
     http_requests_total,
@@ -45,6 +46,9 @@ if STORAGE_BACKEND == "s3":
 else:
     data_adapter = JSONDataAdapter()
 
+# Corrected merchant names become the canonical names in the merchant index
+data_adapter.merchant_index = create_merchant_index(data_adapter)
+
 jobs_adapter = JobsAdapter()
 
 # Pydantic models
@@ -59,6 +63,7 @@ class ReceiptUpdate(BaseModel):
 class ReceiptResponse(BaseModel):
     id: str
     merchant_name: Optional[str]
+    merchant_id: Optional[str] = None
     receipt_date: Optional[str]
     total_amount: Optional[float]
     category: str
@@ -262,6 +267,12 @@ async def update_receipt(receipt_id: str, update_data: ReceiptUpdate):
         receipt.update(update_dict)
         receipt["corrected"] = True
         
+        # Only an edited merchant name is a merchant correction
+        if "merchant_name" in update_dict:
+            receipt["merchant_corrected"] = True
+            if data_adapter.merchant_index is not None:
+                receipt["merchant_id"] = data_adapter.merchant_index.correct(update_dict["merchant_name"])
+        
         # Save updated receipt
         data_adapter.save_receipt(receipt)
         
@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for the processing pipeline
+"""
+__version__ = "1.0.0"
@@ -0,0 +1,85 @@
+"""
+Category prediction throughput: predict per receipt vs predict_batch
+
+Trains a throwaway classifier on synthetic receipts (labels cycle through
+CATEGORIES; only speed is measured), then classifies the same texts one
+call per receipt and in batches of 1, 8, 32 and 128. Needs
+sentence-transformers and scikit-learn; the first run downloads the
+encoder.
+
+Usage:
+    python -m benchmarks.classifier_batch --count 512 --batch-sizes 1 8 32 128
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic_receipts import generate_corpus
+from ml.config import CATEGORIES
+
+
+def run_benchmark(count: int = 512, batch_sizes=(1, 8, 32, 128)) -> dict:
+    """
+    Time predict in a loop and predict_batch at several batch sizes
+
+    Args:
+        count: Receipts classified per run
+        batch_sizes: Encoder batch sizes for predict_batch
+
+    Returns:
+        dict: run name -> receipts per second
+    """
+    os.environ["MODELS_DIR"] = tempfile.mkdtemp()
+    from ml.category_classifier import CategoryClassifier
+
+    receipts = generate_corpus(count, seed=0)
+    texts = [receipt["text"] for receipt in receipts]
+    entities = [{"merchant_name": receipt["truth"]["merchant_name"], "items": receipt["truth"]["items"]}
+                for receipt in receipts]
+
+    classifier = CategoryClassifier()
+    classifier.train(texts[:256], [CATEGORIES[i % len(CATEGORIES)] for i in range(min(count, 256))])
+
+    # Warm up the encoder before timing
+    classifier.predict_batch(texts[:8], entities[:8])
+
+    results = {}
+    start = time.perf_counter()
+    single = [classifier.predict(text, entity) for text, entity in zip(texts, entities)]
+    results["predict loop"] = count / (time.perf_counter() - start)
+
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        batched = []
+        for offset in range(0, count, batch_size):
+            batched.extend(classifier.predict_batch(texts[offset:offset + batch_size],
+                                                    entities[offset:offset + batch_size],
+                                                    batch_size=batch_size))
+        results[f"predict_batch({batch_size})"] = count / (time.perf_counter() - start)
+
+        if [r["category"] for r in batched] != [r["category"] for r in single]:
+            raise AssertionError(f"Batch size {batch_size} changed predicted categories")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Category prediction batching benchmark")
+    parser.add_argument("--count", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = run_benchmark(args.count, args.batch_sizes)
+
+    baseline = results["predict loop"]
+    print(f"\nCategory prediction, {args.count} receipts:")
+    print(f"{'run':>20}{'receipts/s':>12}{'speedup':>10}")
+    for name, rate in results.items():
+        print(f"{name:>20}{rate:>12.1f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Shared helpers for benchmarks
+"""
+import glob
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+
+DEFAULT_IMAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "images")
+IMAGE_EXTENSIONS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def find_images(images_dir: str = DEFAULT_IMAGES_DIR) -> List[str]:
+    """List sample images in a directory"""
+    paths = []
+    for pattern in IMAGE_EXTENSIONS:
+        paths.extend(glob.glob(os.path.join(images_dir, pattern)))
+    
+    if not paths:
+        raise FileNotFoundError(f"No images found in {images_dir}")
+    
+    return sorted(paths)
+
+
+def measure_latency(func: Callable, inputs: list, repeat: int = 1) -> Dict[str, float]:
+    """
+    Call func on every input and summarize per-call latency
+    
+    Returns:
+        dict: mean/p50/p95 latency in milliseconds and total seconds
+    """
+    latencies = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            latencies.append((time.perf_counter() - start) * 1000)
+    
+    latencies = np.array(latencies)
+    return {
+        "calls": len(latencies),
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "total_s": float(latencies.sum() / 1000)
+    }
+
+
+def profile(func: Callable, arg) -> Dict[str, float]:
+    """
+    Run func(arg) once and record wall time and peak memory growth
+    
+    Meant to run in a fresh process: peak memory is the growth of the
+    process high-water mark (ru_maxrss), which includes OpenCV buffers.
+    The result's size is reported when it is an array.
+    """
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    result = func(arg)
+    seconds = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    stats = {
+        "seconds": seconds,
+        "peak_mb": (rss_after - rss_before) / 1024
+    }
+    if isinstance(result, np.ndarray):
+        stats["megapixels"] = result.size / 1e6
+    return stats
+
+
+def profile_isolated(func: Callable, arg) -> Dict[str, float]:
+    """Run profile() in a new single-use worker process"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        # Warm up imports in the child before measuring
+        executor.submit(np.zeros, 1).result()
+        return executor.submit(profile, func, arg).result()
@@ -0,0 +1,118 @@
+"""
+Per-receipt date extraction time: strptime format loop vs cached normalizer
+
+The legacy clean_date tried eight strptime formats and caught ValueError
+for every miss. Both versions run inside ReceiptProcessor._extract_date on
+the entity extraction sample receipts plus noisy variants whose first
+numeric candidates are not valid dates. Results must agree except where
+only the new normalizer understands the date.
+
+Usage:
+    python -m benchmarks.date_normalization --repeat 2000
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+
+import processing.receipt_processor as receipt_processor
+from benchmarks.entity_extraction import SAMPLE_RECEIPTS, _NoOCRAdapter
+from processing.patterns import _normalize_date, clean_date
+from processing.receipt_processor import ReceiptProcessor
+
+NOISY_PREFIX = "Mã GD: 32/13/2024-77\nQuầy 2024/31/12 Ca 45 Tháng 13 2023\n"
+
+LEGACY_FORMATS = [
+    '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y',
+    '%Y/%m/%d', '%Y-%m-%d',
+    '%m/%d/%Y', '%m-%d-%Y'
+]
+
+
+def legacy_clean_date(date_str: str) -> str:
+    """clean_date as it was: try each strptime format in turn"""
+    if not date_str:
+        return ""
+
+    for fmt in LEGACY_FORMATS:
+        try:
+            dt = datetime.strptime(date_str.strip(), fmt)
+            return dt.strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+
+    return date_str
+
+
+def _best_time(func, texts, repeat: int) -> float:
+    """Best wall time of running func over all texts"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(repeat: int = 2000) -> dict:
+    """
+    Time _extract_date per receipt with both date cleaners
+
+    Returns:
+        dict: text set -> microseconds per receipt (legacy, cold cache, warm cache)
+    """
+    processor = ReceiptProcessor(_NoOCRAdapter())
+    text_sets = {
+        "clean": SAMPLE_RECEIPTS,
+        "noisy": [NOISY_PREFIX + text for text in SAMPLE_RECEIPTS]
+    }
+
+    # The legacy cleaner falls back to today for "DD Tháng MM YYYY" dates
+    today = datetime.now().strftime('%Y-%m-%d')
+    results = {}
+    for name, texts in text_sets.items():
+        for text in texts:
+            receipt_processor.clean_date = legacy_clean_date
+            expected = processor._extract_date(text)
+            receipt_processor.clean_date = clean_date
+            if processor._extract_date(text) != expected and expected != today:
+                raise AssertionError(f"Date mismatch for {text[:40]!r}")
+
+        receipt_processor.clean_date = legacy_clean_date
+        legacy = _best_time(processor._extract_date, texts, repeat)
+
+        receipt_processor.clean_date = clean_date
+
+        def cold(text):
+            _normalize_date.cache_clear()
+            processor._extract_date(text)
+
+        cold_time = _best_time(cold, texts, repeat)
+        warm = _best_time(processor._extract_date, texts, repeat)
+
+        results[name] = {
+            "legacy_us": legacy / len(texts) * 1e6,
+            "cold_us": cold_time / len(texts) * 1e6,
+            "warm_us": warm / len(texts) * 1e6
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Date normalization benchmark")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run_benchmark(args.repeat)
+
+    print("\n_extract_date (µs per receipt):")
+    print(f"{'texts':>7}{'strptime':>11}{'cold':>9}{'cached':>9}")
+    for name, stats in results.items():
+        print(f"{name:>7}{stats['legacy_us']:>11.1f}{stats['cold_us']:>9.1f}{stats['warm_us']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
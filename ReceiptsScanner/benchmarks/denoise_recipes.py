@@ -0,0 +1,81 @@
+"""
+Compare adaptive denoising against always running full NLM
+
+Reports preprocessing time per image for both modes and, when Tesseract is
+available, the OCR confidence of each so recipe thresholds can be checked
+against accuracy.
+
+Usage:
+    python -m benchmarks.denoise_recipes --images-dir ../images --ocr
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import DEFAULT_IMAGES_DIR, find_images
+from processing.preprocessing import preprocess_image
+
+
+def run_benchmark(images_dir: str = DEFAULT_IMAGES_DIR, ocr: bool = False) -> list:
+    """
+    Preprocess every image with recipe=auto and recipe=nlm
+    
+    Returns:
+        list: Per-image dicts with recipe, timings and optional confidences
+    """
+    adapter = None
+    if ocr:
+        from ocr_engines.factory import create_ocr_adapter
+        adapter = create_ocr_adapter()
+    
+    rows = []
+    for path in find_images(images_dir):
+        row = {"image": path}
+        
+        for mode in ("auto", "nlm"):
+            start = time.perf_counter()
+            image, info = preprocess_image(path, recipe=mode, return_info=True)
+            row[f"{mode}_seconds"] = time.perf_counter() - start
+            
+            if mode == "auto":
+                row["recipe"] = info["recipe"]
+                row["relative_noise"] = info.get("relative_noise", 0.0)
+            
+            if adapter is not None:
+                row[f"{mode}_confidence"] = adapter.extract_text(image)["confidence"]
+        
+        rows.append(row)
+    
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive denoising benchmark")
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--ocr", action="store_true", help="Also compare OCR confidence")
+    args = parser.parse_args()
+    
+    rows = run_benchmark(args.images_dir, args.ocr)
+    
+    print(f"\n{'image':<28}{'recipe':<11}{'noise %':>8}{'auto s':>8}{'nlm s':>8}"
+          + (f"{'auto conf':>11}{'nlm conf':>10}" if args.ocr else ""))
+    for row in rows:
+        line = (f"{row['image'][-27:]:<28}{row['recipe']:<11}{row['relative_noise']:>8.2f}"
+                f"{row['auto_seconds']:>8.2f}{row['nlm_seconds']:>8.2f}")
+        if args.ocr:
+            line += f"{row['auto_confidence']:>11.3f}{row['nlm_confidence']:>10.3f}"
+        print(line)
+    
+    auto = np.array([row["auto_seconds"] for row in rows])
+    nlm = np.array([row["nlm_seconds"] for row in rows])
+    print(f"\nMedian preprocessing time: auto {np.median(auto):.3f}s, nlm {np.median(nlm):.3f}s "
+          f"({np.median(nlm) / np.median(auto):.1f}x)")
+    
+    if args.ocr:
+        print(f"Mean OCR confidence: auto {np.mean([r['auto_confidence'] for r in rows]):.3f}, "
+              f"nlm {np.mean([r['nlm_confidence'] for r in rows]):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark skew estimation: time, peak memory and angle accuracy
+
+Compares estimate_skew/deskew_image with the original minAreaRect approach,
+which builds a coordinate array over every non-zero pixel of the
+full-resolution thresholded image.
+
+Usage:
+    python -m benchmarks.deskew --images-dir ../images
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+from benchmarks.common import DEFAULT_IMAGES_DIR, find_images, profile_isolated
+from processing.preprocessing import (
+    estimate_scale, resize_to_scale, deskew_image, estimate_skew
+)
+
+
+def legacy_deskew(image: np.ndarray) -> np.ndarray:
+    """Original deskew, kept here as the benchmark baseline"""
+    coords = np.column_stack(np.where(image > 0))
+    if len(coords) < 5:
+        return image
+    
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle < -45:
+        angle = 90 + angle
+    elif angle > 45:
+        angle = angle - 90
+    
+    if abs(angle) > 0.5:
+        (h, w) = image.shape[:2]
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+        return cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC,
+                              borderMode=cv2.BORDER_REPLICATE)
+    return image
+
+
+def thresholded(path: str) -> np.ndarray:
+    """Binary working image as produced before the deskew step"""
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    gray = resize_to_scale(gray, estimate_scale(gray)[0])
+    return cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+    )
+
+
+def _load(path: str) -> np.ndarray:
+    return np.load(path)
+
+
+def _run_legacy(path: str) -> np.ndarray:
+    return legacy_deskew(_load(path))
+
+
+def _run_current(path: str) -> np.ndarray:
+    return deskew_image(_load(path))
+
+
+def angle_accuracy(path: str, angles=(-8.0, -3.0, 2.0, 6.0)) -> dict:
+    """
+    Rotate an image by known angles and measure estimation error
+    
+    Errors are relative to the estimate for the unrotated image, since
+    real photos already carry some skew of their own.
+    """
+    image = thresholded(path)
+    h, w = image.shape
+    baseline, _ = estimate_skew(image)
+    errors = []
+    for angle in angles:
+        M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        rotated = cv2.warpAffine(image, M, (w, h), borderValue=255)
+        estimated, _ = estimate_skew(rotated)
+        # The estimate is the correction, i.e. the inverse rotation
+        errors.append(abs(estimated - baseline + angle))
+    return {"mean_error": float(np.mean(errors)), "max_error": float(np.max(errors))}
+
+
+def run_benchmark(images_dir: str = DEFAULT_IMAGES_DIR, limit: int = None) -> dict:
+    """
+    Profile legacy and current deskew on each thresholded sample image
+    
+    Args:
+        images_dir: Directory with sample receipt images
+        limit: Only use the first N images
+        
+    Returns:
+        dict: Per-pipeline stats and angle accuracy of the new estimator
+    """
+    paths = find_images(images_dir)[:limit]
+    results = {"legacy": [], "current": []}
+    temp_dir = tempfile.mkdtemp()
+    
+    try:
+        for i, path in enumerate(paths):
+            # Hand the binary image to the worker process through a file
+            array_path = os.path.join(temp_dir, f"{i}.npy")
+            np.save(array_path, thresholded(path))
+            
+            results["legacy"].append(profile_isolated(_run_legacy, array_path))
+            results["current"].append(profile_isolated(_run_current, array_path))
+            os.remove(array_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    results["accuracy"] = angle_accuracy(paths[0])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deskew benchmark")
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    
+    results = run_benchmark(args.images_dir, args.limit)
+    
+    print(f"\n{'deskew':<10}{'median s':>10}{'max s':>10}{'median MB':>11}{'max MB':>10}")
+    for name in ("legacy", "current"):
+        seconds = [r["seconds"] for r in results[name]]
+        peak = [r["peak_mb"] for r in results[name]]
+        print(f"{name:<10}{np.median(seconds):>10.3f}{np.max(seconds):>10.3f}"
+              f"{np.median(peak):>11.1f}{np.max(peak):>10.1f}")
+    
+    accuracy = results["accuracy"]
+    print(f"\nAngle error on synthetic rotations: mean {accuracy['mean_error']:.2f}, "
+          f"max {accuracy['max_error']:.2f} degrees")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Encoder backends: PyTorch fp32 vs ONNX Runtime int8
+
+Trains a throwaway classifier on synthetic receipts (or uses --model-dir),
+exports its encoder with ml.encoders.export_onnx, then runs each backend in
+a fresh process so memory is measured in isolation. Reports load time,
+resident memory after load and at peak, per-receipt latency (batch size 1)
+and throughput at --batch-size, and how often the two backends agree on
+the predicted category. The embedding cache is off. Needs
+sentence-transformers, scikit-learn, onnx and onnxruntime.
+
+Usage:
+    python -m benchmarks.encoder_backends --count 256 --batch-size 32
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_receipts import generate_corpus
+from ml.config import CATEGORIES
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (Linux)"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def run_backend(backend: str, model_dir: str, count: int, batch_size: int) -> dict:
+    """
+    Load one backend and time predictions (run in a fresh process)
+    
+    Returns:
+        dict: load_s, rss_mb, peak_mb, latency_ms, per_second and categories
+    """
+    os.environ["EMBEDDING_CACHE_BACKEND"] = "none"
+    from ml.category_classifier import CategoryClassifier
+    
+    texts = [receipt["text"] for receipt in generate_corpus(count, seed=1)]
+    
+    start = time.perf_counter()
+    classifier = CategoryClassifier(model_dir=model_dir, encoder_backend=backend)
+    load_s = time.perf_counter() - start
+    rss_mb = _rss_mb()
+    
+    # Warm up before timing
+    classifier.predict_batch(texts[:8])
+    
+    start = time.perf_counter()
+    for text in texts[:64]:
+        classifier.predict_batch([text])
+    latency_ms = (time.perf_counter() - start) / min(count, 64) * 1e3
+    
+    start = time.perf_counter()
+    results = classifier.predict_batch(texts, batch_size=batch_size)
+    per_second = count / (time.perf_counter() - start)
+    
+    return {
+        "backend": classifier.encoder.backend,
+        "load_s": load_s,
+        "rss_mb": rss_mb,
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "latency_ms": latency_ms,
+        "per_second": per_second,
+        "categories": [result["category"] for result in results]
+    }
+
+
+def prepare_model(count: int = 256) -> str:
+    """Train and save a throwaway model, export its encoder; returns the model directory"""
+    os.environ["MODELS_DIR"] = tempfile.mkdtemp()
+    os.environ["EMBEDDING_CACHE_BACKEND"] = "none"
+    from ml.category_classifier import CategoryClassifier
+    from ml.encoders import export_onnx
+    
+    receipts = generate_corpus(count, seed=0)
+    classifier = CategoryClassifier(encoder_backend="torch")
+    classifier.train([receipt["text"] for receipt in receipts],
+                     [CATEGORIES[i % len(CATEGORIES)] for i in range(count)])
+    model_dir = classifier.save_model()
+    export_onnx(model_dir)
+    return model_dir
+
+
+def run_benchmark(model_dir: str = None, count: int = 256, batch_size: int = 32) -> dict:
+    """
+    Compare the torch and onnx backends, each in its own process
+    
+    Args:
+        model_dir: Model version directory with an ONNX export (default: train one)
+        count: Receipts classified per backend
+        batch_size: Encoder batch size for the throughput run
+    
+    Returns:
+        dict: backend -> stats from run_backend, plus category agreement
+    """
+    model_dir = model_dir or prepare_model()
+    
+    results = {}
+    for backend in ("torch", "onnx"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.encoder_backends", "--worker", backend,
+             "--model-dir", model_dir, "--count", str(count), "--batch-size", str(batch_size)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[backend] = json.loads(output.strip().splitlines()[-1])
+    
+    pairs = zip(results["torch"]["categories"], results["onnx"]["categories"])
+    results["agreement"] = sum(a == b for a, b in pairs) / count
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyTorch vs ONNX Runtime encoder backend")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--count", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--worker", choices=("torch", "onnx"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.model_dir, args.count, args.batch_size)))
+        return
+    
+    results = run_benchmark(args.model_dir, args.count, args.batch_size)
+    
+    print(f"\nEncoder backends, {args.count} synthetic receipts:")
+    print(f"{'backend':>8}{'load s':>8}{'RSS MB':>9}{'peak MB':>9}{'ms/receipt':>12}"
+          f"{f'receipts/s@{args.batch_size}':>16}")
+    for backend in ("torch", "onnx"):
+        stats = results[backend]
+        print(f"{stats['backend']:>8}{stats['load_s']:>8.1f}{stats['rss_mb']:>9.0f}{stats['peak_mb']:>9.0f}"
+              f"{stats['latency_ms']:>12.1f}{stats['per_second']:>16.1f}")
+    print(f"\nCategory agreement: {results['agreement']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
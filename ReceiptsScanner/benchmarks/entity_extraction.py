@@ -0,0 +1,137 @@
+"""
+Entity extraction microbenchmark: per-pattern scans vs the compiled engine
+
+The baseline engine (anchored=False) runs every pattern over the whole text,
+as the original re.search/re.finditer loops did; the default engine anchors
+keyword patterns at the hits of one keyword-trie pass. Both must produce
+identical entities.
+
+Usage:
+    python -m benchmarks.entity_extraction --repeat 200
+"""
+import argparse
+import logging
+import time
+
+from ocr_engines.base import OCRAdapter
+from processing.extraction_engine import ExtractionEngine
+from processing.receipt_processor import ReceiptProcessor
+
+SAMPLE_RECEIPTS = [
+    """SIÊU THỊ CO.OP MART XA LỘ HÀ NỘI
+191 Quang Trung, P. Hiệp Phú, Q.9, TP.HCM
+Tel: 028 3730 1234   MST: 0301175691
+HÓA ĐƠN BÁN LẺ
+Ngày: 12/03/2024 18:45   Quầy: 05
+Cà phê sữa đá        2 x 25.000
+Bánh mì thịt         1 x 20.000
+Nước suối Lavie      3 x 8.000
+Sữa tươi Vinamilk    2 x 32.000
+Cộng tiền hàng: 178.500
+Giảm giá: 8.500
+VAT 10%: 17.000
+Tổng cộng: 187.000 VNĐ
+Thanh toán: 200.000 đ
+Cảm ơn quý khách. Hẹn gặp lại!""",
+    """NHÀ HÀNG PHỐ BIỂN
+Địa chỉ: 45 Trần Phú, Nha Trang, Khánh Hòa
+ĐT: 0258 3512 777
+Ngày 05 Tháng 11 2023
+Lẩu hải sản          1 x 450.000
+Mực nướng            2 x 120.000
+Bia Sài Gòn          6 x 25.000
+Thuế: 84.000
+TỔNG: 924.000 VND
+Xin cảm ơn""",
+    """THE COFFEE HOUSE
+Store: The Coffee House Nguyen Hue
+Phone: +84 901234567
+2024-01-28 09:12
+Latte 2 x 55,000
+Croissant 1 x 35,000
+Discount: 10,000
+Tax: 14,500
+Total: 159,500 VND
+Payment: 200,000
+Thank you, visit again!""",
+    """CỬA HÀNG TIỆN LỢI CIRCLE K
+Cửa hàng: Circle K Lê Lợi
+SDT 0909 888 999
+21-07-2024
+Mì ly Modern         2 x 12.000
+Nước ngọt Pepsi      1 x 10.000
+Số tiền: 34.000
+Thanh toan: 50.000
+Receipt powered by KPOS software version 3.1"""
+]
+
+
+class _NoOCRAdapter(OCRAdapter):
+    """Placeholder adapter; the benchmark only extracts entities from text"""
+
+    def extract_text(self, image):
+        return {"text": "", "confidence": 0.0, "boxes": []}
+
+    def get_config(self):
+        return {"engine": "none"}
+
+
+def run_benchmark(repeat: int = 200, sizes=(1, 8)) -> dict:
+    """
+    Time extract_entities with both engines
+
+    Args:
+        repeat: Calls per text and engine (best run is kept)
+        sizes: Number of receipts concatenated into one text
+
+    Returns:
+        dict: size -> microseconds per call for each engine
+    """
+    baseline = ReceiptProcessor(_NoOCRAdapter(), engine=ExtractionEngine(anchored=False))
+    compiled = ReceiptProcessor(_NoOCRAdapter())
+    results = {}
+
+    for size in sizes:
+        texts = ["\n".join(SAMPLE_RECEIPTS[i:] + SAMPLE_RECEIPTS[:i]) * size
+                 for i in range(len(SAMPLE_RECEIPTS))]
+
+        for text in texts:
+            expected = baseline.extract_entities(text)
+            actual = compiled.extract_entities(text)
+            if actual != expected:
+                raise AssertionError(f"Entity mismatch: {actual} != {expected}")
+
+        timings = {}
+        for name, processor in (("baseline", baseline), ("compiled", compiled)):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for text in texts:
+                    processor.extract_entities(text)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best / len(texts) * 1e6
+
+        results[size] = timings
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entity extraction microbenchmark")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    # Keep log output out of the timings' way
+    logging.disable(logging.INFO)
+    results = run_benchmark(args.repeat, args.sizes)
+
+    print("\nextract_entities (µs per receipt text, identical output):")
+    print(f"{'receipts':>9}{'baseline':>12}{'compiled':>12}{'speedup':>10}")
+    for size, timings in results.items():
+        print(f"{size:>9}{timings['baseline']:>12.1f}{timings['compiled']:>12.1f}"
+              f"{timings['baseline'] / timings['compiled']:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Extraction throughput and field accuracy on the synthetic receipt corpus
+
+Runs ReceiptProcessor.extract_entities and the repository-root
+receipt_processor.ReceiptProcessorRefactor over the same seeded corpus
+and scores each field against the generator's ground truth. With
+--images N the first N receipts are also rendered and run end to end
+(preprocess + OCR + extraction); that needs Tesseract with Vietnamese
+traineddata.
+
+Usage:
+    python -m benchmarks.extraction_accuracy --count 2000 --seed 0
+    python -m benchmarks.extraction_accuracy --count 2000 --noise 0.02 --long-lines 0.01
+    python -m benchmarks.extraction_accuracy --count 200 --images 20
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from PIL import Image
+
+from benchmarks.entity_extraction import _NoOCRAdapter
+from benchmarks.synthetic_receipts import generate_corpus, load_font, render_receipt
+from processing.extraction_engine import fold_case
+from processing.patterns import clean_date
+from processing.receipt_processor import ReceiptProcessor
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+FIELDS = ("merchant_name", "receipt_date", "total_amount", "phone", "tax", "items")
+
+
+def _load_file(name: str, path: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_refactor_processor():
+    """
+    Import ReceiptProcessorRefactor from the repository root
+
+    The root module imports top-level `preprocessing` and
+    `ocr_engines.tesseract_adapter`, whose names clash with this package
+    (and the root `ocr_engines` is a namespace package, which always loses
+    to ours). Both are loaded from their root files for the import only,
+    then this package's modules are restored.
+    """
+    names = ("preprocessing", "ocr_engines.tesseract_adapter", "root_receipt_processor")
+    saved_modules = {name: sys.modules[name] for name in names if name in sys.modules}
+    try:
+        _load_file("preprocessing", "preprocessing.py")
+        _load_file("ocr_engines.tesseract_adapter", os.path.join("ocr_engines", "tesseract_adapter.py"))
+        module = _load_file("root_receipt_processor", "receipt_processor.py")
+    finally:
+        for name in names:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved_modules)
+    return module.ReceiptProcessorRefactor
+
+
+def _digits(value: str) -> str:
+    return re.sub(r"\D", "", value or "")
+
+
+def _name_key(value: str) -> str:
+    return "".join(ch for ch in fold_case(value or "") if ch.isalnum())
+
+
+def score_fields(predicted: Dict, truth: Dict) -> Dict[str, float]:
+    """
+    Compare normalized entities with ground truth
+
+    Phones match on the last nine digits (so +84 and 0 prefixes agree),
+    names on case- and diacritic-folded alphanumerics, and items by
+    recall of the true item names.
+
+    Returns:
+        dict: field -> score in [0, 1]
+    """
+    scores = {
+        "merchant_name": float(_name_key(predicted.get("merchant_name")) == _name_key(truth["merchant_name"])),
+        "receipt_date": float(predicted.get("receipt_date") == truth["receipt_date"]),
+        "total_amount": float(abs((predicted.get("total_amount") or 0) - truth["total_amount"]) < 0.5),
+        "phone": float(_digits(predicted.get("phone"))[-9:] == truth["phone"][-9:])
+    }
+    if "tax" in predicted:
+        scores["tax"] = float(abs((predicted["tax"] or 0) - truth["tax"]) < 0.5)
+    if "items" in predicted:
+        found = {_name_key(item) for item in predicted["items"]}
+        scores["items"] = sum(_name_key(item) in found for item in truth["items"]) / len(truth["items"])
+    return scores
+
+
+def _from_processor(entities: Dict) -> Dict:
+    return entities
+
+
+def _from_refactor(entities: Dict) -> Dict:
+    """Map ReceiptProcessorRefactor output onto ReceiptProcessor's field names"""
+    return {
+        "merchant_name": entities.get("store_name", ""),
+        "receipt_date": clean_date(entities.get("date", "")),
+        "total_amount": entities.get("total_amount", 0.0),
+        "phone": entities.get("phone", "")
+    }
+
+
+def evaluate(extract: Callable[[str], Dict], normalize: Callable[[Dict], Dict],
+             inputs: List, receipts: List[Dict]) -> Dict[str, float]:
+    """
+    Run extract over inputs once, timing it, then score against the truth
+
+    Returns:
+        dict: receipts_per_s and per-field accuracy
+    """
+    start = time.perf_counter()
+    outputs = [extract(item) for item in inputs]
+    seconds = time.perf_counter() - start
+
+    totals: Dict[str, float] = {}
+    for output, receipt in zip(outputs, receipts):
+        for field, score in score_fields(normalize(output), receipt["truth"]).items():
+            totals[field] = totals.get(field, 0.0) + score
+
+    results = {"receipts_per_s": len(inputs) / seconds if seconds else float("inf")}
+    results.update({field: total / len(receipts) for field, total in totals.items()})
+    return results
+
+
+def run_benchmark(count: int = 2000, seed: int = 0, noise: float = 0.0,
+                  long_line_rate: float = 0.0, images: int = 0, font_path: str = None) -> Dict:
+    """
+    Score both processors on a synthetic corpus
+
+    Args:
+        count: Number of synthetic receipts
+        seed: Corpus seed
+        noise: Per-character OCR noise rate
+        long_line_rate: Fraction of receipts with a pathological long line
+        images: Number of receipts to also run end to end from rendered images
+        font_path: TrueType font for rendering
+
+    Returns:
+        dict: run name -> receipts_per_s and field accuracy
+    """
+    receipts = generate_corpus(count, seed, noise=noise, long_line_rate=long_line_rate)
+    texts = [receipt["text"] for receipt in receipts]
+
+    processor = ReceiptProcessor(_NoOCRAdapter())
+    refactor = load_refactor_processor()(ocr_adapter=object())
+
+    results = {
+        "ReceiptProcessor": evaluate(processor.extract_entities, _from_processor, texts, receipts),
+        "ReceiptProcessorRefactor": evaluate(refactor.extract_entities, _from_refactor, texts, receipts)
+    }
+
+    if images:
+        results.update(_run_end_to_end(receipts[:images], font_path))
+
+    return results
+
+
+def _run_end_to_end(receipts: List[Dict], font_path: str = None) -> Dict:
+    """Render receipts to PNG and score image -> entities for both processors"""
+    from ocr_engines.factory import create_ocr_adapter
+    from processing.preprocessing import preprocess_image
+
+    font = load_font(font_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, receipt in enumerate(receipts):
+            path = os.path.join(tmp, f"synthetic-{i:06d}.png")
+            Image.fromarray(render_receipt(receipt, font, seed=i)).save(path)
+            paths.append(path)
+
+        processor = ReceiptProcessor(create_ocr_adapter())
+        refactor = load_refactor_processor()()
+
+        def scanner_pipeline(path):
+            return processor.extract_entities(processor.extract_text(preprocess_image(path))["text"])
+
+        def refactor_pipeline(path):
+            return refactor.process(path)["entities"]
+
+        return {
+            "ReceiptProcessor (image)": evaluate(scanner_pipeline, _from_processor, paths, receipts),
+            "ReceiptProcessorRefactor (image)": evaluate(refactor_pipeline, _from_refactor, paths, receipts)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extraction throughput and accuracy benchmark")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.0, help="Per-character OCR noise rate")
+    parser.add_argument("--long-lines", type=float, default=0.0,
+                        help="Fraction of receipts with a pathological long line")
+    parser.add_argument("--images", type=int, default=0,
+                        help="Also run this many receipts end to end from rendered images")
+    parser.add_argument("--font", default=None, help="TrueType font with Vietnamese glyphs")
+    args = parser.parse_args()
+
+    # Keep per-receipt log lines out of the timings
+    logging.disable(logging.INFO)
+    results = run_benchmark(args.count, args.seed, args.noise, args.long_lines,
+                            args.images, args.font)
+
+    print(f"\nSynthetic corpus: {args.count} receipts, seed {args.seed}, "
+          f"noise {args.noise}, long lines {args.long_lines}")
+    print(f"{'processor':<34}{'rcpt/s':>9}" + "".join(f"{field[:8]:>10}" for field in FIELDS))
+    for name, stats in results.items():
+        row = "".join(f"{stats[field]:>10.3f}" if field in stats else f"{'-':>10}" for field in FIELDS)
+        print(f"{name:<34}{stats['receipts_per_s']:>9.0f}{row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Keyword prior: how many receipts skip the encoder, and at what cost
+
+Runs KeywordPrior over synthetic receipts, on the raw text and on the
+merchant name + items the classifier uses when entities are extracted, and
+reports the short-circuit share, predicted categories and µs per receipt.
+With --model-dir (a trained model; needs sentence-transformers and
+scikit-learn) it also classifies the short-circuited receipts with the
+embedding model and reports agreement and the encoder time saved.
+
+Usage:
+    python -m benchmarks.keyword_prior --count 1000 --margin 0.6
+"""
+import argparse
+import logging
+import time
+from collections import Counter
+
+from benchmarks.synthetic_receipts import generate_corpus
+from ml.keyword_prior import KeywordPrior
+
+
+def run_benchmark(count: int = 1000, seed: int = 0, noise: float = 0.0, min_score: float = None,
+                  margin: float = None, model_dir: str = None) -> dict:
+    """
+    Short-circuit share, categories and time per input kind
+
+    Args:
+        count: Synthetic receipts
+        seed: Corpus seed
+        noise: Per-character OCR noise rate
+        min_score: KeywordPrior min_score override
+        margin: KeywordPrior margin override
+        model_dir: Trained model to measure agreement against
+
+    Returns:
+        dict: input kind -> share, categories, µs and (with model_dir) agreement
+    """
+    receipts = generate_corpus(count, seed, noise=noise)
+    prior = KeywordPrior(min_score=min_score, margin=margin)
+    inputs = {
+        "raw text": [receipt["text"] for receipt in receipts],
+        "entities": ["\n".join([receipt["truth"]["merchant_name"]] + receipt["truth"]["items"])
+                     for receipt in receipts]
+    }
+
+    classifier = None
+    if model_dir:
+        from ml.category_classifier import CategoryClassifier
+        classifier = CategoryClassifier(model_dir=model_dir, keyword_prior=False)
+
+    results = {}
+    for name, texts in inputs.items():
+        start = time.perf_counter()
+        decisions = [prior.classify(text) for text in texts]
+        micros = (time.perf_counter() - start) / count * 1e6
+
+        decided = [i for i, decision in enumerate(decisions) if decision is not None]
+        results[name] = {
+            "share": len(decided) / count,
+            "categories": Counter(decisions[i]["category"] for i in decided),
+            "us": micros
+        }
+
+        if classifier is not None and decided:
+            start = time.perf_counter()
+            model = classifier.predict_batch([receipts[i]["text"] for i in decided])
+            results[name]["model_ms"] = (time.perf_counter() - start) / len(decided) * 1e3
+            results[name]["agreement"] = sum(
+                result["category"] == decisions[i]["category"] for i, result in zip(decided, model)
+            ) / len(decided)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword prior short-circuit benchmark")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.0)
+    parser.add_argument("--min-score", type=float, default=None)
+    parser.add_argument("--margin", type=float, default=None)
+    parser.add_argument("--model-dir", default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = run_benchmark(args.count, args.seed, args.noise, args.min_score, args.margin, args.model_dir)
+
+    print(f"\nKeyword prior, {args.count} synthetic receipts (noise {args.noise}):")
+    for name, stats in results.items():
+        print(f"\n{name}: {stats['share']:.1%} short-circuited, {stats['us']:.0f} µs/receipt")
+        for category, n in stats["categories"].most_common():
+            print(f"  {category:<12}{n:>6}")
+        if "agreement" in stats:
+            print(f"  agreement with model: {stats['agreement']:.3f} "
+                  f"(model {stats['model_ms']:.1f} ms/receipt skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Total amount from word boxes (layout mode) vs the regex path
+
+Receipts come from the synthetic corpus with word boxes laid out like a
+thermal printer (amounts right-aligned), optionally skewed. Reports, for
+ReceiptProcessor with and without layout mode, how often the total line's
+amount was picked (compared with clean_amount of the printed total, so
+amount parsing is factored out), how often the value is right, and time
+per receipt. Then layout time against receipt length, to check that it
+grows linearly.
+
+Usage:
+    python -m benchmarks.layout_extraction --count 1000 --skew 0.01
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from benchmarks.entity_extraction import _NoOCRAdapter
+from benchmarks.synthetic_receipts import generate_corpus, load_font, receipt_boxes
+from ocr_engines.boxes import OCRBoxes
+from processing.layout_extraction import ReceiptLayout
+from processing.patterns import clean_amount
+from processing.receipt_processor import ReceiptProcessor
+
+
+def _timed(func, items) -> tuple:
+    start = time.perf_counter()
+    outputs = [func(*item) for item in items]
+    return outputs, (time.perf_counter() - start) / len(items) * 1e6
+
+
+def run_benchmark(count: int = 1000, seed: int = 0, noise: float = 0.0, skew: float = 0.0,
+                  sizes=(1, 4, 16, 64)) -> dict:
+    """
+    Score and time the total with both extraction modes
+
+    Args:
+        count: Synthetic receipts
+        seed: Corpus seed
+        noise: Per-character OCR noise rate
+        skew: Vertical drift per pixel of x in the word boxes
+        sizes: Receipts stacked into one layout for the scaling run
+
+    Returns:
+        dict: per-mode picked/value accuracy and µs per receipt, and
+            layout µs per box by size
+    """
+    receipts = generate_corpus(count, seed, noise=noise)
+    font = load_font()
+    inputs = [(receipt["text"], receipt_boxes(receipt, font, skew=skew, seed=i))
+              for i, receipt in enumerate(receipts)]
+    truth = np.array([receipt["truth"]["total_amount"] for receipt in receipts])
+    printed = np.array([clean_amount(receipt["printed_total"]) for receipt in receipts])
+
+    results = {}
+    for name, layout in (("regex", False), ("layout", True)):
+        processor = ReceiptProcessor(_NoOCRAdapter(), layout=layout)
+        entities, micros = _timed(processor.extract_entities, inputs)
+        totals = np.array([e["total_amount"] for e in entities])
+        results[name] = {
+            "picked": float(np.mean(np.abs(totals - printed) < 0.005)),
+            "value": float(np.mean(np.abs(totals - truth) < 0.5)),
+            "us": micros
+        }
+
+    # Layout alone on ever longer receipts: time per box should stay flat
+    scaling = {}
+    for size in sizes:
+        stacked = []
+        for i in range(min(count, 64)):
+            parts = [inputs[(i + k) % count][1].shifted(dy=k * 2000) for k in range(size)]
+            stacked.append((OCRBoxes.concat(parts),))
+        boxes = sum(len(item[0]) for item in stacked)
+        _, micros = _timed(lambda b: ReceiptLayout(b).find_total(), stacked)
+        scaling[size] = micros * len(stacked) / boxes
+
+    results["scaling"] = scaling
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Layout vs regex total extraction")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.0)
+    parser.add_argument("--skew", type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run_benchmark(args.count, args.seed, args.noise, args.skew)
+
+    print(f"\nTotal amount, {args.count} synthetic receipts (noise {args.noise}, skew {args.skew}):")
+    print(f"{'mode':>8}{'picked':>9}{'value':>9}{'µs/receipt':>12}")
+    for name in ("regex", "layout"):
+        stats = results[name]
+        print(f"{name:>8}{stats['picked']:>9.3f}{stats['value']:>9.3f}{stats['us']:>12.1f}")
+
+    print("\nReceiptLayout + find_total (µs per box):")
+    for size, micros in results["scaling"].items():
+        print(f"{size:>4} receipts/layout{micros:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput of sequential, batch and async OCR per engine
+
+Usage:
+    python -m benchmarks.ocr_batch --images-dir ../images --repeat 2
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import DEFAULT_IMAGES_DIR, find_images
+from ocr_engines.factory import OCR_ENGINES, create_ocr_adapter
+from processing.preprocessing import preprocess_image
+
+
+def _throughput(func, images) -> float:
+    start = time.perf_counter()
+    func(images)
+    return len(images) / (time.perf_counter() - start)
+
+
+def _sequential(adapter):
+    return lambda images: [adapter.extract_text(image) for image in images]
+
+
+def _concurrent(adapter):
+    async def gather(images):
+        return await asyncio.gather(*(adapter.extract_text_async(image) for image in images))
+    return lambda images: asyncio.run(gather(images))
+
+
+def run_benchmark(images_dir: str = DEFAULT_IMAGES_DIR, repeat: int = 1) -> dict:
+    """
+    Measure images/second for each mode and available engine
+    
+    Args:
+        images_dir: Directory with sample receipt images
+        repeat: Number of copies of the image set per run
+        
+    Returns:
+        dict: engine -> mode -> images per second
+    """
+    images = [preprocess_image(path) for path in find_images(images_dir)] * repeat
+    results = {}
+    
+    for engine in OCR_ENGINES:
+        try:
+            adapter = create_ocr_adapter(engine)
+        except ImportError as e:
+            results[engine] = {"error": str(e)}
+            continue
+        
+        # Warm up (loads traineddata for in-process engines)
+        adapter.extract_text(images[0])
+        
+        results[engine] = {
+            "sequential": _throughput(_sequential(adapter), images),
+            "batch": _throughput(adapter.extract_text_batch, images),
+            "async": _throughput(_concurrent(adapter), images)
+        }
+        adapter.close()
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR batch/async throughput")
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    
+    results = run_benchmark(args.images_dir, args.repeat)
+    
+    print("\nOCR throughput (images/s):")
+    print(f"{'engine':<12}{'sequential':>12}{'batch':>10}{'async':>10}")
+    for engine, stats in results.items():
+        if "error" in stats:
+            print(f"{engine:<12}unavailable: {stats['error']}")
+            continue
+        print(f"{engine:<12}{stats['sequential']:>12.2f}{stats['batch']:>10.2f}{stats['async']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Build time, memory and serialized size of list-of-dicts vs columnar OCR boxes
+
+Uses synthetic image_to_data output so it runs without Tesseract installed.
+
+Usage:
+    python -m benchmarks.ocr_boxes --words 300 1000 5000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from ocr_engines.boxes import OCRBoxes
+
+WORDS = ["TỔNG", "CỘNG", "THÀNH", "TIỀN", "125.000", "VNĐ", "Cà", "phê", "sữa", "x2", "HÓA", "ĐƠN"]
+
+
+def make_tesseract_data(words: int, seed: int = 0) -> dict:
+    """image_to_data DICT output with one line/paragraph row per 6 words"""
+    rng = random.Random(seed)
+    data = {key: [] for key in ("level", "left", "top", "width", "height", "conf", "text")}
+    
+    for i in range(words):
+        if i % 6 == 0:
+            # Non-word row, as Tesseract emits for lines (conf -1)
+            for key, value in (("level", 4), ("left", 0), ("top", i * 5), ("width", 800),
+                               ("height", 30), ("conf", -1), ("text", "")):
+                data[key].append(value)
+        
+        for key, value in (("level", 5), ("left", (i % 6) * 120), ("top", (i // 6) * 32),
+                           ("width", rng.randint(20, 110)), ("height", rng.randint(18, 30)),
+                           ("conf", round(rng.uniform(40, 99), 6)), ("text", rng.choice(WORDS))):
+            data[key].append(value)
+    
+    return data
+
+
+def legacy_boxes(data: dict) -> list:
+    """Per-word dict loop used before the columnar format"""
+    boxes = []
+    for i in range(len(data["text"])):
+        if int(data["conf"][i]) > 0:
+            boxes.append({
+                "text": data["text"][i],
+                "x": data["left"][i],
+                "y": data["top"][i],
+                "width": data["width"][i],
+                "height": data["height"][i],
+                "confidence": float(data["conf"][i]) / 100.0
+            })
+    return boxes
+
+
+def _best_time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _allocated(func) -> int:
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run_benchmark(word_counts=(300, 1000, 5000), repeat: int = 20) -> dict:
+    """
+    Compare both formats for several page sizes
+    
+    Args:
+        word_counts: Words per synthetic page
+        repeat: Timing repetitions (best run is kept)
+        
+    Returns:
+        dict: word count -> metric -> value
+    """
+    results = {}
+    
+    for words in word_counts:
+        data = make_tesseract_data(words)
+        dicts = legacy_boxes(data)
+        columnar = OCRBoxes.from_tesseract_data(data)
+        encoded = columnar.encode()
+        
+        results[words] = {
+            "dicts_build_ms": _best_time(lambda: legacy_boxes(data), repeat) * 1000,
+            "columnar_build_ms": _best_time(lambda: OCRBoxes.from_tesseract_data(data), repeat) * 1000,
+            "dicts_memory_kb": _allocated(lambda: legacy_boxes(data)) / 1024,
+            "columnar_memory_kb": _allocated(lambda: OCRBoxes.from_tesseract_data(data)) / 1024,
+            "dicts_json_kb": len(json.dumps(dicts, ensure_ascii=False).encode("utf-8")) / 1024,
+            "columnar_json_kb": len(json.dumps(encoded)) / 1024,
+            "dicts_json_ms": _best_time(lambda: json.loads(json.dumps(dicts, ensure_ascii=False)),
+                                        repeat) * 1000,
+            "columnar_codec_ms": _best_time(lambda: OCRBoxes.decode(columnar.encode()), repeat) * 1000
+        }
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR box representation benchmark")
+    parser.add_argument("--words", type=int, nargs="+", default=[300, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    
+    results = run_benchmark(args.words, args.repeat)
+    
+    print("\nOCR boxes: dicts / columnar")
+    print(f"{'words':>7}{'build ms':>18}{'memory KB':>20}{'JSON KB':>18}{'roundtrip ms':>18}")
+    for words, stats in results.items():
+        print(f"{words:>7}"
+              f"{stats['dicts_build_ms']:>9.2f}/{stats['columnar_build_ms']:<8.2f}"
+              f"{stats['dicts_memory_kb']:>11.1f}/{stats['columnar_memory_kb']:<8.1f}"
+              f"{stats['dicts_json_kb']:>9.1f}/{stats['columnar_json_kb']:<8.1f}"
+              f"{stats['dicts_json_ms']:>9.2f}/{stats['columnar_codec_ms']:<8.2f}")
+
+
+if __name__ == "__main__":
+    main()
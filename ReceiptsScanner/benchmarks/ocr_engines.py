@@ -0,0 +1,82 @@
+"""
+Latency comparison of OCR engines (pytesseract subprocess vs in-process tesserocr)
+
+Usage:
+    python -m benchmarks.ocr_engines --images-dir ../images --repeat 3 --threads 4
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import DEFAULT_IMAGES_DIR, find_images, measure_latency
+from ocr_engines.factory import OCR_ENGINES, create_ocr_adapter
+from processing.preprocessing import preprocess_image
+
+
+def run_benchmark(images_dir: str = DEFAULT_IMAGES_DIR, repeat: int = 1,
+                  threads: int = 1) -> dict:
+    """
+    Measure per-call OCR latency for each available engine
+    
+    Args:
+        images_dir: Directory with sample receipt images
+        repeat: Number of passes over the image set
+        threads: Concurrent callers (exercises per-thread handle pooling)
+        
+    Returns:
+        dict: Latency stats per engine
+    """
+    images = [preprocess_image(path) for path in find_images(images_dir)]
+    results = {}
+    
+    for engine in OCR_ENGINES:
+        try:
+            adapter = create_ocr_adapter(engine)
+        except ImportError as e:
+            results[engine] = {"error": str(e)}
+            continue
+        
+        # First call pays traineddata loading for in-process engines
+        cold = measure_latency(adapter.extract_text, images[:1])
+        
+        if threads > 1:
+            chunks = [images[i::threads] for i in range(threads)]
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                per_thread = list(executor.map(
+                    lambda chunk: measure_latency(adapter.extract_text, chunk, repeat),
+                    chunks
+                ))
+            stats = {
+                key: max(s[key] for s in per_thread)
+                for key in ("mean_ms", "p50_ms", "p95_ms", "total_s")
+            }
+            stats["calls"] = sum(s["calls"] for s in per_thread)
+        else:
+            stats = measure_latency(adapter.extract_text, images, repeat)
+        
+        stats["cold_ms"] = cold["mean_ms"]
+        results[engine] = stats
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR engine latency comparison")
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+    
+    results = run_benchmark(args.images_dir, args.repeat, args.threads)
+    
+    print("\nOCR Engine Latency:")
+    print(f"{'engine':<12}{'cold':>10}{'mean':>10}{'p50':>10}{'p95':>10}")
+    for engine, stats in results.items():
+        if "error" in stats:
+            print(f"{engine:<12}unavailable: {stats['error']}")
+            continue
+        print(f"{engine:<12}{stats['cold_ms']:>9.1f}ms{stats['mean_ms']:>8.1f}ms"
+              f"{stats['p50_ms']:>8.1f}ms{stats['p95_ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
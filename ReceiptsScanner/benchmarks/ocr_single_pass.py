@@ -0,0 +1,72 @@
+"""
+Benchmark single-pass vs two-pass Tesseract OCR on the sample images
+
+Usage:
+    python -m benchmarks.ocr_single_pass --images-dir ../images --repeat 3
+"""
+import argparse
+
+from benchmarks.common import DEFAULT_IMAGES_DIR, find_images, measure_latency
+from ocr_engines.tesseract_adapter import TesseractOCRAdapter
+from processing.preprocessing import preprocess_image
+
+
+def run_benchmark(images_dir: str = DEFAULT_IMAGES_DIR, repeat: int = 1) -> dict:
+    """
+    Compare single-pass and two-pass OCR
+    
+    Args:
+        images_dir: Directory with sample receipt images
+        repeat: Number of passes over the image set
+        
+    Returns:
+        dict: Timings and speedup
+    """
+    # Preprocess once so only OCR time is measured
+    images = [preprocess_image(path) for path in find_images(images_dir)]
+    
+    two_pass = TesseractOCRAdapter(single_pass=False)
+    single_pass = TesseractOCRAdapter(single_pass=True)
+    
+    # Warm up traineddata / page cache
+    single_pass.extract_text(images[0])
+    
+    two_pass_stats = measure_latency(two_pass.extract_text, images, repeat)
+    single_pass_stats = measure_latency(single_pass.extract_text, images, repeat)
+    
+    # Check that both modes agree on the recognized words
+    mismatches = 0
+    for image in images:
+        a = two_pass.extract_text(image)["text"].split()
+        b = single_pass.extract_text(image)["text"].split()
+        if a != b:
+            mismatches += 1
+    
+    return {
+        "images": len(images),
+        "repeat": repeat,
+        "two_pass": two_pass_stats,
+        "single_pass": single_pass_stats,
+        "speedup": two_pass_stats["total_s"] / single_pass_stats["total_s"],
+        "text_mismatches": mismatches
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-pass OCR benchmark")
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    
+    result = run_benchmark(args.images_dir, args.repeat)
+    
+    print("\nSingle-pass OCR Benchmark:")
+    print(f"Images: {result['images']} x {result['repeat']}")
+    print(f"Two-pass:    {result['two_pass']['mean_ms']:.1f} ms/image")
+    print(f"Single-pass: {result['single_pass']['mean_ms']:.1f} ms/image")
+    print(f"Speedup:     {result['speedup']:.2f}x")
+    print(f"Text mismatches (word level): {result['text_mismatches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark line-strip parallel OCR on tall receipt images
+
+Sample images are preprocessed and stacked vertically to emulate a long
+supermarket receipt.
+
+Usage:
+    python -m benchmarks.ocr_strips --images-dir ../images --height 12000 --workers 4
+"""
+import argparse
+import os
+
+import numpy as np
+
+from benchmarks.common import DEFAULT_IMAGES_DIR, find_images, measure_latency
+from ocr_engines.factory import create_ocr_adapter
+from ocr_engines.strip_adapter import StripOCRAdapter, find_band_cuts
+from processing.preprocessing import preprocess_image
+
+
+def build_tall_image(images_dir: str, min_height: int) -> np.ndarray:
+    """Stack preprocessed sample images until the page is min_height tall"""
+    images = [preprocess_image(path) for path in find_images(images_dir)]
+    width = max(image.shape[1] for image in images)
+    
+    parts = []
+    height = 0
+    while height < min_height:
+        for image in images:
+            padded = np.full((image.shape[0], width), 255, dtype=np.uint8)
+            padded[:, :image.shape[1]] = image
+            parts.append(padded)
+            height += image.shape[0]
+            if height >= min_height:
+                break
+    
+    return np.vstack(parts)
+
+
+def run_benchmark(images_dir: str = DEFAULT_IMAGES_DIR, height: int = 12000,
+                  workers: int = None, engine: str = None, repeat: int = 1) -> dict:
+    """
+    Compare whole-page OCR with strip-parallel OCR
+    
+    Returns:
+        dict: Latency stats for both modes and the band layout
+    """
+    workers = workers or os.cpu_count() or 1
+    image = build_tall_image(images_dir, height)
+    
+    base = create_ocr_adapter(engine, strips=False)
+    strips = StripOCRAdapter(base, workers=workers)
+    
+    try:
+        serial = measure_latency(base.extract_text, [image], repeat)
+        parallel = measure_latency(strips.extract_text, [image], repeat)
+        bands = find_band_cuts(image, max(strips.band_height, -(-image.shape[0] // workers)))
+    finally:
+        strips.close()
+    
+    return {
+        "shape": image.shape,
+        "workers": workers,
+        "bands": len(bands),
+        "serial": serial,
+        "parallel": parallel,
+        "speedup": serial["mean_ms"] / parallel["mean_ms"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strip-parallel OCR benchmark")
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--height", type=int, default=12000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--engine", default=None)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    
+    result = run_benchmark(args.images_dir, args.height, args.workers, args.engine, args.repeat)
+    
+    print("\nStrip OCR Benchmark:")
+    print(f"Image: {result['shape']}, workers: {result['workers']}, bands: {result['bands']}")
+    print(f"Whole page: {result['serial']['mean_ms']:.0f} ms")
+    print(f"Strips:     {result['parallel']['mean_ms']:.0f} ms")
+    print(f"Speedup:    {result['speedup']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
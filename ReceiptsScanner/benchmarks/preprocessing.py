@@ -0,0 +1,74 @@
+"""
+Benchmark receipt preprocessing: time, peak memory and output size per image
+
+Compares the current pipeline with the original one (denoise at capture
+resolution, then a blind 300/72 upscale after thresholding), and with the
+current pipeline when reduced-resolution decoding is disabled.
+
+Usage:
+    python -m benchmarks.preprocessing --images-dir ../images --limit 5
+"""
+import argparse
+from functools import partial
+
+import cv2
+import numpy as np
+
+from benchmarks.common import DEFAULT_IMAGES_DIR, find_images, profile_isolated
+from benchmarks.deskew import legacy_deskew
+from processing.preprocessing import preprocess_image, resize_to_dpi, enhance_contrast
+
+
+def legacy_preprocess(image_path: str) -> np.ndarray:
+    """Original pipeline, kept here as the benchmark baseline"""
+    gray = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2GRAY)
+    denoised = cv2.fastNlMeansDenoising(gray, None, h=10, templateWindowSize=7, searchWindowSize=21)
+    thresh = cv2.adaptiveThreshold(
+        denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+    )
+    return enhance_contrast(resize_to_dpi(legacy_deskew(thresh), target_dpi=300))
+
+
+def run_benchmark(images_dir: str = DEFAULT_IMAGES_DIR, limit: int = None,
+                  pipelines: dict = None) -> dict:
+    """
+    Profile each pipeline on every sample image
+    
+    Returns:
+        dict: pipeline name -> list of per-image stats
+    """
+    paths = find_images(images_dir)[:limit]
+    pipelines = pipelines or {
+        "legacy": legacy_preprocess,
+        "full-decode": partial(preprocess_image, reduced_decode=False),
+        "current": preprocess_image
+    }
+    
+    return {
+        name: [dict(profile_isolated(func, path), image=path) for path in paths]
+        for name, func in pipelines.items()
+    }
+
+
+def summarize(results: dict):
+    """Print median time / memory / output size per pipeline"""
+    print(f"\n{'pipeline':<12}{'median s':>10}{'p95 s':>10}{'peak MB':>10}{'out MP':>10}")
+    for name, stats in results.items():
+        seconds = np.array([s["seconds"] for s in stats])
+        peak = np.array([s["peak_mb"] for s in stats])
+        megapixels = np.array([s["megapixels"] for s in stats])
+        print(f"{name:<12}{np.median(seconds):>10.3f}{np.percentile(seconds, 95):>10.3f}"
+              f"{np.median(peak):>10.1f}{np.median(megapixels):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocessing benchmark")
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    
+    summarize(run_benchmark(args.images_dir, args.limit))
+
+
+if __name__ == "__main__":
+    main()
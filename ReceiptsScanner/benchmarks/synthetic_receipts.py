@@ -0,0 +1,392 @@
+"""
+Seeded synthetic receipt corpus with ground-truth entities
+
+Receipts mix Vietnamese and English layouts, several date and amount
+formats, item lines, OCR-style character noise and optional pathological
+long lines. The same seed always yields the same corpus, so extraction
+throughput and accuracy can be compared across commits. receipt_boxes lays
+the words out as OCR word boxes, and render_receipt draws them with PIL for
+end-to-end (OCR + extraction) runs.
+
+Usage:
+    python -m benchmarks.synthetic_receipts --count 1000 --seed 0 --out /tmp/receipts
+    python -m benchmarks.synthetic_receipts --count 50 --out /tmp/receipts --images
+"""
+import argparse
+import json
+import os
+import random
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr_engines.boxes import OCRBoxes
+
+# Font with Vietnamese glyphs; override with --font on systems without it
+DEFAULT_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+MERCHANTS = [
+    ("SIÊU THỊ CO.OP MART", "vi"),
+    ("CỬA HÀNG TIỆN LỢI CIRCLE K", "vi"),
+    ("NHÀ HÀNG PHỐ BIỂN", "vi"),
+    ("BÁCH HÓA XANH", "vi"),
+    ("NHÀ THUỐC LONG CHÂU", "vi"),
+    ("QUÁN PHỞ HÙNG", "vi"),
+    ("THE COFFEE HOUSE", "en"),
+    ("HIGHLANDS COFFEE", "en"),
+    ("LOTTE MART", "en"),
+    ("GS25 CONVENIENCE", "en"),
+    ("PIZZA 4P'S", "en"),
+    ("GUARDIAN PHARMACY", "en")
+]
+
+STREETS = ["Trần Phú", "Lê Lợi", "Nguyễn Huệ", "Quang Trung", "Hai Bà Trưng",
+           "Lý Thường Kiệt", "Điện Biên Phủ", "Võ Văn Tần"]
+CITIES = ["TP.HCM", "Hà Nội", "Đà Nẵng", "Nha Trang", "Cần Thơ", "Huế"]
+
+ITEMS = [
+    ("Cà phê sữa đá", 25000), ("Bánh mì thịt", 20000), ("Nước suối Lavie", 8000),
+    ("Sữa tươi Vinamilk", 32000), ("Mì ly Modern", 12000), ("Bia Sài Gòn", 25000),
+    ("Phở bò tái", 55000), ("Trà đào cam sả", 45000), ("Mực nướng", 120000),
+    ("Latte", 55000), ("Croissant", 35000), ("Green tea", 39000),
+    ("Paracetamol 500mg", 15000), ("Shampoo Clear", 89000), ("Pepsi can", 10000)
+]
+
+LABELS = {
+    "vi": {
+        "title": ["HÓA ĐƠN BÁN LẺ", "PHIẾU THANH TOÁN", "HÓA ĐƠN GTGT"],
+        "address": "Địa chỉ:",
+        "phone": ["ĐT:", "SĐT:", "Điện thoại:"],
+        "date": ["Ngày:", "Ngày bán:", "Ngày"],
+        "subtotal": "Cộng tiền hàng:",
+        "discount": "Giảm giá:",
+        "tax": ["VAT 10%:", "Thuế:", "Thuế GTGT:"],
+        "total": ["Tổng cộng:", "TỔNG:", "Thành tiền:"],
+        "paid": "Tiền khách đưa:",
+        "footer": "Cảm ơn quý khách. Hẹn gặp lại!"
+    },
+    "en": {
+        "title": ["SALES RECEIPT", "INVOICE", "RECEIPT"],
+        "address": "Address:",
+        "phone": ["Tel:", "Phone:", "Hotline:"],
+        "date": ["Date:", "Date"],
+        "subtotal": "Subtotal:",
+        "discount": "Discount:",
+        "tax": ["Tax:", "VAT:"],
+        "total": ["Total:", "TOTAL:", "Grand total:"],
+        "paid": "Cash:",
+        "footer": "Thank you, visit again!"
+    }
+}
+
+CURRENCIES = ["", " VNĐ", " VND", " đ"]
+
+# Characters OCR commonly confuses on thermal receipts
+OCR_CONFUSIONS = {
+    "0": "O", "O": "0", "1": "l", "l": "1", "5": "S", "S": "5", "8": "B",
+    "B": "8", "ơ": "o", "ư": "u", "ă": "a", "â": "a", "ê": "e", "ô": "o",
+    "đ": "d", "Đ": "D", ".": ",", ",": "."
+}
+
+# Amount (and currency) printed against the right edge
+TRAILING_AMOUNT = re.compile(r'(?:(?<=:\s)|(?<=\s\s)|(?<=\sx\s))\d[\d.,]*(?:\s*(?:VNĐ|VND|đ))?\s*$')
+
+PATHOLOGICAL_LINES = [
+    lambda rng, n: "1." * n,
+    lambda rng, n: "=" * n,
+    lambda rng, n: "".join(rng.choice("0123456789 .,/-") for _ in range(n)),
+    lambda rng, n: "Tổng " * (n // 5)
+]
+
+
+def format_amount(value: int, style: str) -> str:
+    """Format a whole VND amount as 187.000, 187,000 or 187000"""
+    if style == "plain":
+        return str(value)
+    grouped = f"{value:,}"
+    return grouped.replace(",", ".") if style == "dot" else grouped
+
+
+def format_date(day: date, style: str) -> str:
+    """Format a date in one of the layouts seen on Vietnamese receipts"""
+    if style == "dmy_slash":
+        return day.strftime("%d/%m/%Y")
+    if style == "dmy_dash":
+        return day.strftime("%d-%m-%Y")
+    if style == "iso":
+        return day.strftime("%Y-%m-%d")
+    if style == "thang":
+        return f"{day.day:02d} Tháng {day.month:02d} {day.year}"
+    return day.strftime("%d/%m/%y")
+
+
+def make_phone(rng: random.Random) -> Tuple[str, str]:
+    """Return (printed, digits) for a landline, mobile or +84 number"""
+    kind = rng.choice(("landline", "mobile", "intl"))
+    if kind == "landline":
+        digits = f"02{rng.randint(10, 99)}{rng.randint(1000000, 9999999)}"
+        printed = f"{digits[:4]} {digits[4:8]} {digits[8:]}"
+    elif kind == "mobile":
+        digits = f"09{rng.randint(10000000, 99999999)}"
+        printed = f"{digits[:4]} {digits[4:7]} {digits[7:]}"
+    else:
+        digits = f"09{rng.randint(10000000, 99999999)}"
+        printed = f"+84 {digits[1:]}"
+    return printed, digits
+
+
+def add_ocr_noise(line: str, rng: random.Random, rate: float) -> str:
+    """Swap, drop or split characters the way a weak OCR pass would"""
+    if rate <= 0:
+        return line
+
+    chars = []
+    for ch in line:
+        roll = rng.random()
+        if roll >= rate:
+            chars.append(ch)
+        elif ch in OCR_CONFUSIONS and roll < rate * 0.6:
+            chars.append(OCR_CONFUSIONS[ch])
+        elif roll < rate * 0.8:
+            chars.append(ch + " ")
+        # else: character dropped
+    return "".join(chars)
+
+
+def generate_receipt(rng: random.Random, noise: float = 0.0,
+                     long_line_rate: float = 0.0, long_line_length: int = 5000) -> Dict:
+    """
+    Generate one receipt text with its ground truth
+
+    Args:
+        rng: Seeded random generator
+        noise: Per-character OCR noise rate (0 keeps the text clean)
+        long_line_rate: Probability of inserting a pathological long line
+        long_line_length: Length of the pathological line
+
+    Returns:
+        dict: text, lines, language, printed_total (the total as printed,
+            before noise) and truth (merchant_name, receipt_date,
+            total_amount, phone, tax, items)
+    """
+    merchant, lang = rng.choice(MERCHANTS)
+    labels = LABELS[lang]
+    amount_style = rng.choice(("dot", "comma", "plain")) if lang == "en" else rng.choice(("dot", "dot", "plain"))
+    currency = rng.choice(CURRENCIES)
+
+    day = date(2022, 1, 1) + timedelta(days=rng.randrange(3 * 365))
+    date_style = rng.choice(("dmy_slash", "dmy_dash", "iso", "thang", "dmy_short"))
+    phone_printed, phone_digits = make_phone(rng)
+
+    items = rng.sample(ITEMS, rng.randint(1, 6))
+    item_lines, subtotal = [], 0
+    for name, price in items:
+        qty = rng.randint(1, 4)
+        subtotal += qty * price
+        if rng.random() < 0.5:
+            item_lines.append(f"{name:<22}{qty} x {format_amount(price, amount_style)}")
+        else:
+            item_lines.append(f"{name:<22}{format_amount(qty * price, amount_style)}")
+
+    discount = rng.choice((0, 0, 0, 5000, 10000))
+    tax = (subtotal - discount) // 10 // 100 * 100 if rng.random() < 0.7 else 0
+    total = subtotal - discount + tax
+    paid = -(-total // 50000) * 50000
+
+    lines = [merchant, f"{labels['address']} {rng.randint(1, 400)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+             f"{rng.choice(labels['phone'])} {phone_printed}", rng.choice(labels["title"]),
+             f"{rng.choice(labels['date'])} {format_date(day, date_style)}"]
+    if rng.random() < 0.5:
+        lines[-1] += f" {rng.randint(7, 21):02d}:{rng.randint(0, 59):02d}"
+    lines.extend(item_lines)
+    lines.append(f"{labels['subtotal']} {format_amount(subtotal, amount_style)}")
+    if discount:
+        lines.append(f"{labels['discount']} {format_amount(discount, amount_style)}")
+    if tax:
+        lines.append(f"{rng.choice(labels['tax'])} {format_amount(tax, amount_style)}")
+    lines.append(f"{rng.choice(labels['total'])} {format_amount(total, amount_style)}{currency}")
+    lines.append(f"{labels['paid']} {format_amount(paid, amount_style)}")
+    lines.append(labels["footer"])
+
+    lines = [add_ocr_noise(line, rng, noise) for line in lines]
+    if long_line_rate and rng.random() < long_line_rate:
+        lines.insert(rng.randint(1, len(lines)), rng.choice(PATHOLOGICAL_LINES)(rng, long_line_length))
+
+    return {
+        "text": "\n".join(lines),
+        "lines": lines,
+        "language": lang,
+        "printed_total": format_amount(total, amount_style),
+        "truth": {
+            "merchant_name": merchant,
+            "receipt_date": day.strftime("%Y-%m-%d"),
+            "total_amount": float(total),
+            "phone": phone_digits,
+            "tax": float(tax),
+            "items": [name for name, _ in items]
+        }
+    }
+
+
+def generate_corpus(count: int, seed: int = 0, **options) -> List[Dict]:
+    """
+    Generate a reproducible list of receipts
+
+    Args:
+        count: Number of receipts
+        seed: Random seed; the same seed gives the same corpus
+        **options: Passed to generate_receipt (noise, long_line_rate, ...)
+
+    Returns:
+        list: Receipts from generate_receipt
+    """
+    rng = random.Random(seed)
+    return [generate_receipt(rng, **options) for _ in range(count)]
+
+
+def load_font(font_path: str = None, size: int = 22):
+    """TrueType font for rendering, falling back to PIL's built-in font"""
+    try:
+        return ImageFont.truetype(font_path or DEFAULT_FONT, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def receipt_boxes(receipt: Dict, font=None, width: int = 640, line_height: int = 30,
+                  skew: float = 0.0, seed: int = 0) -> OCRBoxes:
+    """
+    Word boxes for a receipt as a thermal printer lays it out
+
+    Words flow from the left margin, except a trailing amount (with its
+    currency), which is right-aligned like on printed receipts. Words
+    past the right edge are clipped.
+
+    Args:
+        receipt: Receipt from generate_receipt
+        font: PIL font used for word widths (load_font() when None)
+        width: Paper width in pixels
+        line_height: Vertical spacing in pixels
+        skew: Vertical drift per pixel of x (a slightly rotated photo)
+        seed: Seed for per-line jitter and confidences
+
+    Returns:
+        OCRBoxes: Boxes in reading order
+    """
+    font = font or load_font()
+    rng = random.Random(seed)
+    height = sum(font.getmetrics()) if hasattr(font, "getmetrics") else line_height - 8
+    space = font.getlength(" ")
+    words, xs, ys, widths = [], [], [], []
+
+    for i, line in enumerate(receipt["lines"]):
+        match = TRAILING_AMOUNT.search(line)
+        head, tail = (line[:match.start()], match.group(0)) if match else (line, "")
+        top = line_height * (i + 1) + rng.randint(-2, 2)
+
+        x = 20.0
+        for word in head.split():
+            words.append(word)
+            xs.append(x)
+            widths.append(font.getlength(word))
+            x += widths[-1] + space
+
+        tail_words = tail.split()
+        tail_x = width - 20 - font.getlength(" ".join(tail_words))
+        for word in tail_words:
+            words.append(word)
+            xs.append(max(tail_x, x))
+            widths.append(font.getlength(word))
+            tail_x += widths[-1] + space
+            x = xs[-1] + widths[-1] + space
+
+        ys.extend([top] * (len(words) - len(ys)))
+
+    xs, widths = np.asarray(xs), np.asarray(widths)
+    keep = np.flatnonzero(xs < width - 20)
+    ys = np.asarray(ys) + skew * xs
+    return OCRBoxes(
+        [words[k] for k in keep],
+        np.rint(xs[keep]), np.rint(ys[keep]),
+        np.rint(np.minimum(widths[keep], width - 20 - xs[keep])),
+        np.full(len(keep), height),
+        [round(rng.uniform(0.6, 0.99), 4) for _ in keep]
+    )
+
+
+def render_receipt(receipt: Dict, font=None, width: int = 640,
+                   line_height: int = 30, seed: int = 0) -> np.ndarray:
+    """
+    Draw a receipt as a grayscale thermal-paper image
+
+    Args:
+        receipt: Receipt from generate_receipt
+        font: PIL font (load_font() when None)
+        width: Image width in pixels; long lines are clipped
+        line_height: Vertical spacing in pixels
+        seed: Seed for the paper noise
+
+    Returns:
+        np.ndarray: uint8 grayscale image
+    """
+    font = font or load_font()
+    boxes = receipt_boxes(receipt, font, width, line_height, seed=seed)
+    image = Image.new("L", (width, line_height * (len(receipt["lines"]) + 2)), color=250)
+    draw = ImageDraw.Draw(image)
+
+    for word, x, y in zip(boxes.text, boxes.x.tolist(), boxes.y.tolist()):
+        draw.text((x, y), word, fill=20, font=font)
+
+    # Light paper grain so binarization has something to do
+    pixels = np.asarray(image, dtype=np.int16)
+    grain = np.random.default_rng(seed).integers(-12, 12, size=pixels.shape, dtype=np.int16)
+    return np.clip(pixels + grain, 0, 255).astype(np.uint8)
+
+
+def write_corpus(receipts: List[Dict], out_dir: str, images: bool = False,
+                 font_path: str = None) -> str:
+    """
+    Write receipts.jsonl (text + truth) and optionally one PNG per receipt
+
+    Returns:
+        str: Path of the JSONL file
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "receipts.jsonl")
+    font = load_font(font_path) if images else None
+
+    with open(path, "w", encoding="utf-8") as f:
+        for i, receipt in enumerate(receipts):
+            record = {"id": f"synthetic-{i:06d}", "text": receipt["text"],
+                      "language": receipt["language"], "truth": receipt["truth"]}
+            if images:
+                record["image"] = f"{record['id']}.png"
+                Image.fromarray(render_receipt(receipt, font, seed=i)).save(
+                    os.path.join(out_dir, record["image"]))
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic receipt corpus generator")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.0, help="Per-character OCR noise rate")
+    parser.add_argument("--long-lines", type=float, default=0.0,
+                        help="Fraction of receipts with a pathological long line")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--images", action="store_true", help="Also render PNG images")
+    parser.add_argument("--font", default=None, help="TrueType font with Vietnamese glyphs")
+    args = parser.parse_args()
+
+    receipts = generate_corpus(args.count, args.seed, noise=args.noise,
+                               long_line_rate=args.long_lines)
+    path = write_corpus(receipts, args.out, args.images, args.font)
+    print(f"Wrote {len(receipts)} receipts to {path}")
+
+
+if __name__ == "__main__":
+    main()
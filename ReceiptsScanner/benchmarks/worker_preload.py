@@ -0,0 +1,120 @@
+"""
+Prefork workers: memory and cold start with and without model preloading
+
+Mimics the Celery prefork pool with multiprocessing's fork context. In
+"lazy" mode each child loads the classifier on its first prediction; in
+"preload" mode the parent loads, warms up and freezes it first
+(workers.model_preload). For each child reports private (USS) and
+proportional (PSS) memory from /proc/<pid>/smaps_rollup and the latency of
+its first prediction, which is what a recycled child pays. Needs Linux,
+sentence-transformers, scikit-learn and a trained model in MODELS_DIR (or
+an untrained one is used).
+
+Usage:
+    python -m benchmarks.worker_preload --workers 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+
+from benchmarks.synthetic_receipts import generate_corpus
+
+
+def _memory_mb() -> dict:
+    """USS and PSS of the current process in MB"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "pss": fields.get("Pss", 0)
+    }
+
+
+def _child(texts, queue):
+    from workers import model_preload
+
+    model_preload.pin_threads()
+    start = time.perf_counter()
+    model_preload.get_classifier().predict_batch(texts[:1])
+    first_ms = (time.perf_counter() - start) * 1e3
+
+    model_preload.get_classifier().predict_batch(texts)
+    queue.put({"first_ms": first_ms, **_memory_mb()})
+
+
+def run_mode(preload: bool, workers: int, texts) -> list:
+    """
+    Fork workers and collect their stats (run in a fresh process per mode)
+
+    Returns:
+        list: Per-child dicts with first_ms, uss and pss
+    """
+    from workers import model_preload
+
+    if preload:
+        model_preload.on_worker_init(workers)
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    children = [context.Process(target=_child, args=(texts, queue)) for _ in range(workers)]
+    for child in children:
+        child.start()
+    stats = [queue.get() for _ in children]
+    for child in children:
+        child.join()
+    return stats
+
+
+def _run_mode_in_process(args):
+    return run_mode(*args)
+
+
+def run_benchmark(workers: int = 4, count: int = 32) -> dict:
+    """
+    Compare lazy and preloaded workers
+
+    Args:
+        workers: Pool size
+        count: Receipts classified per child after the first one
+
+    Returns:
+        dict: mode -> per-child stats
+    """
+    os.environ["EMBEDDING_CACHE_BACKEND"] = "none"
+    texts = [receipt["text"] for receipt in generate_corpus(count, seed=0)]
+
+    # Each mode starts from a parent that has not touched torch yet
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for mode, preload in (("lazy", False), ("preload", True)):
+        with context.Pool(1) as pool:
+            results[mode] = pool.map(_run_mode_in_process, [(preload, workers, texts)])[0]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefork model preloading benchmark")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--count", type=int, default=32)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = run_benchmark(args.workers, args.count)
+
+    print(f"\nPrefork workers ({args.workers}), per child:")
+    print(f"{'mode':>8}{'first ms':>10}{'USS MB':>9}{'PSS MB':>9}")
+    for mode, stats in results.items():
+        for child in stats:
+            print(f"{mode:>8}{child['first_ms']:>10.0f}{child['uss']:>9.0f}{child['pss']:>9.0f}")
+        total = sum(child["pss"] for child in stats)
+        print(f"{mode:>8} total PSS {total:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
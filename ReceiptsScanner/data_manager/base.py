@@ -4,10 +4,17 @@ Abstract data adapter interface
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 
+from monitoring.logging_config import get_logger
+
+logger = get_logger(__name__)
+
 
 class DataAdapter(ABC):
     """Abstract base class for data storage adapters"""
     
+    # Optional MerchantIndex fed with every newly inserted receipt
+    merchant_index = None
+    
     @abstractmethod
     def save_receipt(self, receipt: Dict[str, Any]) -> bool:
         """
@@ -21,6 +28,57 @@ class DataAdapter(ABC):
         """
         pass
     
+    def _load_receipts(self) -> List[Dict[str, Any]]:
+        """Load the stored receipt list (adapters keeping all receipts in one object)"""
+        raise NotImplementedError
+    
+    def _save_receipts(self, receipts: List[Dict[str, Any]]) -> bool:
+        """Write the whole receipt list back (counterpart of _load_receipts)"""
+        raise NotImplementedError
+    
+    def save_receipts(self, receipts: List[Dict[str, Any]]) -> bool:
+        """
+        Save (insert or update) several receipts at once
+        
+        Loads the stored list once, merges the batch by id and writes it
+        back with a single _save_receipts call. Adapters without
+        _load_receipts/_save_receipts override this.
+        
+        Args:
+            receipts: Receipt data dictionaries
+            
+        Returns:
+            bool: Success status
+        """
+        try:
+            stored = self._load_receipts()
+            positions = {r.get('id'): i for i, r in enumerate(stored)}
+            
+            new_receipts = []
+            for receipt in receipts:
+                index = positions.get(receipt.get('id'))
+                if index is not None:
+                    stored[index] = receipt
+                else:
+                    positions[receipt.get('id')] = len(stored)
+                    stored.append(receipt)
+                    new_receipts.append(receipt)
+            
+            logger.info(f"Saved batch of {len(receipts)} receipts")
+            saved = self._save_receipts(stored)
+            if saved and new_receipts:
+                self._index_receipts(new_receipts)
+            return saved
+            
+        except Exception as e:
+            logger.error(f"Error saving receipts: {str(e)}")
+            return False
+    
+    def _index_receipts(self, receipts: List[Dict[str, Any]]):
+        """Register newly inserted receipts with the attached merchant index"""
+        if self.merchant_index is not None:
+            self.merchant_index.add_receipts(receipts)
+    
     @abstractmethod
     def get_receipt(self, receipt_id: str) -> Optional[Dict[str, Any]]:
         """
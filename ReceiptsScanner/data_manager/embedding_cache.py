@@ -0,0 +1,369 @@
+"""
+Two-level cache for sentence embeddings
+
+Receipt texts are re-encoded at prediction time, on every retrain and in
+evaluation. Entries are keyed by a fingerprint of the encoder (architecture,
+embedding size and a sample of its weights) plus a hash of the normalized
+text (NFC, whitespace runs collapsed), so re-saved copies of the same
+encoder share entries while a different model starts from a clean key space.
+
+Level one is an in-process LRU. Level two lives in one directory per
+encoder fingerprint: vectors.f32, an append-only float32 matrix read through
+a memmap, and index.bin, an append-only list of (text hash, row) records.
+Vectors are written before their index records, so a reader never sees a
+row that is not complete; other processes pick up new rows by reading the
+index tail.
+"""
+import hashlib
+import json
+import os
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from monitoring.logging_config import get_logger
+from monitoring.metrics import (
+    embedding_cache_hits_total, embedding_cache_misses_total,
+    embedding_cache_bytes, embedding_cache_hit_ratio
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within a process
+    fcntl = None
+
+logger = get_logger(__name__)
+
+EMBEDDING_CACHE_BACKENDS = ("disk", "memory", "none")
+
+# Bump when the on-disk layout changes
+CACHE_FORMAT_VERSION = 1
+
+INDEX_RECORD = np.dtype([("key", "S16"), ("row", "<u8")])
+
+# Weights sampled per parameter tensor for the encoder fingerprint
+FINGERPRINT_SAMPLE = 16
+
+
+def normalize_text(text: str) -> str:
+    """NFC-normalized text with whitespace runs collapsed to one space"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(normalized: str) -> bytes:
+    """16-byte hash of normalized text"""
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+
+def encoder_fingerprint(encoder) -> str:
+    """
+    Short, stable fingerprint of a sentence encoder
+    
+    Combines the encoder's module structure, embedding size and the first
+    values of every parameter tensor, so a copy saved with a trained model
+    matches the pretrained encoder it came from. Encoders that are not torch
+    modules can provide a cache_identity() string instead.
+    
+    Args:
+        encoder: SentenceTransformer or ml.encoders.SentenceEncoder
+    
+    Returns:
+        str: 16-character hex fingerprint
+    """
+    digest = hashlib.sha256()
+    parts = [CACHE_FORMAT_VERSION, type(encoder).__name__,
+             getattr(encoder, "max_seq_length", None)]
+    if hasattr(encoder, "cache_identity"):
+        parts.append(encoder.cache_identity())
+    if hasattr(encoder, "get_sentence_embedding_dimension"):
+        parts.append(encoder.get_sentence_embedding_dimension())
+    if hasattr(encoder, "parameters"):
+        parts.append(repr(encoder))
+        for parameter in encoder.parameters():
+            sample = parameter.detach().flatten()[:FINGERPRINT_SAMPLE].cpu().numpy()
+            digest.update(np.ascontiguousarray(sample, dtype=np.float32).tobytes())
+    
+    digest.update(json.dumps(parts, default=str).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class DiskEmbeddingStore:
+    """Append-only float32 matrix plus hash-to-row index for one encoder"""
+    
+    def __init__(self, path: str, max_bytes: int):
+        """
+        Open (or create) the store
+        
+        Args:
+            path: Directory of this encoder's fingerprint
+            max_bytes: Stop appending once vectors and index reach this size
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+        
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.index_path = os.path.join(path, "index.bin")
+        self.lock_path = os.path.join(path, "lock")
+        
+        self.dim: Optional[int] = None
+        self.rows: Dict[bytes, int] = {}
+        self._index_offset = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._full = False
+        
+        self.meta_path = os.path.join(path, "meta.json")
+        self._refresh()
+    
+    def _set_dim(self, dim: int):
+        temp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"dim": dim, "format": CACHE_FORMAT_VERSION}, f)
+        os.replace(temp_path, self.meta_path)
+        self.dim = dim
+    
+    def _refresh(self) -> bool:
+        """Read index records appended since the last call; True if any"""
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            return False
+        
+        if self.dim is None:
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+        
+        # A record being written by another process is picked up next time
+        end = size - size % INDEX_RECORD.itemsize
+        if end <= self._index_offset:
+            return False
+        
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_offset)
+            records = np.fromfile(f, dtype=INDEX_RECORD, count=(end - self._index_offset) // INDEX_RECORD.itemsize)
+        self.rows.update(zip(records["key"].tolist(), records["row"].tolist()))
+        self._index_offset = end
+        return True
+    
+    def _vectors(self, needed_rows: int) -> np.ndarray:
+        """Memmap of the vectors file covering at least needed_rows rows"""
+        if self._matrix is None or len(self._matrix) < needed_rows:
+            rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._matrix
+    
+    def get(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """
+        Look up vectors
+        
+        Args:
+            keys: Text hashes
+        
+        Returns:
+            list: Vector copy per key, None for keys not on disk
+        """
+        rows = [self.rows.get(key) for key in keys]
+        if None in rows and self._refresh():
+            rows = [self.rows.get(key) for key in keys]
+        
+        found = [row for row in rows if row is not None]
+        if not found:
+            return rows
+        
+        matrix = self._vectors(max(found) + 1)
+        return [None if row is None else np.array(matrix[row]) for row in rows]
+    
+    def add(self, keys: Sequence[bytes], vectors: np.ndarray) -> int:
+        """
+        Append vectors not yet on disk
+        
+        Args:
+            keys: Text hashes
+            vectors: float32 matrix, one row per key
+        
+        Returns:
+            int: Rows appended
+        """
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            
+            # Another process may have written some of these meanwhile
+            self._refresh()
+            if self.dim is None:
+                self._set_dim(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match cache ({self.dim})")
+            
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self.rows:
+                    new[key] = vector
+            if not new or self._full:
+                return 0
+            
+            row_bytes = 4 * self.dim
+            size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+            if size + self._index_offset + len(new) * (row_bytes + INDEX_RECORD.itemsize) > self.max_bytes:
+                self._full = True
+                logger.warning(f"Embedding cache {self.path} reached {self.max_bytes} bytes; "
+                               f"new embeddings stay in memory only")
+                return 0
+            
+            # Drop a partial row left by an interrupted write
+            first_row = size // row_bytes
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(first_row * row_bytes)
+                f.write(np.ascontiguousarray(list(new.values()), dtype=np.float32).tobytes())
+            
+            records = np.empty(len(new), dtype=INDEX_RECORD)
+            records["key"] = list(new)
+            records["row"] = np.arange(first_row, first_row + len(new))
+            with open(self.index_path, "ab") as f:
+                f.write(records.tobytes())
+            
+            self.rows.update(zip(new, records["row"].tolist()))
+            self._index_offset += records.nbytes
+            return len(new)
+    
+    def nbytes(self) -> int:
+        """Bytes used by vectors and index"""
+        return sum(os.path.getsize(path) for path in (self.vectors_path, self.index_path)
+                   if os.path.exists(path))
+
+
+class EmbeddingCache:
+    """In-memory LRU in front of an optional DiskEmbeddingStore"""
+    
+    def __init__(self, fingerprint: str, cache_dir: str = None, memory_items: int = None,
+                 max_bytes: int = None):
+        """
+        Initialize embedding cache
+        
+        Args:
+            fingerprint: Encoder fingerprint from encoder_fingerprint()
+            cache_dir: Disk cache root; None keeps the memory level only
+            memory_items: LRU capacity (default: EMBEDDING_CACHE_MEMORY_ITEMS, 10000)
+            max_bytes: Disk size limit per encoder (default: EMBEDDING_CACHE_MAX_BYTES, 1GB)
+        """
+        self.fingerprint = fingerprint
+        self.memory_items = memory_items or int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "10000"))
+        max_bytes = max_bytes or int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+        
+        self.memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.disk = DiskEmbeddingStore(os.path.join(cache_dir, fingerprint), max_bytes) if cache_dir else None
+        self.lock = Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        
+        logger.info(f"Embedding cache initialized for encoder {fingerprint} "
+                   f"({self.memory_items} in memory, disk: {cache_dir or 'off'})")
+    
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+    
+    def encode(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings for texts, encoding only the ones not cached
+        
+        Args:
+            texts: Texts to embed
+            encode: Encodes a list of normalized texts into a 2-D array
+        
+        Returns:
+            np.ndarray: float32 matrix, one row per text in input order
+        """
+        normalized = [normalize_text(text) for text in texts]
+        keys = [text_key(text) for text in normalized]
+        found: Dict[bytes, np.ndarray] = {}
+        
+        with self.lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+            
+            disk_hits = 0
+            if self.disk is not None and len(found) < len(set(keys)):
+                lookup = [key for key in dict.fromkeys(keys) if key not in found]
+                try:
+                    vectors = self.disk.get(lookup)
+                except Exception as e:
+                    logger.error(f"Embedding cache read failed: {str(e)}")
+                    vectors = [None] * len(lookup)
+                for key, vector in zip(lookup, vectors):
+                    if vector is not None:
+                        found[key] = vector
+                        self._remember(key, vector)
+                        disk_hits += keys.count(key)
+        
+        # Encode each missing text once, outside the lock
+        missing = {key: text for key, text in zip(keys, normalized) if key not in found}
+        if missing:
+            vectors = np.asarray(encode(list(missing.values())), dtype=np.float32)
+            with self.lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._remember(key, vector)
+                if self.disk is not None:
+                    try:
+                        self.disk.add(list(missing), vectors)
+                    except Exception as e:
+                        logger.error(f"Embedding cache write failed: {str(e)}")
+        
+        # Repeats of a missing text within the batch count as memory hits
+        self._record(len(keys) - disk_hits - len(missing), disk_hits, len(missing))
+        return np.stack([found[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+    
+    def _record(self, memory_hits: int, disk_hits: int, misses: int):
+        """Update counters, hit ratio and size gauges"""
+        self.hits["memory"] += memory_hits
+        self.hits["disk"] += disk_hits
+        self.misses += misses
+        embedding_cache_hits_total.labels(level="memory").inc(memory_hits)
+        embedding_cache_hits_total.labels(level="disk").inc(disk_hits)
+        embedding_cache_misses_total.inc(misses)
+        embedding_cache_hit_ratio.set(self.hit_ratio())
+        
+        if self.memory:
+            row_bytes = next(iter(self.memory.values())).nbytes
+            embedding_cache_bytes.labels(level="memory").set(len(self.memory) * row_bytes)
+        if self.disk is not None:
+            embedding_cache_bytes.labels(level="disk").set(self.disk.nbytes())
+    
+    def hit_ratio(self) -> float:
+        """Share of lookups served from either level since start"""
+        lookups = self.hits["memory"] + self.hits["disk"] + self.misses
+        return (self.hits["memory"] + self.hits["disk"]) / lookups if lookups else 0.0
+
+
+def create_embedding_cache(fingerprint: str, backend: str = None) -> Optional[EmbeddingCache]:
+    """
+    Create the configured embedding cache
+    
+    Args:
+        fingerprint: Encoder fingerprint from encoder_fingerprint()
+        backend: One of EMBEDDING_CACHE_BACKENDS (default: EMBEDDING_CACHE_BACKEND or "disk")
+    
+    Returns:
+        EmbeddingCache: Cache instance, or None when caching is disabled
+    """
+    backend = (backend or os.getenv("EMBEDDING_CACHE_BACKEND", "disk")).lower()
+    
+    if backend == "disk":
+        return EmbeddingCache(fingerprint, os.getenv(
+            "EMBEDDING_CACHE_DIR", os.path.join(os.getenv("DATA_DIR", "./data"), "embedding_cache")
+        ))
+    if backend == "memory":
+        return EmbeddingCache(fingerprint)
+    if backend == "none":
+        return None
+    
+    raise ValueError(f"Unknown embedding cache backend '{backend}'. "
+                     f"Available: {', '.join(EMBEDDING_CACHE_BACKENDS)}")
@@ -106,7 +106,7 @@ class JobsAdapter:
         return jobs.get(job_id)
     
     def update_job(self, job_id: str, status: str = None, result: Any = None,
-                   error: str = None, completed_at: str = None) -> bool:
+                   error: str = None, completed_at: str = None, clear_result: bool = False) -> bool:
         """
         Update job status
         
@@ -116,6 +116,7 @@ class JobsAdapter:
             result: Job result
             error: Error message
             completed_at: Completion timestamp
+            clear_result: Reset the result to None (e.g. a partial result of a failed job)
             
         Returns:
             bool: Success status
@@ -130,7 +131,9 @@ class JobsAdapter:
             if status:
                 jobs[job_id]["status"] = status
             
-            if result is not None:
+            if clear_result:
+                jobs[job_id]["result"] = None
+            elif result is not None:
                 jobs[job_id]["result"] = result
             
             if error:
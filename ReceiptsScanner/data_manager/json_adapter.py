@@ -90,7 +90,11 @@ class JSONDataAdapter(DataAdapter):
                 receipts.append(receipt)
                 logger.info(f"Saved new receipt {receipt['id']}")
             
-            return self._save_receipts(receipts)
+            saved = self._save_receipts(receipts)
+            # Updates are not counted again; corrections reach the index via the API
+            if saved and existing_index is None:
+                self._index_receipts([receipt])
+            return saved
             
         except Exception as e:
             logger.error(f"Error saving receipt: {str(e)}")
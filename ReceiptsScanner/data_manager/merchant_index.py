@@ -0,0 +1,464 @@
+"""
+Known-merchant index for resolving receipt headers to canonical merchants
+
+Merchant names from stored receipts (see is_indexable) are folded (lowercase,
+accents and punctuation removed, "đ" -> "d") into aliases. Each alias points
+to a merchant ID whose display name is the user-corrected name if there is
+one, else the most frequent spelling. Names guessed from a capitalized
+header line (merchant_source "line") are only indexed once a user corrected
+them (merchant_corrected). Lookups first walk a word trie of aliases
+from every word of the top receipt lines; lines with no exact alias fall
+back to a character trigram inverted index (Dice similarity).
+"""
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from monitoring.logging_config import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are only serialized within a process
+    fcntl = None
+
+logger = get_logger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+# Folded aliases shorter than this are too ambiguous to index
+MIN_ALIAS_LENGTH = 4
+
+# Trigrams shared by more aliases than this do not nominate fuzzy candidates
+MAX_GRAM_POSTINGS = 50
+# Aliases with the most informative shared trigrams that get an exact score
+FUZZY_CANDIDATES = 20
+
+MERCHANT_INDEX_TOP_LINES = int(os.getenv("MERCHANT_INDEX_TOP_LINES", "5"))
+MERCHANT_FUZZY_THRESHOLD = float(os.getenv("MERCHANT_FUZZY_THRESHOLD", "0.7"))
+
+_NON_ALNUM = re.compile(r'[\W_]+')
+_TERMINAL = ""
+
+
+def fold_merchant_name(name: str) -> str:
+    """
+    Accent- and case-insensitive form of a merchant name
+    
+    Args:
+        name: Merchant name or receipt line
+    
+    Returns:
+        str: Lowercase ASCII-folded words separated by single spaces
+    """
+    name = unicodedata.normalize("NFD", name.replace("đ", "d").replace("Đ", "D"))
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    return " ".join(_NON_ALNUM.sub(" ", name).split())
+
+
+def is_indexable(receipt: Dict[str, Any]) -> bool:
+    """
+    Whether a receipt's merchant name may enter the index
+    
+    Uncorrected names from the capitalized-line fallback are skipped: they
+    are often headers such as "HÓA ĐƠN BÁN HÀNG".
+    """
+    return bool(receipt.get("merchant_corrected")) or receipt.get("merchant_source") != "line"
+
+
+def _trigrams(folded: str) -> set:
+    """Character trigrams of a folded name, padded at both ends"""
+    padded = f" {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MerchantIndex:
+    """
+    In-memory merchant index persisted as JSON
+    
+    Only merchants and aliases are stored; the trie and the trigram index are
+    rebuilt on load, which is linear in the total alias length. The file is
+    reloaded when another process has rewritten it, and updates hold an
+    exclusive lock on a sidecar file from reload to write so concurrent
+    workers do not drop each other's aliases.
+    """
+    
+    def __init__(self, path: str = None):
+        """
+        Initialize merchant index
+        
+        Args:
+            path: Index file (default: MERCHANT_INDEX_PATH or DATA_DIR/merchant_index.json)
+        """
+        self.path = path or os.getenv(
+            "MERCHANT_INDEX_PATH", os.path.join(os.getenv("DATA_DIR", "./data"), "merchant_index.json")
+        )
+        self.lock_path = f"{self.path}.lock"
+        self.lock = Lock()
+        self._reset()
+        self._mtime = None
+        self.load()
+    
+    def _reset(self):
+        self.merchants: Dict[str, Dict[str, Any]] = {}
+        self.aliases: Dict[str, str] = {}
+        self.trie: Dict[str, Any] = {}
+        self.grams: Dict[str, set] = {}
+        # Trigram sets of aliases scored so far
+        self.alias_grams: Dict[str, frozenset] = {}
+    
+    def __len__(self) -> int:
+        return len(self.merchants)
+    
+    def _index_alias(self, alias: str, merchant_id: str):
+        """Add an alias to the lookup structures"""
+        self.aliases[alias] = merchant_id
+        
+        node = self.trie
+        for word in alias.split(" "):
+            node = node.setdefault(word, {})
+        node[_TERMINAL] = alias
+        
+        for gram in _trigrams(alias):
+            self.grams.setdefault(gram, set()).add(alias)
+    
+    def _match_exact(self, folded: str) -> Optional[str]:
+        """Longest alias made of consecutive words of a folded line"""
+        words = folded.split(" ")
+        best = None
+        for start in range(len(words)):
+            node = self.trie
+            for word in words[start:]:
+                node = node.get(word)
+                if node is None:
+                    break
+                alias = node.get(_TERMINAL)
+                if alias and (best is None or len(alias) > len(best)):
+                    best = alias
+        return best
+    
+    def _match_fuzzy(self, folded: str, coverage: bool = False) -> Tuple[Optional[str], float]:
+        """
+        Most similar alias by shared trigrams
+        
+        Candidates are the aliases sharing the most trigrams that are not too
+        common (see MAX_GRAM_POSTINGS). Scores are the Dice coefficient,
+        or with coverage=True the share of the alias' trigrams found in the
+        query, which tolerates extra words around the name on a receipt line.
+        """
+        query = _trigrams(folded)
+        hits = Counter()
+        for gram in query:
+            posting = self.grams.get(gram)
+            if posting and len(posting) <= MAX_GRAM_POSTINGS:
+                hits.update(posting)
+        
+        best, best_score = None, 0.0
+        for alias, _ in hits.most_common(FUZZY_CANDIDATES):
+            grams = self.alias_grams.get(alias)
+            if grams is None:
+                grams = self.alias_grams[alias] = frozenset(_trigrams(alias))
+            shared = len(query & grams)
+            score = shared / len(grams) if coverage else 2 * shared / (len(query) + len(grams))
+            if score > best_score or (score == best_score and best and len(alias) > len(best)):
+                best, best_score = alias, score
+        return best, best_score
+    
+    def _merchant(self, merchant_id: str, score: float) -> Dict[str, Any]:
+        """Public view of a merchant"""
+        merchant = self.merchants[merchant_id]
+        name = merchant.get("corrected_name") or max(merchant["names"], key=merchant["names"].get)
+        return {"id": merchant_id, "name": name, "score": round(score, 3)}
+    
+    def lookup(self, name: str, threshold: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Resolve one name or line to a known merchant
+        
+        Args:
+            name: Merchant name or receipt line
+            threshold: Minimum fuzzy similarity (default: MERCHANT_FUZZY_THRESHOLD)
+        
+        Returns:
+            dict: Merchant id, name and match score (1.0 for exact), or None
+        """
+        self.refresh()
+        folded = fold_merchant_name(name)
+        if len(folded) < MIN_ALIAS_LENGTH or not self.aliases:
+            return None
+        
+        alias = self._match_exact(folded)
+        if alias:
+            return self._merchant(self.aliases[alias], 1.0)
+        
+        alias, score = self._match_fuzzy(folded, coverage=True)
+        if alias and score >= (threshold if threshold is not None else MERCHANT_FUZZY_THRESHOLD):
+            return self._merchant(self.aliases[alias], score)
+        return None
+    
+    def resolve(self, text: str, top_lines: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Resolve the top lines of a receipt to a known merchant
+        
+        An exact alias on any of the lines wins over fuzzy matches; among
+        fuzzy matches the one covering most of its alias' trigrams wins.
+        
+        Args:
+            text: Receipt text
+            top_lines: Non-empty lines to consider (default: MERCHANT_INDEX_TOP_LINES)
+        
+        Returns:
+            dict: Merchant id, name and match score, or None
+        """
+        self.refresh()
+        if not self.aliases:
+            return None
+        
+        lines = [line for line in text.split("\n") if line.strip()]
+        folded_lines = [fold_merchant_name(line) for line in lines[:top_lines or MERCHANT_INDEX_TOP_LINES]]
+        folded_lines = [folded for folded in folded_lines if len(folded) >= MIN_ALIAS_LENGTH]
+        
+        for folded in folded_lines:
+            alias = self._match_exact(folded)
+            if alias:
+                return self._merchant(self.aliases[alias], 1.0)
+        
+        best, best_score = None, 0.0
+        for folded in folded_lines:
+            alias, score = self._match_fuzzy(folded, coverage=True)
+            if score > best_score:
+                best, best_score = alias, score
+        
+        if best and best_score >= MERCHANT_FUZZY_THRESHOLD:
+            return self._merchant(self.aliases[best], best_score)
+        return None
+    
+    def resolve_entities(self, entities: Dict[str, Any], text: str):
+        """
+        Resolve an extracted merchant to a known one, in place
+        
+        A name found by a merchant keyword (merchant_source "keyword") is
+        only canonicalized; the top lines are searched for a known alias
+        only when no keyword matched, so a header line that happens to be
+        an alias cannot override it. Sets merchant_id, and merchant_name and
+        merchant_source ("index") when the top lines resolved.
+        
+        Args:
+            entities: Entities with merchant_name and merchant_source
+            text: Text the merchant was extracted from
+        """
+        keyword = entities.get("merchant_source") == "keyword"
+        merchant = self.lookup(entities["merchant_name"]) if keyword else self.resolve(text)
+        
+        entities["merchant_id"] = merchant["id"] if merchant else None
+        if merchant:
+            entities["merchant_name"] = merchant["name"]
+            if not keyword:
+                entities["merchant_source"] = "index"
+    
+    def add(self, name: str, corrected: bool = False) -> Optional[str]:
+        """
+        Register a merchant name
+        
+        A new spelling close enough to a known alias becomes another alias
+        of that merchant; otherwise it starts a new merchant.
+        
+        Args:
+            name: Merchant name as stored on a receipt
+            corrected: Name was confirmed by a user and becomes the display name
+        
+        Returns:
+            str: Merchant ID, or None if the name is too short to index
+        """
+        name = " ".join((name or "").split())
+        folded = fold_merchant_name(name)
+        if len(folded) < MIN_ALIAS_LENGTH or name == "Unknown":
+            return None
+        
+        with self.lock:
+            merchant_id = self.aliases.get(folded)
+            if merchant_id is None:
+                alias, score = self._match_fuzzy(folded)
+                if alias and score >= MERCHANT_FUZZY_THRESHOLD:
+                    merchant_id = self.aliases[alias]
+                else:
+                    merchant_id = folded.replace(" ", "-")
+                    self.merchants[merchant_id] = {"names": {}, "corrected_name": None}
+                self._index_alias(folded, merchant_id)
+            
+            merchant = self.merchants[merchant_id]
+            merchant["names"][name] = merchant["names"].get(name, 0) + 1
+            if corrected:
+                merchant["corrected_name"] = name
+        
+        return merchant_id
+    
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive inter-process lock held around reload, update and write"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+    
+    def add_receipts(self, receipts: Iterable[Dict[str, Any]], save: bool = True) -> int:
+        """
+        Register the merchant names of saved receipts (see is_indexable)
+        
+        Args:
+            receipts: Receipt dictionaries; merchant_corrected ones set the display name
+            save: Persist the index afterwards
+        
+        Returns:
+            int: Number of names indexed
+        """
+        added = 0
+        try:
+            with self._file_lock():
+                # Pick up aliases other processes saved before adding ours
+                self.refresh()
+                for receipt in receipts:
+                    if not is_indexable(receipt):
+                        continue
+                    if self.add(receipt.get("merchant_name"), bool(receipt.get("merchant_corrected"))):
+                        added += 1
+                if added and save:
+                    self.save()
+        except Exception as e:
+            logger.error(f"Error updating merchant index: {str(e)}")
+        return added
+    
+    def correct(self, name: str) -> Optional[str]:
+        """
+        Register a merchant name confirmed by a user and persist the index
+        
+        Args:
+            name: Corrected merchant name
+        
+        Returns:
+            str: Merchant ID of the name, or None if it is not indexable
+        """
+        try:
+            with self._file_lock():
+                self.refresh()
+                merchant_id = self.add(name, corrected=True)
+                if merchant_id:
+                    self.save()
+                return merchant_id
+        except Exception as e:
+            logger.error(f"Error updating merchant index: {str(e)}")
+            return None
+    
+    def load(self) -> bool:
+        """Load the index file if it exists"""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Error loading merchant index: {str(e)}")
+            return False
+        
+        if data.get("version") != INDEX_FORMAT_VERSION:
+            logger.warning(f"Ignoring merchant index version {data.get('version')}")
+            return False
+        
+        with self.lock:
+            self._reset()
+            self.merchants = data["merchants"]
+            for alias, merchant_id in data["aliases"].items():
+                self._index_alias(alias, merchant_id)
+            self._mtime = mtime
+        
+        logger.info(f"Merchant index loaded: {len(self.merchants)} merchants, "
+                   f"{len(self.aliases)} aliases")
+        return True
+    
+    def refresh(self):
+        """Reload the index if the file changed since it was last read or written"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.load()
+    
+    def save(self) -> bool:
+        """Write the index atomically"""
+        try:
+            with self.lock:
+                payload = json.dumps({
+                    "version": INDEX_FORMAT_VERSION,
+                    "merchants": self.merchants,
+                    "aliases": self.aliases
+                }, ensure_ascii=False)
+            
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                f.write(payload)
+            os.replace(temp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving merchant index: {str(e)}")
+            return False
+    
+    def rebuild(self, receipts: List[Dict[str, Any]]) -> bool:
+        """
+        Rebuild the index from scratch
+        
+        Category corrections are not read: they carry no merchant_source or
+        merchant_corrected, and their receipts are already among receipts.
+        
+        Args:
+            receipts: Stored receipts
+        Returns:
+            bool: Success status
+        """
+        with self._file_lock():
+            with self.lock:
+                self._reset()
+            
+            for receipt in receipts:
+                if is_indexable(receipt):
+                    self.add(receipt.get("merchant_name"), bool(receipt.get("merchant_corrected")))
+            
+            logger.info(f"Merchant index rebuilt: {len(self.merchants)} merchants")
+            return self.save()
+
+
+def create_merchant_index(data_adapter=None, path: str = None) -> Optional[MerchantIndex]:
+    """
+    Create the merchant index used by receipt processing
+    
+    Args:
+        data_adapter: Storage to build the index from when no index file exists
+        path: Index file (see MerchantIndex)
+    
+    Returns:
+        MerchantIndex: Index instance, or None when MERCHANT_INDEX_ENABLED=false
+    """
+    if os.getenv("MERCHANT_INDEX_ENABLED", "true").lower() != "true":
+        return None
+    
+    index = MerchantIndex(path)
+    if not os.path.exists(index.path) and data_adapter is not None:
+        index.rebuild(data_adapter.list_receipts())
+    return index
+
+
+if __name__ == "__main__":
+    from data_manager.json_adapter import JSONDataAdapter
+    from data_manager.s3_adapter import S3DataAdapter
+    
+    adapter = S3DataAdapter() if os.getenv("STORAGE_BACKEND", "json") == "s3" else JSONDataAdapter()
+    index = MerchantIndex()
+    index.rebuild(adapter.list_receipts())
+    print(f"\nMerchants: {len(index)}  Aliases: {len(index.aliases)}  File: {index.path}")
@@ -0,0 +1,267 @@
+"""
+Content-addressed cache for OCR results
+
+Entries are keyed by the sha256 of the uploaded image bytes plus a
+fingerprint of the preprocessing and OCR settings, so re-uploads of the
+same photo skip preprocessing and OCR, while any settings change (language,
+PSM, denoising recipe, ...) starts from a clean key space.
+"""
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Dict, Any, Optional
+
+from monitoring.logging_config import get_logger
+from monitoring.metrics import ocr_cache_hits_total, ocr_cache_misses_total
+
+logger = get_logger(__name__)
+
+OCR_CACHE_BACKENDS = ("disk", "redis", "none")
+
+# Bump when the cached entry layout changes
+CACHE_FORMAT_VERSION = 2
+
+
+def image_digest(data) -> str:
+    """sha256 hex digest of encoded image bytes"""
+    return hashlib.sha256(memoryview(data)).hexdigest()
+
+
+def settings_fingerprint(*settings: Dict[str, Any]) -> str:
+    """
+    Short, stable fingerprint of preprocessing/OCR settings
+    
+    Args:
+        settings: Configuration dicts (e.g. ocr_adapter.get_config())
+        
+    Returns:
+        str: 16-character hex fingerprint
+    """
+    payload = json.dumps([CACHE_FORMAT_VERSION, *settings], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(data, fingerprint: str) -> str:
+    """Cache key for image bytes under a settings fingerprint"""
+    return f"{image_digest(data)}-{fingerprint}"
+
+
+class OCRCache(ABC):
+    """Base class for OCR result caches; counts hits and misses"""
+    
+    backend = "base"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached OCR result
+        
+        Args:
+            key: Key from cache_key()
+            
+        Returns:
+            dict: Cached result, or None on a miss or backend error
+        """
+        try:
+            entry = self._get(key)
+        except Exception as e:
+            logger.error(f"OCR cache read failed: {str(e)}")
+            entry = None
+        
+        if entry is None:
+            ocr_cache_misses_total.labels(backend=self.backend).inc()
+        else:
+            ocr_cache_hits_total.labels(backend=self.backend).inc()
+        return entry
+    
+    def set(self, key: str, entry: Dict[str, Any]) -> bool:
+        """
+        Store an OCR result
+        
+        Args:
+            key: Key from cache_key()
+            entry: JSON-serializable result (text, confidence, boxes, ...)
+            
+        Returns:
+            bool: Success status
+        """
+        try:
+            payload = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+            self._set(key, payload)
+            return True
+        except Exception as e:
+            logger.error(f"OCR cache write failed: {str(e)}")
+            return False
+    
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def _set(self, key: str, payload: bytes):
+        pass
+
+
+class DiskOCRCache(OCRCache):
+    """
+    Local disk cache with LRU eviction by total size
+    
+    Each entry is a JSON file; reads refresh its mtime, and when the cache
+    grows past max_bytes the least recently used files are removed until
+    it is back under 90% of the limit. Safe to share between processes:
+    writes are atomic renames and the size is re-measured before evicting.
+    """
+    
+    backend = "disk"
+    
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        """
+        Initialize disk cache
+        
+        Args:
+            cache_dir: Cache directory (default: OCR_CACHE_DIR or DATA_DIR/ocr_cache)
+            max_bytes: Size limit (default: OCR_CACHE_MAX_BYTES, 512MB)
+        """
+        self.cache_dir = cache_dir or os.getenv(
+            "OCR_CACHE_DIR", os.path.join(os.getenv("DATA_DIR", "./data"), "ocr_cache")
+        )
+        self.max_bytes = max_bytes or int(os.getenv("OCR_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        self.lock = Lock()
+        self._size = sum(size for _, size, _ in self._entries())
+        
+        logger.info(f"OCR disk cache initialized: {self.cache_dir} "
+                   f"({self._size} / {self.max_bytes} bytes)")
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+    
+    def _entries(self):
+        """Yield (path, size, mtime) for every cached entry"""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime
+    
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        
+        # Mark as recently used
+        os.utime(path)
+        return entry
+    
+    def _set(self, key: str, payload: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+        
+        with self.lock:
+            self._size += len(payload)
+            if self._size > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        """Remove least recently used entries down to 90% of max_bytes"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = 0.9 * self.max_bytes
+        removed = 0
+        
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        
+        self._size = total
+        logger.info(f"OCR cache evicted {removed} entries ({total} bytes left)")
+    
+    def clear(self):
+        """Remove all entries"""
+        with self.lock:
+            for path, _, _ in list(self._entries()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+
+class RedisOCRCache(OCRCache):
+    """
+    Redis cache shared between workers
+    
+    Entries expire after ttl seconds; size-based LRU eviction is left to the
+    server's maxmemory-policy (e.g. allkeys-lru).
+    """
+    
+    backend = "redis"
+    
+    def __init__(self, redis_url: str = None, ttl: int = None, prefix: str = "ocr:"):
+        """
+        Initialize Redis cache
+        
+        Args:
+            redis_url: Redis URL (default: OCR_CACHE_REDIS_URL or REDIS_URL)
+            ttl: Entry lifetime in seconds (default: OCR_CACHE_TTL, 30 days)
+            prefix: Key prefix
+        """
+        import redis
+        
+        redis_url = redis_url or os.getenv("OCR_CACHE_REDIS_URL",
+                                           os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        self.client = redis.Redis.from_url(redis_url)
+        self.ttl = ttl or int(os.getenv("OCR_CACHE_TTL", str(30 * 24 * 3600)))
+        self.prefix = prefix
+        
+        logger.info(f"OCR Redis cache initialized (ttl={self.ttl}s)")
+    
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = self.client.get(self.prefix + key)
+        return json.loads(payload) if payload is not None else None
+    
+    def _set(self, key: str, payload: bytes):
+        self.client.set(self.prefix + key, payload, ex=self.ttl)
+
+
+def create_ocr_cache(backend: str = None) -> Optional[OCRCache]:
+    """
+    Create the configured OCR result cache
+    
+    Args:
+        backend: One of OCR_CACHE_BACKENDS (default: OCR_CACHE_BACKEND or "disk")
+        
+    Returns:
+        OCRCache: Cache instance, or None when caching is disabled
+    """
+    backend = (backend or os.getenv("OCR_CACHE_BACKEND", "disk")).lower()
+    
+    if backend == "disk":
+        return DiskOCRCache()
+    if backend == "redis":
+        return RedisOCRCache()
+    if backend == "none":
+        return None
+    
+    raise ValueError(f"Unknown OCR cache backend '{backend}'. Available: {', '.join(OCR_CACHE_BACKENDS)}")
@@ -1,39 +1,67 @@
 """
 Category classifier using Sentence-BERT + Logistic Regression
 """
-from sentence_transformers import SentenceTransformer
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import LabelEncoder
 import numpy as np
 import pickle
 import os
+import random
 from typing import Dict, Any, List
 from datetime import datetime
 
+from data_manager.embedding_cache import create_embedding_cache, encoder_fingerprint
 from ml.config import CATEGORIES, CATEGORY_KEYWORDS, MODEL_CONFIG
+from ml.encoders import ENCODER_BACKEND, load_encoder
+from ml.keyword_prior import KeywordPrior
 from monitoring.logging_config import get_logger
+from monitoring.metrics import keyword_prior_predictions_total, keyword_prior_audits_total
 
 logger = get_logger(__name__)
 
+# Texts per encoder forward pass in predict_batch
+ENCODE_BATCH_SIZE = int(os.getenv("BATCH_SIZE", "32"))
+
+# Decide clear-cut receipts from CATEGORY_KEYWORDS without running the encoder
+KEYWORD_PRIOR_ENABLED = os.getenv("KEYWORD_PRIOR_ENABLED", "false").lower() == "true"
+
+# Share of keyword decisions also run through the model to measure agreement
+KEYWORD_PRIOR_AUDIT_RATE = float(os.getenv("KEYWORD_PRIOR_AUDIT_RATE", "0.05"))
+
 
 class CategoryClassifier:
     """Category classification using sentence embeddings"""
     
-    def __init__(self, model_dir: str = None):
+    def __init__(self, model_dir: str = None, encoder_backend: str = None, keyword_prior: bool = None):
         """
         Initialize category classifier
         
         Args:
             model_dir: Directory containing model artifacts
+            encoder_backend: "torch" or "onnx" (defaults to ENCODER_BACKEND env var);
+                onnx needs a model exported with `python -m ml.encoders`
+            keyword_prior: Short-circuit decisive keyword matches
+                (defaults to KEYWORD_PRIOR_ENABLED env var)
         """
         self.models_dir = os.getenv("MODELS_DIR", "./models")
         self.model_dir = model_dir
+        self.encoder_backend = encoder_backend or ENCODER_BACKEND
+        
+        if keyword_prior is None:
+            keyword_prior = KEYWORD_PRIOR_ENABLED
+        self.keyword_prior = KeywordPrior() if keyword_prior else None
+        self.audit_rate = KEYWORD_PRIOR_AUDIT_RATE
+        self._audit_random = random.Random()
         
         # Initialize components
         self.encoder = None
         self.classifier = None
         self.label_encoder = None
         
+        # Embedding cache of the current encoder, created on first encode
+        self.embedding_cache = None
+        self._cached_encoder = None
+        
         # Load model if directory specified
         if model_dir and os.path.exists(model_dir):
             self.load_model(model_dir)
@@ -70,8 +98,8 @@ class CategoryClassifier:
         """Initialize new untrained model"""
         logger.info("Initializing new model components")
         
-        # Load Sentence-BERT encoder
-        self.encoder = SentenceTransformer(MODEL_CONFIG["encoder_model"])
+        # Load Sentence-BERT encoder (pretrained weights, torch backend)
+        self.encoder = load_encoder()
         
         # Initialize classifier (will be trained later)
         self.classifier = LogisticRegression(
@@ -96,11 +124,7 @@ class CategoryClassifier:
             logger.info(f"Loading model from {model_dir}")
             
             # Load encoder
-            encoder_path = os.path.join(model_dir, "encoder_model")
-            if os.path.exists(encoder_path):
-                self.encoder = SentenceTransformer(encoder_path)
-            else:
-                self.encoder = SentenceTransformer(MODEL_CONFIG["encoder_model"])
+            self.encoder = load_encoder(model_dir, self.encoder_backend)
             
             # Load classifier
             classifier_path = os.path.join(model_dir, "classifier.pkl")
@@ -139,8 +163,7 @@ class CategoryClassifier:
             os.makedirs(model_path, exist_ok=True)
             
             # Save encoder
-            encoder_path = os.path.join(model_path, "encoder_model")
-            self.encoder.save(encoder_path)
+            self.encoder.save(model_path)
             
             # Save classifier
             classifier_path = os.path.join(model_path, "classifier.pkl")
@@ -171,45 +194,152 @@ class CategoryClassifier:
         Returns:
             dict: Prediction result with category and confidence
         """
-        try:
-            # Prepare text for encoding
-            combined_text = self._prepare_text(text, entities)
-            
-            # Generate embedding
-            embedding = self.encoder.encode([combined_text])[0]
+        result = self.predict_batch([text], [entities])[0]
+        logger.info(f"Predicted category: {result['category']} (confidence: {result['confidence']:.2%})")
+        
+        return result
+    
+    def predict_batch(self, texts: List[str], entities_list: List[Dict[str, Any]] = None,
+                      batch_size: int = None) -> List[Dict[str, Any]]:
+        """
+        Predict categories for many receipts with one encode call
+        
+        With the keyword prior on, receipts it decides skip the encoder; a
+        sample of them (audit_rate) still goes through the model, and
+        agreement is counted in keyword_prior_audits_total.
+        
+        Args:
+            texts: Receipt texts
+            entities_list: Optional extracted entities, one per text
+            batch_size: Texts per encoder forward pass
+                (defaults to BATCH_SIZE env var)
             
-            # Predict
-            prediction = self.classifier.predict([embedding])[0]
-            probabilities = self.classifier.predict_proba([embedding])[0]
+        Returns:
+            list: Prediction results in input order, as returned by predict
+        """
+        if not texts:
+            return []
+        
+        entities_list = entities_list or [None] * len(texts)
+        results = [None] * len(texts)
+        audited = set()
+        
+        if self.keyword_prior is not None:
+            for i, (text, entities) in enumerate(zip(texts, entities_list)):
+                results[i] = self.keyword_prior.classify(self._prior_text(text, entities))
+                if results[i] is not None and self._audit_random.random() < self.audit_rate:
+                    audited.add(i)
+            
+            short_circuited = sum(result is not None for result in results)
+            keyword_prior_predictions_total.labels(outcome="short_circuit").inc(short_circuited)
+            keyword_prior_predictions_total.labels(outcome="model").inc(len(texts) - short_circuited)
+        
+        rows = [i for i, result in enumerate(results) if result is None or i in audited]
+        if rows:
+            model_results = self._predict_model([texts[i] for i in rows], [entities_list[i] for i in rows],
+                                                batch_size)
+            for i, model_result in zip(rows, model_results):
+                if results[i] is None:
+                    results[i] = model_result
+                elif model_result["confidence"] > 0:
+                    agreement = "agree" if model_result["category"] == results[i]["category"] else "disagree"
+                    keyword_prior_audits_total.labels(agreement=agreement).inc()
+        
+        return results
+    
+    def _predict_model(self, texts: List[str], entities_list: List[Dict[str, Any]],
+                       batch_size: int = None) -> List[Dict[str, Any]]:
+        """
+        Embedding model predictions
+        
+        Probabilities are computed once for the whole batch; labels come from
+        their argmax and the low-confidence fallback to "Khác" is applied to
+        all rows at once.
+        """
+        try:
+            combined_texts = [
+                self._prepare_text(text, entities) for text, entities in zip(texts, entities_list)
+            ]
+            embeddings = self.encode(combined_texts, batch_size=batch_size)
+            probabilities = self.classifier.predict_proba(embeddings)
             
-            # Get category and confidence
-            category = self.label_encoder.inverse_transform([prediction])[0]
-            confidence = float(max(probabilities))
+            # Probability columns follow the encoded labels seen in training
+            labels = self.label_encoder.classes_[self.classifier.classes_]
+            best = probabilities.argmax(axis=1)
+            confidences = probabilities[np.arange(len(best)), best]
             
             # If confidence is low, default to "Khác"
-            min_confidence = MODEL_CONFIG["min_confidence_threshold"]
-            if confidence < min_confidence:
-                logger.warning(f"Low confidence ({confidence:.2%}), defaulting to 'Khác'")
-                category = "Khác"
-            
-            logger.info(f"Predicted category: {category} (confidence: {confidence:.2%})")
-            
-            return {
-                "category": category,
-                "confidence": confidence,
-                "all_probabilities": {
-                    cat: float(prob)
-                    for cat, prob in zip(self.label_encoder.classes_, probabilities)
+            low_confidence = confidences < MODEL_CONFIG["min_confidence_threshold"]
+            categories = np.where(low_confidence, "Khác", labels[best])
+            if low_confidence.any():
+                logger.warning(f"Low confidence for {int(low_confidence.sum())}/{len(texts)} "
+                               f"receipts, defaulting to 'Khác'")
+            
+            label_names = labels.tolist()
+            return [
+                {
+                    "category": str(category),
+                    "confidence": float(confidence),
+                    "all_probabilities": dict(zip(label_names, row))
                 }
-            }
+                for category, confidence, row in zip(categories, confidences, probabilities.tolist())
+            ]
             
         except Exception as e:
             logger.error(f"Prediction error: {str(e)}")
-            return {
-                "category": "Khác",
-                "confidence": 0.0,
-                "all_probabilities": {}
-            }
+            return [
+                {
+                    "category": "Khác",
+                    "confidence": 0.0,
+                    "all_probabilities": {}
+                }
+                for _ in texts
+            ]
+    
+    def encode(self, texts: List[str], batch_size: int = None,
+               show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Sentence embeddings, served from the embedding cache when possible
+        
+        Only texts missing from the cache reach the encoder. The cache is
+        keyed by the encoder's fingerprint, so it follows load_model.
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Texts per encoder forward pass
+                (defaults to BATCH_SIZE env var)
+            show_progress_bar: Show the encoder's progress bar
+        
+        Returns:
+            np.ndarray: One embedding row per text
+        """
+        batch_size = batch_size or ENCODE_BATCH_SIZE
+        
+        def encode_texts(batch: List[str]) -> np.ndarray:
+            return self.encoder.encode(batch, batch_size=batch_size, show_progress_bar=show_progress_bar)
+        
+        if self._cached_encoder is not self.encoder:
+            self._cached_encoder = self.encoder
+            try:
+                self.embedding_cache = create_embedding_cache(encoder_fingerprint(self.encoder))
+            except Exception as e:
+                logger.error(f"Embedding cache unavailable: {str(e)}")
+                self.embedding_cache = None
+        
+        if self.embedding_cache is None:
+            return encode_texts(list(texts))
+        return self.embedding_cache.encode(texts, encode_texts)
+    
+    def _prior_text(self, text: str, entities: Dict[str, Any] = None) -> str:
+        """
+        Text for the keyword prior: merchant name and items when extracted
+        
+        Headers and labels ("Điện thoại:", street names) carry keywords of
+        the wrong category, so the raw text is only used without entities.
+        """
+        if entities and (entities.get("merchant_name") or entities.get("items")):
+            return "\n".join([entities.get("merchant_name") or ""] + list(entities.get("items") or []))
+        return text
     
     def _prepare_text(self, text: str, entities: Dict[str, Any] = None) -> str:
         """
@@ -252,7 +382,7 @@ class CategoryClassifier:
             
             # Encode texts
             logger.info("Encoding training texts...")
-            X_embeddings = self.encoder.encode(X_train, show_progress_bar=True)
+            X_embeddings = self.encode(X_train, show_progress_bar=True)
             
             # Encode labels
             y_encoded = self.label_encoder.transform(y_train)
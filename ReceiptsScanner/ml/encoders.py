@@ -0,0 +1,297 @@
+"""
+Sentence encoder backends for the category classifier
+
+- torch: SentenceTransformer in PyTorch fp32 (training and default inference)
+- onnx: the same transformer exported to ONNX with int8 dynamic quantization,
+  run with ONNX Runtime; tokenization uses the `tokenizers` library, so
+  neither torch nor sentence-transformers is imported
+
+The ONNX model lives next to the classifier in the versioned model directory
+(encoder_onnx/) and is written by `python -m ml.encoders --model-dir ...`.
+"""
+import hashlib
+import json
+import os
+import shutil
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+
+from ml.config import MODEL_CONFIG
+from monitoring.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ENCODER_BACKENDS = ("torch", "onnx")
+
+# Encoder used by CategoryClassifier.load_model; onnx needs an exported model
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch").lower()
+
+# ONNX Runtime intra-op threads (0 = one per physical core)
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "0"))
+
+TORCH_ENCODER_DIR = "encoder_model"
+ONNX_ENCODER_DIR = "encoder_onnx"
+
+
+class SentenceEncoder(ABC):
+    """Text to fixed-size embedding"""
+    
+    backend = "base"
+    
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Embed texts
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Texts per forward pass
+            show_progress_bar: Show a progress bar (torch backend only)
+        
+        Returns:
+            np.ndarray: float32 matrix, one row per text
+        """
+        pass
+    
+    @abstractmethod
+    def cache_identity(self) -> str:
+        """String that changes whenever the encoder's outputs would (see embedding_cache)"""
+        pass
+    
+    @abstractmethod
+    def save(self, model_path: str):
+        """
+        Write the encoder into a versioned model directory
+        
+        Args:
+            model_path: Model version directory (e.g. models/category_clf_v...)
+        """
+        pass
+
+
+class TorchSentenceEncoder(SentenceEncoder):
+    """SentenceTransformer in PyTorch"""
+    
+    backend = "torch"
+    
+    def __init__(self, name_or_path: str = None):
+        """
+        Load a SentenceTransformer
+        
+        Args:
+            name_or_path: Hub name or saved encoder directory
+                (defaults to MODEL_CONFIG["encoder_model"])
+        """
+        from sentence_transformers import SentenceTransformer
+        
+        self.model = SentenceTransformer(name_or_path or MODEL_CONFIG["encoder_model"])
+    
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar)
+    
+    def cache_identity(self) -> str:
+        from data_manager.embedding_cache import encoder_fingerprint
+        return encoder_fingerprint(self.model)
+    
+    def save(self, model_path: str):
+        self.model.save(os.path.join(model_path, TORCH_ENCODER_DIR))
+
+
+class OnnxSentenceEncoder(SentenceEncoder):
+    """Exported (int8-quantized) transformer run with ONNX Runtime, pooled in numpy"""
+    
+    backend = "onnx"
+    
+    def __init__(self, model_path: str, num_threads: int = None):
+        """
+        Load an exported encoder
+        
+        Args:
+            model_path: Model version directory containing encoder_onnx/
+            num_threads: ONNX Runtime intra-op threads (defaults to ONNX_NUM_THREADS)
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+        
+        self.model_path = model_path
+        onnx_dir = os.path.join(model_path, ONNX_ENCODER_DIR)
+        with open(os.path.join(onnx_dir, "config.json")) as f:
+            self.config = json.load(f)
+        
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = ONNX_NUM_THREADS if num_threads is None else num_threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = os.path.join(onnx_dir, "model.onnx")
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        
+        digest = hashlib.sha256()
+        with open(model_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self.digest = digest.hexdigest()
+        
+        self.tokenizer = Tokenizer.from_file(os.path.join(onnx_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+        
+        logger.info(f"ONNX encoder loaded from {onnx_dir} "
+                   f"(quantized: {self.config['quantized']}, pooling: {self.config['pooling']})")
+    
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.config["dimension"]), dtype=np.float32)
+        
+        # Similar lengths per batch keep padding short, as SentenceTransformer does
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in rows])
+            ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            
+            inputs = {"input_ids": ids, "attention_mask": mask}
+            tokens = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+            embeddings[rows] = self._pool(tokens, mask)
+        
+        return embeddings
+    
+    def _pool(self, tokens: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Sentence vectors from token embeddings, as the exported Pooling module"""
+        pooling = self.config["pooling"]
+        if pooling == "cls":
+            pooled = tokens[:, 0]
+        elif pooling == "max":
+            pooled = np.where(mask[..., None] > 0, tokens, -1e9).max(axis=1)
+        else:
+            weights = mask[..., None].astype(np.float32)
+            pooled = (tokens * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        
+        if self.config["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+    
+    def cache_identity(self) -> str:
+        return f"onnx:{self.digest}"
+    
+    def save(self, model_path: str):
+        # Keep the torch weights (needed for re-export and training) and the export
+        for name in (TORCH_ENCODER_DIR, ONNX_ENCODER_DIR):
+            source = os.path.join(self.model_path, name)
+            if os.path.exists(source) and os.path.abspath(source) != os.path.abspath(os.path.join(model_path, name)):
+                shutil.copytree(source, os.path.join(model_path, name), dirs_exist_ok=True)
+
+
+def load_encoder(model_path: str = None, backend: str = None) -> SentenceEncoder:
+    """
+    Load the sentence encoder of a model version
+    
+    Args:
+        model_path: Model version directory; None loads the pretrained
+            MODEL_CONFIG["encoder_model"] with the torch backend
+        backend: One of ENCODER_BACKENDS (defaults to ENCODER_BACKEND)
+    
+    Returns:
+        SentenceEncoder: Loaded encoder; torch when the ONNX export is missing
+    """
+    backend = (backend or ENCODER_BACKEND).lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend}. Available: {', '.join(ENCODER_BACKENDS)}")
+    
+    if backend == "onnx":
+        if model_path and os.path.exists(os.path.join(model_path, ONNX_ENCODER_DIR, "model.onnx")):
+            return OnnxSentenceEncoder(model_path)
+        logger.warning(f"No ONNX encoder in {model_path}; run `python -m ml.encoders` to export it. "
+                       f"Falling back to torch")
+    
+    encoder_path = os.path.join(model_path, TORCH_ENCODER_DIR) if model_path else None
+    if encoder_path and os.path.exists(encoder_path):
+        return TorchSentenceEncoder(encoder_path)
+    return TorchSentenceEncoder()
+
+
+def export_onnx(model_path: str, quantize: bool = True, opset: int = 14) -> str:
+    """
+    Export a model version's encoder to ONNX, int8 dynamically quantized
+    
+    Writes encoder_onnx/ (model.onnx, tokenizer.json, config.json) into the
+    model directory. Needs torch, sentence-transformers and onnxruntime.
+    
+    Args:
+        model_path: Model version directory
+        quantize: Quantize weights of linear layers to int8
+        opset: ONNX opset version
+    
+    Returns:
+        str: Path of the exported model.onnx
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    
+    encoder = load_encoder(model_path, backend="torch").model
+    transformer, pooling = encoder[0], encoder[1]
+    out_dir = os.path.join(model_path, ONNX_ENCODER_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    
+    features = transformer.tokenizer(["Siêu thị Co.op", "Tổng cộng 125.000"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask") if name in features]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+    
+    fp32_path = os.path.join(out_dir, "model_fp32.onnx")
+    model_file = os.path.join(out_dir, "model.onnx")
+    transformer.auto_model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer.auto_model,
+            tuple(features[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    
+    if quantize:
+        quantize_dynamic(fp32_path, model_file, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+    else:
+        os.replace(fp32_path, model_file)
+    
+    transformer.tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, "config.json"), "w") as f:
+        json.dump({
+            "max_seq_length": encoder.max_seq_length,
+            "dimension": encoder.get_sentence_embedding_dimension(),
+            "pooling": pooling.get_pooling_mode_str(),
+            "normalize": any(type(module).__name__ == "Normalize" for module in encoder),
+            "pad_token": transformer.tokenizer.pad_token,
+            "pad_token_id": transformer.tokenizer.pad_token_id,
+            "quantized": quantize,
+            "opset": opset
+        }, f, indent=2)
+    
+    logger.info(f"Exported ONNX encoder to {model_file} ({os.path.getsize(model_file)} bytes)")
+    return model_file
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Export a model version's encoder to ONNX")
+    parser.add_argument("--model-dir", default=None, help="Model version directory (default: latest)")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep fp32 weights")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    
+    model_dir = args.model_dir
+    if not model_dir:
+        models_dir = os.getenv("MODELS_DIR", "./models")
+        versions = sorted(d for d in os.listdir(models_dir) if d.startswith("category_clf_v"))
+        if not versions:
+            parser.error(f"No trained model in {models_dir}")
+        model_dir = os.path.join(models_dir, versions[-1])
+    
+    path = export_onnx(model_dir, quantize=not args.no_quantize, opset=args.opset)
+    print(f"\nExported: {path}")
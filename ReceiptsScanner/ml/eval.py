@@ -56,13 +56,9 @@ def evaluate_model(model_dir: str = None, test_data_path: str = None):
     y_true = df['category'].tolist()
     
     # Make predictions
-    y_pred = []
-    confidences = []
-    
-    for text in X_test:
-        result = classifier.predict(text)
-        y_pred.append(result['category'])
-        confidences.append(result['confidence'])
+    results = classifier.predict_batch(X_test)
+    y_pred = [result['category'] for result in results]
+    confidences = [result['confidence'] for result in results]
     
     # Calculate metrics
     accuracy = accuracy_score(y_true, y_pred)
@@ -0,0 +1,228 @@
+"""
+Keyword pre-classifier over CATEGORY_KEYWORDS
+
+An Aho-Corasick automaton over the accent-folded keywords finds every
+keyword in one pass over the receipt text. Matching is accent-aware: a
+match counts in full when the text has the keyword's exact diacritics, at
+a reduced weight when the text has none (OCR dropped them), and not at all
+when the diacritics differ ("bán" on every sales receipt is not "bàn").
+Overlapping matches keep the longest one, so "thực phẩm chức năng" is not
+also "thực phẩm".
+
+When one category's score is high enough and far enough ahead of the
+runner-up, CategoryClassifier returns it without running the encoder.
+"Khác" keywords are matched (so they still claim their text) but left out
+of the decision, since "hóa đơn" and "thanh toán" are printed on most
+receipts; "Khác" itself is only ever predicted by the model.
+"""
+import os
+import unicodedata
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from ml.config import CATEGORY_KEYWORDS
+
+# Minimum winning score (one point per keyword word, see KeywordPrior)
+KEYWORD_PRIOR_MIN_SCORE = float(os.getenv("KEYWORD_PRIOR_MIN_SCORE", "2.0"))
+
+# Minimum (top - runner-up) / top for a decisive prediction
+KEYWORD_PRIOR_MARGIN = float(os.getenv("KEYWORD_PRIOR_MARGIN", "0.6"))
+
+# Weight of a match found only after stripping diacritics from the text
+KEYWORD_PRIOR_FOLDED_WEIGHT = float(os.getenv("KEYWORD_PRIOR_FOLDED_WEIGHT", "0.5"))
+
+# Matched but never scored by classify
+IGNORED_CATEGORIES = ("Khác",)
+
+
+def fold_char(char: str) -> str:
+    """Base letter of a lowercase character ("ệ" -> "e", "đ" -> "d")"""
+    if char == "đ":
+        return "d"
+    return unicodedata.normalize("NFD", char)[0]
+
+
+def prepare(text: str) -> Tuple[str, str]:
+    """
+    Lowercased NFC text and its accent-folded form
+    
+    Folding is per character, so offsets in both strings line up.
+    
+    Returns:
+        tuple: (lowered, folded)
+    """
+    lowered = unicodedata.normalize("NFC", text).lower()
+    return lowered, "".join(fold_char(char) for char in lowered)
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over a fixed set of patterns"""
+    
+    def __init__(self, patterns: List[str]):
+        """
+        Build goto, failure and output tables
+        
+        Args:
+            patterns: Non-empty strings to search for
+        """
+        self.patterns = patterns
+        self.goto: List[Dict[str, int]] = [{}]
+        self.outputs: List[List[int]] = [[]]
+        
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.outputs.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.outputs[node].append(index)
+        
+        # Breadth-first: a node's failure target is always shallower
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                target = self.fail[node]
+                while target and char not in self.goto[target]:
+                    target = self.fail[target]
+                self.fail[child] = self.goto[target].get(char, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+    
+    def search(self, text: str) -> List[Tuple[int, int]]:
+        """
+        All occurrences, overlapping ones included
+        
+        Returns:
+            list: (start offset, pattern index) per occurrence
+        """
+        matches = []
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for index in self.outputs[node]:
+                matches.append((end - len(self.patterns[index]), index))
+        return matches
+
+
+class KeywordPrior:
+    """Weighted keyword scores per category and the decisive-margin rule"""
+    
+    def __init__(self, keywords: Dict[str, List[str]] = None, min_score: float = None,
+                 margin: float = None, folded_weight: float = None):
+        """
+        Build the automaton
+        
+        A keyword scores one point per word (multi-word keywords are more
+        specific), split evenly when it is listed under several categories.
+        
+        Args:
+            keywords: Category -> keywords (defaults to CATEGORY_KEYWORDS)
+            min_score: Minimum winning score (defaults to KEYWORD_PRIOR_MIN_SCORE)
+            margin: Minimum relative lead (defaults to KEYWORD_PRIOR_MARGIN)
+            folded_weight: Weight of matches on text without diacritics
+                (defaults to KEYWORD_PRIOR_FOLDED_WEIGHT)
+        """
+        self.min_score = KEYWORD_PRIOR_MIN_SCORE if min_score is None else min_score
+        self.margin = KEYWORD_PRIOR_MARGIN if margin is None else margin
+        self.folded_weight = KEYWORD_PRIOR_FOLDED_WEIGHT if folded_weight is None else folded_weight
+        
+        # Keyword form -> categories listing it
+        categories_of = defaultdict(set)
+        for category, words in (keywords or CATEGORY_KEYWORDS).items():
+            for word in words:
+                lowered, _ = prepare(" ".join(word.split()))
+                if lowered:
+                    categories_of[lowered].add(category)
+        
+        # Folded pattern -> [(keyword form, {category: weight})]
+        forms = defaultdict(list)
+        for form, categories in categories_of.items():
+            weight = len(form.split()) / len(categories)
+            forms[prepare(form)[1]].append((form, {category: weight for category in categories}))
+        
+        self.folded_patterns = list(forms)
+        self.forms = [forms[pattern] for pattern in self.folded_patterns]
+        self.automaton = KeywordAutomaton(self.folded_patterns)
+    
+    def matches(self, text: str) -> List[Tuple[str, Dict[str, float]]]:
+        """
+        Keywords found in text, non-overlapping, longest first
+        
+        Returns:
+            list: (keyword, {category: weight}) per accepted match
+        """
+        lowered, folded = prepare(text)
+        candidates = []
+        
+        for start, index in self.automaton.search(folded):
+            end = start + len(self.folded_patterns[index])
+            
+            # Whole words only
+            if (start > 0 and folded[start - 1].isalnum()) or (end < len(folded) and folded[end].isalnum()):
+                continue
+            
+            span = lowered[start:end]
+            bare = span == folded[start:end]
+            for form, weights in self.forms[index]:
+                if span == form:
+                    candidates.append((start, end, form, weights))
+                elif bare:
+                    candidates.append((start, end, form, {c: w * self.folded_weight for c, w in weights.items()}))
+        
+        # Longest first; a character belongs to one keyword span
+        accepted = []
+        owner = [None] * len(folded)
+        for start, end, form, weights in sorted(candidates, key=lambda match: (match[0] - match[1], match[0])):
+            if set(owner[start:end]) <= {None, (start, end)}:
+                owner[start:end] = [(start, end)] * (end - start)
+                accepted.append((form, weights))
+        
+        return accepted
+    
+    def scores(self, text: str) -> Dict[str, float]:
+        """Summed keyword weights per category (categories with no match omitted)"""
+        scores = defaultdict(float)
+        for _, weights in self.matches(text):
+            for category, weight in weights.items():
+                scores[category] += weight
+        return dict(scores)
+    
+    def classify(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Category from keywords when the lead is decisive
+        
+        Args:
+            text: Text prepared for classification
+        
+        Returns:
+            dict: Result shaped like CategoryClassifier.predict (confidence is
+                the winner's share of keyword weight), or None to fall back
+                to the embedding model
+        """
+        scores = {
+            category: score for category, score in self.scores(text).items()
+            if category not in IGNORED_CATEGORIES
+        }
+        if not scores:
+            return None
+        
+        ranked = sorted(scores.values(), reverse=True)
+        top = ranked[0]
+        runner_up = ranked[1] if len(ranked) > 1 else 0.0
+        if top < self.min_score or (top - runner_up) / top < self.margin:
+            return None
+        
+        category = max(scores, key=scores.get)
+        
+        total = sum(scores.values())
+        return {
+            "category": category,
+            "confidence": top / total,
+            "all_probabilities": {name: score / total for name, score in scores.items()}
+        }
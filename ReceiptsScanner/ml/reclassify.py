@@ -0,0 +1,92 @@
+"""
+Reclassify stored receipts with the current model
+"""
+import os
+from typing import Any, Dict, List
+
+from data_manager.base import DataAdapter
+from ml.category_classifier import CategoryClassifier
+from monitoring.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Receipts per predict_batch and save_receipts call
+RECLASSIFY_BATCH_SIZE = int(os.getenv("RECLASSIFY_BATCH_SIZE", "512"))
+
+
+def reclassify_receipts(data_adapter: DataAdapter, classifier: CategoryClassifier = None,
+                        batch_size: int = None, include_corrected: bool = False) -> Dict[str, Any]:
+    """
+    Predict categories for stored receipts and save the ones that changed
+    
+    Receipts corrected by a user keep their category unless
+    include_corrected is set.
+    
+    Args:
+        data_adapter: Storage holding the receipts
+        classifier: Classifier to use (defaults to the latest trained model)
+        batch_size: Receipts per prediction/save batch
+            (defaults to RECLASSIFY_BATCH_SIZE)
+        include_corrected: Also overwrite corrected receipts
+    
+    Returns:
+        dict: Counts of scanned, updated and failed receipts
+    """
+    classifier = classifier or CategoryClassifier()
+    batch_size = batch_size or RECLASSIFY_BATCH_SIZE
+    receipts = [
+        receipt for receipt in data_adapter.list_receipts()
+        if receipt.get("raw_text") and (include_corrected or not receipt.get("corrected"))
+    ]
+    
+    stats = {"scanned": len(receipts), "updated": 0, "failed": 0}
+    
+    for start in range(0, len(receipts), batch_size):
+        batch = receipts[start:start + batch_size]
+        results = classifier.predict_batch(
+            [receipt["raw_text"] for receipt in batch],
+            [{"merchant_name": receipt.get("merchant_name"), "items": receipt.get("items")}
+             for receipt in batch]
+        )
+        
+        # A failed prediction comes back with confidence 0 and changes nothing
+        changed: List[Dict[str, Any]] = [
+            {**receipt, "category": result["category"], "confidence": result["confidence"]}
+            for receipt, result in zip(batch, results)
+            if result["confidence"] > 0 and (
+                receipt.get("category") != result["category"]
+                or receipt.get("confidence") != result["confidence"]
+            )
+        ]
+        if not changed:
+            continue
+        
+        if data_adapter.save_receipts(changed):
+            stats["updated"] += len(changed)
+        else:
+            stats["failed"] += len(changed)
+    
+    logger.info(f"Reclassification finished: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Reclassify stored receipts")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--include-corrected", action="store_true")
+    args = parser.parse_args()
+    
+    if os.getenv("STORAGE_BACKEND", "json") == "s3":
+        from data_manager.s3_adapter import S3DataAdapter
+        adapter = S3DataAdapter()
+    else:
+        from data_manager.json_adapter import JSONDataAdapter
+        adapter = JSONDataAdapter()
+    
+    result = reclassify_receipts(adapter, CategoryClassifier(model_dir=args.model_dir),
+                                 args.batch_size, args.include_corrected)
+    print(f"\nScanned: {result['scanned']}  Updated: {result['updated']}  "
+          f"Failed: {result['failed']}")
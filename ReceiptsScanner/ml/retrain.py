@@ -142,7 +142,7 @@ def retrain_model(corrections_data: List[Dict] = None) -> Dict:
     train_metrics = classifier.train(X_train, y_train)
     
     # Evaluate on test set
-    test_embeddings = classifier.encoder.encode(X_test)
+    test_embeddings = classifier.encode(X_test)
     y_test_encoded = classifier.label_encoder.transform(y_test)
     test_accuracy = classifier.classifier.score(test_embeddings, y_test_encoded)
     
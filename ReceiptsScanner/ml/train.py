@@ -162,7 +162,7 @@ def train_initial_model():
     
     # Evaluate on test set
     logger.info("Evaluating on test set...")
-    test_embeddings = classifier.encoder.encode(X_test)
+    test_embeddings = classifier.encode(X_test)
     y_test_encoded = classifier.label_encoder.transform(y_test)
     test_score = classifier.classifier.score(test_embeddings, y_test_encoded)
     
@@ -48,6 +48,108 @@ classification_confidence_score = Histogram(
     buckets=(0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
 )
 
+# Preprocessing Metrics
+preprocessing_recipe_total = Counter(
+    'preprocessing_recipe_total',
+    'Images preprocessed per denoising recipe',
+    ['recipe']
+)
+
+preprocessing_duration_seconds = Histogram(
+    'preprocessing_duration_seconds',
+    'Image preprocessing duration in seconds',
+    ['recipe'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+preprocessing_crop_pixels_saved = Histogram(
+    'preprocessing_crop_pixels_saved',
+    'Pixels removed per image by cropping to the receipt region',
+    buckets=(0, 1e5, 5e5, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6)
+)
+
+# OCR Cache Metrics
+ocr_cache_hits_total = Counter(
+    'ocr_cache_hits_total',
+    'OCR result cache hits',
+    ['backend']
+)
+
+ocr_cache_misses_total = Counter(
+    'ocr_cache_misses_total',
+    'OCR result cache misses',
+    ['backend']
+)
+
+# Embedding Cache Metrics
+embedding_cache_hits_total = Counter(
+    'embedding_cache_hits_total',
+    'Sentence embedding cache hits',
+    ['level']
+)
+
+embedding_cache_misses_total = Counter(
+    'embedding_cache_misses_total',
+    'Sentence embedding cache misses (texts sent to the encoder)'
+)
+
+embedding_cache_hit_ratio = Gauge(
+    'embedding_cache_hit_ratio',
+    'Share of embedding lookups served from the cache since process start'
+)
+
+embedding_cache_bytes = Gauge(
+    'embedding_cache_bytes',
+    'Bytes used by the sentence embedding cache',
+    ['level']
+)
+
+# OCR Cascade Metrics
+ocr_cascade_results_total = Counter(
+    'ocr_cascade_results_total',
+    'OCR results per cascade tier and gate decision',
+    ['tier', 'reason']
+)
+
+ocr_cascade_fast_confidence = Histogram(
+    'ocr_cascade_fast_confidence',
+    'Mean word confidence of the fast OCR tier',
+    buckets=(0.3, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0)
+)
+
+ocr_cascade_fast_coverage = Histogram(
+    'ocr_cascade_fast_coverage',
+    'Share of key entities (date, total) found in fast OCR tier text',
+    buckets=(0.0, 0.5, 1.0)
+)
+
+ocr_cascade_duration_seconds = Histogram(
+    'ocr_cascade_duration_seconds',
+    'OCR duration per cascade tier in seconds',
+    ['tier'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+)
+
+ocr_partial_result_seconds = Histogram(
+    'ocr_partial_result_seconds',
+    'Time from OCR start to the published header/footer partial result',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+)
+
+# Entity Extraction Metrics
+extraction_pattern_seconds = Histogram(
+    'extraction_pattern_seconds',
+    'Matching time per extraction pattern and receipt text in seconds',
+    ['group', 'pattern'],
+    buckets=(0.00001, 0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+
+extraction_pattern_budget_exceeded_total = Counter(
+    'extraction_pattern_budget_exceeded_total',
+    'Extraction pattern runs stopped after exceeding their time budget',
+    ['group', 'pattern']
+)
+
 # Celery Task Metrics
 celery_tasks_total = Counter(
     'celery_tasks_total',
@@ -98,6 +200,18 @@ model_predictions_total = Counter(
     ['category']
 )
 
+keyword_prior_predictions_total = Counter(
+    'keyword_prior_predictions_total',
+    'Category predictions decided by the keyword prior (short_circuit) or the embedding model',
+    ['outcome']
+)
+
+keyword_prior_audits_total = Counter(
+    'keyword_prior_audits_total',
+    'Keyword prior decisions re-checked with the embedding model',
+    ['agreement']
+)
+
 model_retraining_total = Counter(
     'model_retraining_total',
     'Total model retraining runs',
@@ -2,12 +2,27 @@
 Abstract OCR Adapter interface
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Sequence
+import asyncio
+import os
+import threading
 import numpy as np
 
+# Upper bound on concurrent extract_text calls made by the batch/async helpers
+OCR_BATCH_WORKERS = int(os.getenv("OCR_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+
+# Word box representation returned by engines: "dicts" or "columnar" (OCRBoxes)
+OCR_BOX_FORMAT = os.getenv("OCR_BOX_FORMAT", "dicts").lower()
+
+_executor_lock = threading.Lock()
+
 class OCRAdapter(ABC):
     """Abstract base class for OCR engines"""
     
+    batch_workers: int = OCR_BATCH_WORKERS
+    box_format: str = OCR_BOX_FORMAT
+    
     @abstractmethod
     def extract_text(self, image: np.ndarray) -> Dict[str, Any]:
         """
@@ -20,10 +35,66 @@ class OCRAdapter(ABC):
             dict with keys:
                 - text: Extracted text
                 - confidence: Overall confidence score (0-1)
-                - boxes: Optional bounding boxes for text regions
+                - boxes: Optional bounding boxes for text regions, as a
+                  list of dicts or OCRBoxes depending on box_format
         """
         pass
     
+    def extract_text_batch(self, images: Sequence[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        Extract text from several images
+        
+        The default fans extract_text out over the adapter's bounded thread
+        pool (batch_workers threads); engines override this when they can
+        share work between images.
+        
+        Args:
+            images: Images as numpy arrays
+            
+        Returns:
+            list: One extract_text result per image, in input order
+        """
+        if len(images) <= 1:
+            return [self.extract_text(image) for image in images]
+        
+        return list(self._get_executor().map(self.extract_text, images))
+    
+    async def extract_text_async(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Extract text without blocking the event loop
+        
+        The default runs extract_text on the adapter's bounded thread pool.
+        
+        Args:
+            image: Image as numpy array
+            
+        Returns:
+            dict: Same as extract_text
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.extract_text, image)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Thread pool shared by the batch/async helpers, created on first use"""
+        executor = getattr(self, "_batch_executor", None)
+        if executor is None:
+            with _executor_lock:
+                executor = getattr(self, "_batch_executor", None)
+                if executor is None:
+                    executor = ThreadPoolExecutor(
+                        max_workers=self.batch_workers,
+                        thread_name_prefix=f"{type(self).__name__}-batch"
+                    )
+                    self._batch_executor = executor
+        return executor
+    
+    def close(self):
+        """Release resources held by the adapter"""
+        executor = getattr(self, "_batch_executor", None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+            self._batch_executor = None
+    
     @abstractmethod
     def get_config(self) -> Dict[str, Any]:
         """
@@ -32,4 +103,4 @@ class OCRAdapter(ABC):
         Returns:
             dict: Configuration parameters
         """
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,272 @@
+"""
+Columnar OCR word boxes
+
+OCRBoxes stores word boxes as parallel arrays (struct of arrays) instead of a
+dict per word. It is built from Tesseract output without a Python loop per
+word, supports vectorized geometry queries, and has a compact binary
+encoding for task results and caches. The list-of-dicts format stays
+available through to_dicts() and the "dicts" box format.
+"""
+import base64
+import struct
+import zlib
+from typing import Dict, Any, List, Sequence, Union
+
+import numpy as np
+
+BOX_FORMATS = ("dicts", "columnar")
+
+# Binary layout: header, x/y/width/height arrays, confidence as uint16
+# (1e-4 steps), then UTF-8 words separated by NUL
+_MAGIC = b"OCRB"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBI")  # magic, version, flags, count
+_WIDE_COORDS = 1
+_COMPRESSED = 2
+_CONFIDENCE_STEPS = 10000
+
+
+class OCRBoxes:
+    """Word boxes as parallel arrays: text, x, y, width, height, confidence"""
+    
+    __slots__ = ("text", "x", "y", "width", "height", "confidence")
+    
+    def __init__(self, text: Sequence[str] = (), x=(), y=(), width=(), height=(), confidence=()):
+        self.text = list(text)
+        self.x = np.asarray(x, dtype=np.int32)
+        self.y = np.asarray(y, dtype=np.int32)
+        self.width = np.asarray(width, dtype=np.int32)
+        self.height = np.asarray(height, dtype=np.int32)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+    
+    @classmethod
+    def from_tesseract_data(cls, data: Dict[str, list]) -> "OCRBoxes":
+        """
+        Build boxes from pytesseract image_to_data DICT output
+        
+        Keeps rows whose integer confidence is positive, like the
+        list-of-dicts extraction.
+        
+        Args:
+            data: image_to_data output
+            
+        Returns:
+            OCRBoxes: Word boxes with confidence scaled to 0-1
+        """
+        if not data or not data.get("text"):
+            return cls()
+        
+        conf = np.asarray(data["conf"], dtype=np.float64)
+        keep = np.flatnonzero(np.trunc(conf) > 0)
+        texts = data["text"]
+        
+        return cls(
+            [texts[i] for i in keep],
+            np.asarray(data["left"])[keep],
+            np.asarray(data["top"])[keep],
+            np.asarray(data["width"])[keep],
+            np.asarray(data["height"])[keep],
+            conf[keep] / 100.0
+        )
+    
+    @classmethod
+    def from_dicts(cls, boxes: List[Dict[str, Any]]) -> "OCRBoxes":
+        """Build boxes from the list-of-dicts format"""
+        return cls(
+            [box["text"] for box in boxes],
+            [box["x"] for box in boxes],
+            [box["y"] for box in boxes],
+            [box["width"] for box in boxes],
+            [box["height"] for box in boxes],
+            [box["confidence"] for box in boxes]
+        )
+    
+    @classmethod
+    def concat(cls, parts: Sequence["OCRBoxes"]) -> "OCRBoxes":
+        """Concatenate several box sets in order"""
+        if not parts:
+            return cls()
+        
+        return cls(
+            [text for part in parts for text in part.text],
+            np.concatenate([part.x for part in parts]),
+            np.concatenate([part.y for part in parts]),
+            np.concatenate([part.width for part in parts]),
+            np.concatenate([part.height for part in parts]),
+            np.concatenate([part.confidence for part in parts])
+        )
+    
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert to the list-of-dicts format"""
+        return [
+            {
+                "text": text,
+                "x": x,
+                "y": y,
+                "width": width,
+                "height": height,
+                "confidence": confidence
+            }
+            for text, x, y, width, height, confidence in zip(
+                self.text, self.x.tolist(), self.y.tolist(), self.width.tolist(),
+                self.height.tolist(), self.confidence.tolist()
+            )
+        ]
+    
+    def __len__(self) -> int:
+        return len(self.text)
+    
+    def __getitem__(self, index) -> Union[Dict[str, Any], "OCRBoxes"]:
+        """A single box as a dict for an integer index, else a subset"""
+        if isinstance(index, (int, np.integer)):
+            return {
+                "text": self.text[index],
+                "x": int(self.x[index]),
+                "y": int(self.y[index]),
+                "width": int(self.width[index]),
+                "height": int(self.height[index]),
+                "confidence": float(self.confidence[index])
+            }
+        
+        rows = np.arange(len(self))[index]
+        return OCRBoxes(
+            [self.text[i] for i in rows],
+            self.x[rows], self.y[rows], self.width[rows], self.height[rows],
+            self.confidence[rows]
+        )
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, OCRBoxes):
+            return NotImplemented
+        return (
+            self.text == other.text
+            and all(np.array_equal(getattr(self, name), getattr(other, name))
+                    for name in ("x", "y", "width", "height", "confidence"))
+        )
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return f"OCRBoxes({len(self)} boxes)"
+    
+    @property
+    def right(self) -> np.ndarray:
+        return self.x + self.width
+    
+    @property
+    def bottom(self) -> np.ndarray:
+        return self.y + self.height
+    
+    @property
+    def center_y(self) -> np.ndarray:
+        return self.y + self.height / 2.0
+    
+    def shifted(self, dx: int = 0, dy: int = 0) -> "OCRBoxes":
+        """Boxes translated by (dx, dy)"""
+        return OCRBoxes(self.text, self.x + dx, self.y + dy, self.width, self.height,
+                        self.confidence)
+    
+    def scaled(self, factor: float) -> "OCRBoxes":
+        """Boxes with coordinates and sizes multiplied by factor (rounded)"""
+        return OCRBoxes(
+            self.text,
+            np.rint(self.x * factor), np.rint(self.y * factor),
+            np.rint(self.width * factor), np.rint(self.height * factor),
+            self.confidence
+        )
+    
+    def to_bytes(self, compress: bool = True) -> bytes:
+        """
+        Compact binary encoding
+        
+        Coordinates are stored as uint16 when they fit (int32 otherwise) and
+        confidence as uint16 in 1e-4 steps.
+        
+        Args:
+            compress: zlib-compress the payload
+            
+        Returns:
+            bytes: Encoded boxes
+        """
+        coords = np.stack([self.x, self.y, self.width, self.height]) if len(self) else \
+            np.zeros((4, 0), dtype=np.int32)
+        flags = 0
+        if coords.size and (coords.min() < 0 or coords.max() > 0xFFFF):
+            flags |= _WIDE_COORDS
+            coords = coords.astype("<i4")
+        else:
+            coords = coords.astype("<u2")
+        
+        confidence = np.rint(np.clip(self.confidence, 0.0, 1.0) * _CONFIDENCE_STEPS).astype("<u2")
+        words = "\x00".join(self.text).encode("utf-8")
+        
+        payload = coords.tobytes() + confidence.tobytes() + words
+        if compress:
+            flags |= _COMPRESSED
+            payload = zlib.compress(payload, 6)
+        
+        return _HEADER.pack(_MAGIC, _VERSION, flags, len(self)) + payload
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "OCRBoxes":
+        """Decode boxes produced by to_bytes"""
+        magic, version, flags, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not an encoded OCRBoxes payload")
+        
+        payload = bytes(data[_HEADER.size:])
+        if flags & _COMPRESSED:
+            payload = zlib.decompress(payload)
+        
+        coord_dtype = np.dtype("<i4") if flags & _WIDE_COORDS else np.dtype("<u2")
+        coord_bytes = 4 * count * coord_dtype.itemsize
+        coords = np.frombuffer(payload, dtype=coord_dtype, count=4 * count).reshape(4, count)
+        confidence = np.frombuffer(payload, dtype="<u2", count=count, offset=coord_bytes)
+        words = payload[coord_bytes + 2 * count:].decode("utf-8")
+        
+        return cls(
+            words.split("\x00") if count else [],
+            coords[0], coords[1], coords[2], coords[3],
+            confidence / _CONFIDENCE_STEPS
+        )
+    
+    def encode(self) -> str:
+        """Base64 text of to_bytes(), for JSON task results and storage"""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+    
+    @classmethod
+    def decode(cls, encoded: str) -> "OCRBoxes":
+        """Decode boxes produced by encode"""
+        return cls.from_bytes(base64.b64decode(encoded))
+
+
+def as_columnar(boxes: Union[OCRBoxes, List[Dict[str, Any]], None]) -> OCRBoxes:
+    """Boxes in columnar form, whichever format they come in"""
+    if isinstance(boxes, OCRBoxes):
+        return boxes
+    return OCRBoxes.from_dicts(boxes or [])
+
+
+def box_format_of(boxes) -> str:
+    """Box format name of an OCR result's boxes"""
+    return "columnar" if isinstance(boxes, OCRBoxes) else "dicts"
+
+
+def format_boxes(boxes: Union[OCRBoxes, List[Dict[str, Any]], None],
+                 box_format: str) -> Union[OCRBoxes, List[Dict[str, Any]]]:
+    """
+    Convert boxes to the requested format
+    
+    Args:
+        boxes: Boxes in either format
+        box_format: One of BOX_FORMATS
+        
+    Returns:
+        OCRBoxes for "columnar", list of dicts for "dicts"
+    """
+    if box_format == "columnar":
+        return as_columnar(boxes)
+    if box_format == "dicts":
+        return boxes.to_dicts() if isinstance(boxes, OCRBoxes) else list(boxes or [])
+    
+    raise ValueError(f"Unknown box format '{box_format}'. Available: {', '.join(BOX_FORMATS)}")
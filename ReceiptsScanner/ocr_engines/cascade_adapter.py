@@ -0,0 +1,178 @@
+"""
+Confidence-gated OCR cascade: a cheap configuration first, the full one on demand
+"""
+import os
+import time
+from typing import Dict, Any, Tuple
+
+import cv2
+import numpy as np
+
+from ocr_engines.base import OCRAdapter
+from ocr_engines.boxes import as_columnar, format_boxes
+from processing.extraction_engine import ExtractionEngine, RECEIPT_PATTERN_GROUPS
+from monitoring.logging_config import get_logger
+from monitoring.metrics import (
+    ocr_cascade_results_total,
+    ocr_cascade_fast_confidence,
+    ocr_cascade_fast_coverage,
+    ocr_cascade_duration_seconds
+)
+
+logger = get_logger(__name__)
+
+# Key entities the fast tier must find for its result to be kept
+COVERAGE_GROUPS = {name: RECEIPT_PATTERN_GROUPS[name] for name in ("date", "amount")}
+
+_coverage_engine = None
+
+
+def get_coverage_engine() -> ExtractionEngine:
+    """Compiled coverage patterns (RE2 when installed, time-budgeted), built on first use"""
+    global _coverage_engine
+    if _coverage_engine is None:
+        _coverage_engine = ExtractionEngine(COVERAGE_GROUPS)
+    return _coverage_engine
+
+
+def entity_coverage(text: str, engine: ExtractionEngine = None) -> float:
+    """
+    Share of key receipt entities (date, total amount) present in OCR text
+    
+    Matching goes through ExtractionEngine, so garbage lines from a bad OCR
+    pass are length-guarded and time-budgeted like in entity extraction.
+    
+    Args:
+        text: OCR text
+        engine: Engine with "date" and "amount" groups (default: get_coverage_engine())
+        
+    Returns:
+        float: Coverage between 0 and 1
+    """
+    if not text:
+        return 0.0
+    
+    engine = engine or get_coverage_engine()
+    text = engine.guard(text)
+    hits = engine.scan(text)
+    found = sum(
+        next(engine.search(group, text, hits), None) is not None
+        for group in COVERAGE_GROUPS
+    )
+    return found / len(COVERAGE_GROUPS)
+
+
+class CascadeOCRAdapter(OCRAdapter):
+    """
+    Run a cheap OCR tier first and fall back to the full tier when unsure
+    
+    The fast tier (e.g. a single language, tessdata_fast models or a
+    character whitelist) runs on a downscaled image. Its result is kept when
+    both the mean word confidence and the entity coverage reach their
+    thresholds; otherwise the full tier runs on the original image. Results
+    carry a "tier" key ("fast" or "full").
+    """
+    
+    def __init__(self, fast_adapter: OCRAdapter, full_adapter: OCRAdapter,
+                 min_confidence: float = None, min_coverage: float = None,
+                 fast_scale: float = None):
+        """
+        Initialize cascade adapter
+        
+        Args:
+            fast_adapter: Cheap OCR configuration tried first
+            full_adapter: Full OCR configuration used as fallback
+            min_confidence: Minimum fast-tier confidence (default: OCR_CASCADE_MIN_CONFIDENCE)
+            min_coverage: Minimum fast-tier entity coverage (default: OCR_CASCADE_MIN_COVERAGE)
+            fast_scale: Image scale for the fast tier (default: OCR_CASCADE_FAST_SCALE)
+        """
+        self.fast_adapter = fast_adapter
+        self.full_adapter = full_adapter
+        self.box_format = full_adapter.box_format
+        self.min_confidence = min_confidence if min_confidence is not None else float(
+            os.getenv("OCR_CASCADE_MIN_CONFIDENCE", "0.75"))
+        self.min_coverage = min_coverage if min_coverage is not None else float(
+            os.getenv("OCR_CASCADE_MIN_COVERAGE", "0.5"))
+        self.fast_scale = fast_scale or float(os.getenv("OCR_CASCADE_FAST_SCALE", "0.75"))
+        
+        logger.info(f"OCR cascade initialized: min_confidence={self.min_confidence}, "
+                   f"min_coverage={self.min_coverage}, fast_scale={self.fast_scale}")
+    
+    def extract_text(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Extract text with the fast tier, escalating to the full tier if needed
+        
+        Args:
+            image: Image as numpy array
+            
+        Returns:
+            dict with extracted text, confidence, boxes and the producing tier
+        """
+        start = time.time()
+        fast_result = self._extract_fast(image)
+        ocr_cascade_duration_seconds.labels(tier="fast").observe(time.time() - start)
+        
+        confidence = fast_result.get("confidence", 0.0)
+        coverage = entity_coverage(fast_result.get("text", ""))
+        ocr_cascade_fast_confidence.observe(confidence)
+        ocr_cascade_fast_coverage.observe(coverage)
+        
+        accepted, reason = self._gate(confidence, coverage)
+        if accepted:
+            ocr_cascade_results_total.labels(tier="fast", reason=reason).inc()
+            return dict(fast_result, tier="fast")
+        
+        logger.info(f"Fast OCR tier rejected ({reason}: confidence={confidence:.2%}, "
+                   f"coverage={coverage:.2f}), running full tier")
+        
+        start = time.time()
+        full_result = self.full_adapter.extract_text(image)
+        ocr_cascade_duration_seconds.labels(tier="full").observe(time.time() - start)
+        ocr_cascade_results_total.labels(tier="full", reason=reason).inc()
+        
+        return dict(full_result, tier="full")
+    
+    def _gate(self, confidence: float, coverage: float) -> Tuple[bool, str]:
+        """Decide whether the fast result is kept, and why"""
+        if confidence < self.min_confidence:
+            return False, "low_confidence"
+        if coverage < self.min_coverage:
+            return False, "low_coverage"
+        return True, "accepted"
+    
+    def _extract_fast(self, image: np.ndarray) -> Dict[str, Any]:
+        """Run the fast tier on a downscaled image; boxes map back to the original"""
+        if self.fast_scale >= 1.0:
+            return self.fast_adapter.extract_text(image)
+        
+        height, width = image.shape[:2]
+        small = cv2.resize(
+            image,
+            (max(1, int(width * self.fast_scale)), max(1, int(height * self.fast_scale))),
+            interpolation=cv2.INTER_AREA
+        )
+        result = self.fast_adapter.extract_text(small)
+        
+        factor = 1.0 / self.fast_scale
+        result["boxes"] = format_boxes(
+            as_columnar(result.get("boxes")).scaled(factor), self.fast_adapter.box_format
+        )
+        return result
+    
+    def close(self):
+        """Close both tiers"""
+        self.fast_adapter.close()
+        self.full_adapter.close()
+        super().close()
+    
+    def get_config(self) -> Dict[str, Any]:
+        """Get cascade configuration"""
+        config = dict(self.full_adapter.get_config())
+        config.update({
+            "cascade": True,
+            "fast": self.fast_adapter.get_config(),
+            "min_confidence": self.min_confidence,
+            "min_coverage": self.min_coverage,
+            "fast_scale": self.fast_scale
+        })
+        return config
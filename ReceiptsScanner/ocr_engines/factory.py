@@ -0,0 +1,66 @@
+"""
+OCR adapter factory
+"""
+import os
+
+from ocr_engines.base import OCRAdapter
+
+OCR_ENGINES = ("tesseract", "tesserocr")
+
+
+def create_ocr_adapter(engine: str = None, strips: bool = None, cascade: bool = None) -> OCRAdapter:
+    """
+    Create an OCR adapter by engine name
+    
+    Args:
+        engine: Engine name (defaults to OCR_ENGINE env var)
+            - tesseract: pytesseract, one subprocess per call
+            - tesserocr: in-process API handles pooled per thread
+        strips: Wrap the engine to OCR tall images as parallel bands
+            (defaults to OCR_STRIPS_ENABLED env var)
+        cascade: Try a cheap engine configuration first and run the full one
+            only when its result is not confident (defaults to OCR_CASCADE_ENABLED
+            env var; fast tier set by OCR_CASCADE_FAST_LANG/_TESSDATA/_WHITELIST)
+            
+    Returns:
+        OCRAdapter: Configured adapter
+    """
+    engine = (engine or os.getenv("OCR_ENGINE", "tesseract")).lower()
+    if strips is None:
+        strips = os.getenv("OCR_STRIPS_ENABLED", "false").lower() == "true"
+    if cascade is None:
+        cascade = os.getenv("OCR_CASCADE_ENABLED", "false").lower() == "true"
+    
+    adapter = _create_engine(engine, strips)
+    
+    if cascade:
+        from ocr_engines.cascade_adapter import CascadeOCRAdapter
+        fast_adapter = _create_engine(
+            engine,
+            strips,
+            lang=os.getenv("OCR_CASCADE_FAST_LANG", "vie"),
+            tessdata_dir=os.getenv("OCR_CASCADE_FAST_TESSDATA") or None,
+            whitelist=os.getenv("OCR_CASCADE_FAST_WHITELIST") or None
+        )
+        adapter = CascadeOCRAdapter(fast_adapter, adapter)
+    
+    return adapter
+
+
+def _create_engine(engine: str, strips: bool, **options) -> OCRAdapter:
+    """Create one engine adapter, optionally wrapped for band-parallel OCR"""
+    # Import lazily so optional engines are only required when selected
+    if engine == "tesseract":
+        from ocr_engines.tesseract_adapter import TesseractOCRAdapter
+        adapter = TesseractOCRAdapter(**options)
+    elif engine == "tesserocr":
+        from ocr_engines.tesserocr_adapter import TesserOCRAdapter
+        adapter = TesserOCRAdapter(**options)
+    else:
+        raise ValueError(f"Unknown OCR engine: {engine}. Available: {', '.join(OCR_ENGINES)}")
+    
+    if strips:
+        from ocr_engines.strip_adapter import StripOCRAdapter
+        adapter = StripOCRAdapter(adapter)
+    
+    return adapter
@@ -0,0 +1,174 @@
+"""
+Parallel OCR over horizontal text bands for tall receipt images
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from ocr_engines.base import OCRAdapter
+from ocr_engines.boxes import OCRBoxes, as_columnar, format_boxes
+from monitoring.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def find_band_cuts(image: np.ndarray, band_height: int, ink_threshold: int = 128,
+                   max_ink_ratio: float = 0.002) -> List[Tuple[int, int]]:
+    """
+    Split an image into horizontal bands cut only through blank rows
+    
+    A row-projection profile counts dark pixels per row. Rows with (almost)
+    no ink form whitespace gaps between text lines, and each cut is placed in
+    the middle of the gap closest to the desired band boundary, so no glyph
+    is split between bands.
+    
+    Args:
+        image: Grayscale (or BGR) image, dark text on light background
+        band_height: Desired band height in pixels
+        ink_threshold: Pixel value below which a pixel counts as ink
+        max_ink_ratio: Max share of ink pixels for a row to count as blank
+        
+    Returns:
+        list: (top, bottom) row ranges covering the whole image
+    """
+    height, width = image.shape[:2]
+    if height <= band_height:
+        return [(0, height)]
+    
+    gray = image if image.ndim == 2 else image.mean(axis=2)
+    profile = np.count_nonzero(gray < ink_threshold, axis=1)
+    blank = profile <= max(1, int(width * max_ink_ratio))
+    
+    # Midpoints of blank runs are the candidate cut rows
+    edges = np.diff(blank.astype(np.int8), prepend=0, append=0)
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    candidates = (run_starts + run_ends) // 2
+    
+    cuts = [0]
+    min_band = band_height // 2
+    target = band_height
+    
+    while target < height - min_band:
+        valid = candidates[(candidates >= cuts[-1] + min_band) &
+                           (candidates <= height - min_band)]
+        if valid.size == 0:
+            break
+        
+        cut = int(valid[np.argmin(np.abs(valid - target))])
+        cuts.append(cut)
+        target = cut + band_height
+    
+    cuts.append(height)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+class StripOCRAdapter(OCRAdapter):
+    """
+    OCR adapter that runs another adapter concurrently over text bands
+    
+    Tall images are split at whitespace rows and each band is recognized on
+    a thread pool; the band results are stitched back into a single result
+    with box coordinates shifted to page space.
+    """
+    
+    def __init__(self, ocr_adapter: OCRAdapter, workers: int = None,
+                 min_height: int = None, band_height: int = None):
+        """
+        Initialize strip OCR adapter
+        
+        Args:
+            ocr_adapter: Adapter used to recognize each band
+            workers: Concurrent bands (defaults to OCR_STRIP_WORKERS or CPU count)
+            min_height: Images shorter than this are not split (OCR_STRIP_MIN_HEIGHT)
+            band_height: Minimum band height in pixels (OCR_STRIP_HEIGHT)
+        """
+        self.ocr_adapter = ocr_adapter
+        self.box_format = ocr_adapter.box_format
+        self.workers = workers or int(os.getenv("OCR_STRIP_WORKERS", os.cpu_count() or 1))
+        self.min_height = min_height or int(os.getenv("OCR_STRIP_MIN_HEIGHT", "3000"))
+        self.band_height = band_height or int(os.getenv("OCR_STRIP_HEIGHT", "1000"))
+        
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="ocr-strip"
+        )
+        
+        logger.info(f"Strip OCR initialized: workers={self.workers}, "
+                   f"min_height={self.min_height}, band_height={self.band_height}")
+    
+    def extract_text(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Extract text from image, splitting tall images into parallel bands
+        
+        Args:
+            image: Image as numpy array (grayscale or RGB)
+            
+        Returns:
+            dict with extracted text and confidence
+        """
+        height = image.shape[0]
+        if height < self.min_height or self.workers < 2:
+            return self.ocr_adapter.extract_text(image)
+        
+        # Spread the page over all workers, but keep bands reasonably tall
+        band_height = max(self.band_height, -(-height // self.workers))
+        bands = find_band_cuts(image, band_height)
+        
+        if len(bands) == 1:
+            return self.ocr_adapter.extract_text(image)
+        
+        logger.info(f"Running OCR on {len(bands)} bands of a {height}px image")
+        
+        results = list(self._executor.map(
+            lambda band: self.ocr_adapter.extract_text(image[band[0]:band[1]]),
+            bands
+        ))
+        
+        return self._merge_results(bands, results)
+    
+    def _merge_results(self, bands: List[Tuple[int, int]],
+                       results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Stitch band results back into one page result"""
+        texts = []
+        boxes = []
+        weighted_confidence = 0.0
+        total_weight = 0
+        
+        for (top, _), result in zip(bands, results):
+            text = result.get("text", "")
+            if text:
+                texts.append(text)
+            
+            band_boxes = result.get("boxes", [])
+            boxes.append(as_columnar(band_boxes).shifted(dy=top))
+            
+            # Weight each band by its word count (or text length if no boxes)
+            weight = len(band_boxes) or len(text)
+            weighted_confidence += result.get("confidence", 0.0) * weight
+            total_weight += weight
+        
+        return {
+            "text": "\n".join(texts),
+            "confidence": weighted_confidence / total_weight if total_weight else 0.0,
+            "boxes": format_boxes(OCRBoxes.concat(boxes), self.box_format)
+        }
+    
+    def close(self):
+        """Shut down the band executor and close the wrapped adapter"""
+        self._executor.shutdown(wait=True)
+        self.ocr_adapter.close()
+        super().close()
+    
+    def get_config(self) -> Dict[str, Any]:
+        """Get strip OCR configuration"""
+        config = dict(self.ocr_adapter.get_config())
+        config.update({
+            "strips": True,
+            "strip_workers": self.workers,
+            "strip_min_height": self.min_height,
+            "strip_band_height": self.band_height
+        })
+        return config
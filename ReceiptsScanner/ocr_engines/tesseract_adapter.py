@@ -4,26 +4,64 @@ Tesseract OCR adapter implementation
 import pytesseract
 from PIL import Image
 import numpy as np
+import asyncio
+import io
 import os
-from typing import Dict, Any
+import tempfile
+import weakref
+from typing import Dict, Any, List, Sequence
 from ocr_engines.base import OCRAdapter
+from ocr_engines.boxes import BOX_FORMATS, OCRBoxes, format_boxes
 from monitoring.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Tesseract TSV level for individual words
+WORD_LEVEL = 5
+
 class TesseractOCRAdapter(OCRAdapter):
     """Tesseract OCR implementation"""
     
-    def __init__(self):
-        """Initialize Tesseract OCR adapter"""
+    def __init__(self, single_pass: bool = None, lang: str = None,
+                 tessdata_dir: str = None, whitelist: str = None, box_format: str = None):
+        """
+        Initialize Tesseract OCR adapter
+        
+        Args:
+            single_pass: Run recognition once and rebuild text from word data
+                (defaults to OCR_SINGLE_PASS env var)
+            lang: Tesseract languages (defaults to TESSERACT_LANG env var)
+            tessdata_dir: Alternative traineddata directory, e.g. tessdata_fast
+            whitelist: Restrict recognition to these characters
+            box_format: "dicts" or "columnar" (defaults to OCR_BOX_FORMAT env var)
+        """
         self.tesseract_cmd = os.getenv("TESSERACT_CMD", "/usr/bin/tesseract")
-        self.lang = os.getenv("TESSERACT_LANG", "eng+vie")
+        self.lang = lang or os.getenv("TESSERACT_LANG", "eng+vie")
         self.psm = int(os.getenv("OCR_PSM", "6"))  # Page segmentation mode
+        self.tessdata_dir = tessdata_dir
+        self.whitelist = whitelist
+        self.box_format = box_format or self.box_format
+        if self.box_format not in BOX_FORMATS:
+            raise ValueError(f"Unknown box format '{self.box_format}'. Available: {', '.join(BOX_FORMATS)}")
+        
+        if single_pass is None:
+            single_pass = os.getenv("OCR_SINGLE_PASS", "true").lower() == "true"
+        self.single_pass = single_pass
         
         # Set Tesseract command path
         pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
         
-        logger.info(f"Tesseract initialized: lang={self.lang}, psm={self.psm}")
+        logger.info(f"Tesseract initialized: lang={self.lang}, psm={self.psm}, "
+                   f"single_pass={self.single_pass}")
+    
+    def _config_args(self) -> List[str]:
+        """Tesseract command-line options for this adapter"""
+        args = ["--oem", "3", "--psm", str(self.psm)]
+        if self.tessdata_dir:
+            args += ["--tessdata-dir", self.tessdata_dir]
+        if self.whitelist:
+            args += ["-c", f"tessedit_char_whitelist={self.whitelist}"]
+        return args
     
     def extract_text(self, image: np.ndarray) -> Dict[str, Any]:
         """
@@ -36,23 +74,12 @@ class TesseractOCRAdapter(OCRAdapter):
             dict with extracted text and confidence
         """
         try:
-            # Convert numpy array to PIL Image
-            if len(image.shape) == 2:  # Grayscale
-                pil_image = Image.fromarray(image, mode='L')
-            else:  # RGB
-                pil_image = Image.fromarray(image, mode='RGB')
+            pil_image = self._to_pil(image)
             
             # Configure Tesseract
-            custom_config = f'--oem 3 --psm {self.psm}'
+            custom_config = ' '.join(self._config_args())
             
-            # Extract text
-            text = pytesseract.image_to_string(
-                pil_image,
-                lang=self.lang,
-                config=custom_config
-            )
-            
-            # Get detailed data for confidence calculation
+            # Get detailed data for text, confidence and boxes
             data = pytesseract.image_to_data(
                 pil_image,
                 lang=self.lang,
@@ -60,51 +87,233 @@ class TesseractOCRAdapter(OCRAdapter):
                 output_type=pytesseract.Output.DICT
             )
             
-            # Calculate average confidence
-            confidences = [
-                float(conf) for conf in data['conf'] 
-                if conf != '-1'
-            ]
+            text = None
+            if not self.single_pass:
+                text = pytesseract.image_to_string(
+                    pil_image,
+                    lang=self.lang,
+                    config=custom_config
+                )
             
-            avg_confidence = (
-                sum(confidences) / len(confidences) / 100.0
-                if confidences else 0.0
-            )
+            return self._result_from_data(data, text)
+            
+        except Exception as e:
+            logger.error(f"OCR extraction failed: {str(e)}")
+            return self._empty_result()
+    
+    def extract_text_batch(self, images: Sequence[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        Extract text from several images with few Tesseract processes
+        
+        Images are split into at most batch_workers chunks, and each chunk is
+        recognized by a single Tesseract process reading an image list file,
+        so the language models are loaded once per chunk instead of once per
+        image. Chunks run in parallel on the adapter's thread pool.
+        
+        Args:
+            images: Images as numpy arrays
             
-            logger.info(f"OCR extracted {len(text)} characters with confidence {avg_confidence:.2%}")
+        Returns:
+            list: One extract_text result per image, in input order
+        """
+        if not self.single_pass or len(images) <= 1:
+            return super().extract_text_batch(images)
+        
+        chunk_count = min(self.batch_workers, len(images))
+        bounds = np.linspace(0, len(images), chunk_count + 1).astype(int)
+        chunks = [images[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+        
+        results = self._get_executor().map(self._extract_chunk, chunks)
+        return [result for chunk in results for result in chunk]
+    
+    def _extract_chunk(self, images: Sequence[np.ndarray]) -> List[Dict[str, Any]]:
+        """Recognize several images in one Tesseract run (one page per image)"""
+        try:
+            with tempfile.TemporaryDirectory(prefix="tess_batch_") as temp_dir:
+                paths = []
+                for i, image in enumerate(images):
+                    path = os.path.join(temp_dir, f"{i}.png")
+                    self._to_pil(image).save(path, compress_level=1)
+                    paths.append(path)
+                
+                list_path = os.path.join(temp_dir, "images.txt")
+                with open(list_path, "w") as f:
+                    f.write("\n".join(paths) + "\n")
+                
+                data = pytesseract.image_to_data(
+                    list_path,
+                    lang=self.lang,
+                    config=' '.join(self._config_args()),
+                    output_type=pytesseract.Output.DICT
+                )
             
-            return {
-                "text": text.strip(),
-                "confidence": avg_confidence,
-                "boxes": self._extract_boxes(data) if data else []
-            }
+            return [self._result_from_data(page) for page in self._split_pages(data, len(images))]
             
         except Exception as e:
-            logger.error(f"OCR extraction failed: {str(e)}")
-            return {
-                "text": "",
-                "confidence": 0.0,
-                "boxes": []
-            }
+            logger.error(f"Batch OCR failed, falling back to single images: {str(e)}")
+            return [self.extract_text(image) for image in images]
+    
+    async def extract_text_async(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Extract text without blocking the event loop or a thread
+        
+        Runs Tesseract as an asyncio subprocess reading PNG bytes from stdin
+        and writing TSV to stdout; at most batch_workers run at once per
+        event loop.
+        
+        Args:
+            image: Image as numpy array
+            
+        Returns:
+            dict: Same as extract_text
+        """
+        if not self.single_pass:
+            return await super().extract_text_async(image)
+        
+        async with self._async_limit():
+            try:
+                buffer = io.BytesIO()
+                self._to_pil(image).save(buffer, format="PNG", compress_level=1)
+                
+                process = await asyncio.create_subprocess_exec(
+                    self.tesseract_cmd, "stdin", "stdout",
+                    "-l", self.lang, *self._config_args(),
+                    "-c", "tessedit_create_txt=0", "-c", "tessedit_create_tsv=1",
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                stdout, stderr = await process.communicate(buffer.getvalue())
+                
+                if process.returncode != 0:
+                    raise RuntimeError(stderr.decode("utf-8", errors="replace").strip())
+                
+                data = pytesseract.pytesseract.file_to_dict(stdout.decode("utf-8"), '\t', -1)
+                return self._result_from_data(data)
+                
+            except Exception as e:
+                logger.error(f"Async OCR extraction failed: {str(e)}")
+                return self._empty_result()
+    
+    def _async_limit(self) -> asyncio.Semaphore:
+        """Per-event-loop semaphore bounding concurrent Tesseract processes"""
+        if not hasattr(self, "_async_semaphores"):
+            self._async_semaphores = weakref.WeakKeyDictionary()
+        
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.batch_workers)
+            self._async_semaphores[loop] = semaphore
+        return semaphore
+    
+    def _to_pil(self, image: np.ndarray) -> Image.Image:
+        """Convert a grayscale or RGB numpy array to a PIL image"""
+        if len(image.shape) == 2:  # Grayscale
+            return Image.fromarray(image, mode='L')
+        return Image.fromarray(image, mode='RGB')
+    
+    def _result_from_data(self, data: Dict, text: str = None) -> Dict[str, Any]:
+        """
+        Build the OCR result from Tesseract word data
+        
+        Args:
+            data: image_to_data output (DICT)
+            text: Text from a separate image_to_string run; rebuilt from the
+                word data when None
+            
+        Returns:
+            dict with extracted text, confidence and boxes
+        """
+        if text is None:
+            # Rebuild text from word data instead of a second recognition run
+            text = self._text_from_data(data)
+        
+        avg_confidence = self._mean_confidence(data)
+        
+        logger.info(f"OCR extracted {len(text)} characters with confidence {avg_confidence:.2%}")
+        
+        return {
+            "text": text.strip(),
+            "confidence": avg_confidence,
+            "boxes": self._extract_boxes(data)
+        }
+    
+    def _empty_result(self) -> Dict[str, Any]:
+        """Result returned when OCR fails"""
+        return {
+            "text": "",
+            "confidence": 0.0,
+            "boxes": format_boxes([], self.box_format)
+        }
+    
+    def _split_pages(self, data: Dict, page_count: int) -> List[Dict]:
+        """Split multi-page image_to_data output into one dict per page"""
+        pages = [{key: [] for key in data} for _ in range(page_count)]
+        
+        for i, page_num in enumerate(data.get('page_num', [])):
+            page = pages[int(page_num) - 1]
+            for key, values in data.items():
+                page[key].append(values[i])
+        
+        return pages
+    
+    def _text_from_data(self, data: Dict) -> str:
+        """
+        Rebuild plain text from Tesseract word data
+        
+        Words are joined in reading order: words on the same line are separated
+        by spaces, lines by newlines and paragraphs/blocks by a blank line,
+        matching the layout of image_to_string.
+        """
+        lines: List[str] = []
+        words: List[str] = []
+        current_line = None
+        current_par = None
+        
+        for i in range(len(data.get('text', []))):
+            if int(data['level'][i]) != WORD_LEVEL:
+                continue
+            
+            word = str(data['text'][i]).strip()
+            if not word:
+                continue
+            
+            par_key = (data['page_num'][i], data['block_num'][i], data['par_num'][i])
+            line_key = par_key + (data['line_num'][i],)
+            
+            if line_key != current_line:
+                if words:
+                    lines.append(' '.join(words))
+                    words = []
+                if current_par is not None and par_key != current_par:
+                    lines.append('')
+                current_line = line_key
+                current_par = par_key
+            
+            words.append(word)
+        
+        if words:
+            lines.append(' '.join(words))
+        
+        return '\n'.join(lines)
+    
+    def _mean_confidence(self, data: Dict) -> float:
+        """Average word confidence (0-1), ignoring non-word rows"""
+        confidences = [
+            float(conf) for conf in data.get('conf', [])
+            if float(conf) >= 0
+        ]
+        
+        return (
+            sum(confidences) / len(confidences) / 100.0
+            if confidences else 0.0
+        )
     
-    def _extract_boxes(self, data: Dict) -> list:
-        """Extract bounding boxes from OCR data"""
-        boxes = []
-        
-        n_boxes = len(data['text'])
-        for i in range(n_boxes):
-            if int(data['conf'][i]) > 0:  # Only include confident detections
-                box = {
-                    "text": data['text'][i],
-                    "x": data['left'][i],
-                    "y": data['top'][i],
-                    "width": data['width'][i],
-                    "height": data['height'][i],
-                    "confidence": float(data['conf'][i]) / 100.0
-                }
-                boxes.append(box)
-        
-        return boxes
+    def _extract_boxes(self, data: Dict):
+        """Extract bounding boxes from OCR data in the adapter's box format"""
+        # Only include confident detections
+        return format_boxes(OCRBoxes.from_tesseract_data(data), self.box_format)
     
     def get_config(self) -> Dict[str, Any]:
         """Get Tesseract configuration"""
@@ -113,5 +322,7 @@ class TesseractOCRAdapter(OCRAdapter):
             "version": pytesseract.get_tesseract_version(),
             "language": self.lang,
             "psm": self.psm,
+            "tessdata_dir": self.tessdata_dir,
+            "whitelist": self.whitelist,
             "command": self.tesseract_cmd
         }
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+In-process Tesseract adapter using the tesserocr C API bindings
+"""
+import os
+import threading
+from typing import Dict, Any, List
+
+import numpy as np
+
+from ocr_engines.base import OCRAdapter
+from ocr_engines.boxes import BOX_FORMATS, OCRBoxes, format_boxes
+from monitoring.logging_config import get_logger
+
+try:
+    import tesserocr
+    from tesserocr import PyTessBaseAPI, RIL, OEM, iterate_level
+except ImportError:  # Optional dependency
+    tesserocr = None
+
+logger = get_logger(__name__)
+
+
+class TesserOCRAdapter(OCRAdapter):
+    """
+    Tesseract OCR without a subprocess per call
+    
+    Each worker thread keeps its own initialized TessBaseAPI handle, so the
+    traineddata is loaded once per thread and images are passed to Tesseract
+    as raw pixel buffers instead of temporary PNG files.
+    """
+    
+    def __init__(self, lang: str = None, tessdata_dir: str = None, whitelist: str = None,
+                 box_format: str = None):
+        """
+        Initialize tesserocr adapter
+        
+        Args:
+            lang: Tesseract languages (defaults to TESSERACT_LANG env var)
+            tessdata_dir: Alternative traineddata directory, e.g. tessdata_fast
+            whitelist: Restrict recognition to these characters
+            box_format: "dicts" or "columnar" (defaults to OCR_BOX_FORMAT env var)
+        """
+        if tesserocr is None:
+            raise ImportError(
+                "tesserocr is not installed. Install it with 'pip install tesserocr' "
+                "or use OCR_ENGINE=tesseract"
+            )
+        
+        self.lang = lang or os.getenv("TESSERACT_LANG", "eng+vie")
+        self.psm = int(os.getenv("OCR_PSM", "6"))  # Page segmentation mode
+        self.tessdata_path = tessdata_dir or os.getenv("TESSDATA_PREFIX", tesserocr.get_languages()[0])
+        self.whitelist = whitelist
+        self.box_format = box_format or self.box_format
+        if self.box_format not in BOX_FORMATS:
+            raise ValueError(f"Unknown box format '{self.box_format}'. Available: {', '.join(BOX_FORMATS)}")
+        
+        # One API handle per thread; handles are not thread-safe
+        self._local = threading.local()
+        self._handles: List[Any] = []
+        self._handles_lock = threading.Lock()
+        
+        logger.info(f"tesserocr initialized: lang={self.lang}, psm={self.psm}")
+    
+    def _get_api(self):
+        """Get (or lazily create) the API handle for the current thread"""
+        api = getattr(self._local, "api", None)
+        
+        if api is None:
+            api = PyTessBaseAPI(
+                path=self.tessdata_path,
+                lang=self.lang,
+                psm=self.psm,
+                oem=OEM.DEFAULT
+            )
+            if self.whitelist:
+                api.SetVariable("tessedit_char_whitelist", self.whitelist)
+            self._local.api = api
+            
+            with self._handles_lock:
+                self._handles.append(api)
+            
+            logger.info(f"Created Tesseract API handle for thread "
+                       f"{threading.current_thread().name} ({len(self._handles)} total)")
+        
+        return api
+    
+    def extract_text(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Extract text from image using an in-process Tesseract handle
+        
+        Args:
+            image: Image as numpy array (grayscale or RGB)
+            
+        Returns:
+            dict with extracted text and confidence
+        """
+        try:
+            api = self._get_api()
+            
+            # Pass the pixel buffer directly, no image encoding round-trip
+            pixels = np.ascontiguousarray(image, dtype=np.uint8)
+            height, width = pixels.shape[:2]
+            bytes_per_pixel = 1 if pixels.ndim == 2 else pixels.shape[2]
+            
+            try:
+                api.SetImageBytes(
+                    pixels.tobytes(),
+                    width,
+                    height,
+                    bytes_per_pixel,
+                    pixels.strides[0]
+                )
+                api.Recognize()
+                
+                text = api.GetUTF8Text()
+                boxes = self._extract_boxes(api)
+            finally:
+                # Drop the image even when recognition fails; the handle is reused
+                api.Clear()
+            
+            avg_confidence = float(boxes.confidence.mean()) if len(boxes) else 0.0
+            
+            logger.info(f"OCR extracted {len(text)} characters with confidence {avg_confidence:.2%}")
+            
+            return {
+                "text": text.strip(),
+                "confidence": avg_confidence,
+                "boxes": format_boxes(boxes, self.box_format)
+            }
+            
+        except Exception as e:
+            logger.error(f"OCR extraction failed: {str(e)}")
+            return {
+                "text": "",
+                "confidence": 0.0,
+                "boxes": format_boxes([], self.box_format)
+            }
+    
+    def _extract_boxes(self, api) -> OCRBoxes:
+        """Extract word bounding boxes from the last recognition"""
+        text, x, y, width, height, confidence = [], [], [], [], [], []
+        
+        iterator = api.GetIterator()
+        if iterator is None:
+            return OCRBoxes()
+        
+        for word in iterate_level(iterator, RIL.WORD):
+            conf = word.Confidence(RIL.WORD)
+            if conf <= 0:  # Only include confident detections
+                continue
+            
+            bbox = word.BoundingBox(RIL.WORD)
+            if bbox is None:
+                continue
+            
+            x1, y1, x2, y2 = bbox
+            text.append(word.GetUTF8Text(RIL.WORD))
+            x.append(x1)
+            y.append(y1)
+            width.append(x2 - x1)
+            height.append(y2 - y1)
+            confidence.append(float(conf) / 100.0)
+        
+        return OCRBoxes(text, x, y, width, height, confidence)
+    
+    def close(self):
+        """Release all Tesseract API handles"""
+        with self._handles_lock:
+            for api in self._handles:
+                api.End()
+            self._handles = []
+        
+        self._local = threading.local()
+        super().close()
+    
+    def get_config(self) -> Dict[str, Any]:
+        """Get tesserocr configuration"""
+        return {
+            "engine": "tesserocr",
+            "version": tesserocr.tesseract_version(),
+            "language": self.lang,
+            "psm": self.psm,
+            "tessdata": self.tessdata_path,
+            "whitelist": self.whitelist,
+            "handles": len(self._handles)
+        }
@@ -0,0 +1,443 @@
+"""
+Bulk entity extraction over stored receipt text
+
+Re-extracts merchant, date, total, phone and tax for many receipts at once
+with pandas string operations instead of calling extract_entities per text.
+Each pattern runs once over the whole column (str.extract / str.extractall)
+and the cleaning helpers work on whole arrays. Results are identical to
+ReceiptProcessor.extract_entities for the same fields.
+
+pandas matches with Python re; every text goes through guard_text (line
+and text length caps) first, as in ReceiptProcessor, and the
+per-text matching time of each pattern is exported to the same
+extraction_pattern_seconds histogram as the engine's.
+"""
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_manager.base import DataAdapter
+from processing.patterns import (
+    DATE_PATTERNS, AMOUNT_PATTERNS, PHONE_PATTERNS,
+    MERCHANT_KEYWORDS, TAX_PATTERNS, IGNORE_KEYWORDS,
+    clean_date
+)
+from processing.extraction_engine import guard_text
+from processing.receipt_processor import NON_NAME_CHARS
+from monitoring.logging_config import get_logger
+from monitoring.metrics import extraction_pattern_seconds
+
+logger = get_logger(__name__)
+
+BULK_FIELDS = ("merchant_name", "receipt_date", "total_amount", "phone", "tax")
+
+BULK_EXTRACTION_WORKERS = int(os.getenv("BULK_EXTRACTION_WORKERS", "1"))
+BULK_EXTRACTION_CHUNK_SIZE = int(os.getenv("BULK_EXTRACTION_CHUNK_SIZE", "20000"))
+BULK_EXTRACTION_BATCH_SIZE = int(os.getenv("BULK_EXTRACTION_BATCH_SIZE", "1000"))
+
+
+def as_text_series(texts) -> pd.Series:
+    """
+    Convert texts to a string Series (missing texts become "")
+    
+    Args:
+        texts: pandas Series, pyarrow Array/ChunkedArray or list of strings
+    
+    Returns:
+        pd.Series: Text column
+    """
+    if hasattr(texts, "to_pandas") and not isinstance(texts, pd.Series):
+        texts = texts.to_pandas()
+    series = texts if isinstance(texts, pd.Series) else pd.Series(list(texts))
+    return series.astype(object).where(series.notna(), "").astype(str)
+
+
+def clean_amount_array(amounts: pd.Series) -> pd.Series:
+    """
+    Array version of clean_amount
+    
+    Args:
+        amounts: Amount strings (missing values parse as 0.0)
+    
+    Returns:
+        pd.Series: Parsed amounts as float
+    """
+    cleaned = (amounts.fillna("").astype(str).str.strip()
+               .str.replace(" ", "", regex=False)
+               .str.replace("đ", "", regex=False)
+               .str.replace("VNĐ", "", regex=False))
+    
+    dots = cleaned.str.count(r"\.")
+    commas = cleaned.str.count(",")
+    no_dots = cleaned.str.replace(".", "", regex=False)
+    
+    # Same branch order as clean_amount
+    cleaned = pd.Series(np.select(
+        [
+            (dots > 1) & (commas == 0),
+            (dots > 1) & (commas == 1),
+            commas > 1,
+            (commas == 1) & (dots == 0)
+        ],
+        [
+            no_dots,
+            no_dots.str.replace(",", ".", regex=False),
+            cleaned.str.replace(",", "", regex=False),
+            cleaned.str.replace(",", ".", regex=False)
+        ],
+        default=cleaned
+    ), index=amounts.index)
+    
+    # Only digits and separators are left; anything float() rejects is 0.0
+    parsed = pd.to_numeric(cleaned.where(cleaned.str.fullmatch(r"\d*\.?\d*(?:[eE][+-]?\d+)?")),
+                           errors="coerce")
+    return parsed.fillna(0.0).astype(float)
+
+
+def clean_phone_array(phones: pd.Series) -> pd.Series:
+    """Array version of clean_phone"""
+    return phones.fillna("").astype(str).str.replace(r"[^\d+]", "", regex=True)
+
+
+def clean_date_array(dates: pd.Series) -> pd.Series:
+    """
+    Array version of clean_date
+    
+    Receipt dates repeat heavily across a corpus, so each distinct string
+    is parsed once and the results are mapped back. Parsing itself stays
+    clean_date's, so both paths agree on format order and validation.
+    
+    Args:
+        dates: Date strings (missing values stay missing)
+    
+    Returns:
+        pd.Series: Standardized dates (YYYY-MM-DD) or the original string
+    """
+    codes, uniques = pd.factorize(dates)
+    if len(uniques) == 0:
+        return pd.Series(np.nan, index=dates.index, dtype=object)
+    
+    parsed = np.array([clean_date(value) for value in uniques], dtype=object)
+    result = np.where(codes >= 0, parsed[np.maximum(codes, 0)], None)
+    return pd.Series(result, index=dates.index, dtype=object)
+
+
+def _timed(texts: pd.Series, group: str, index: int, operation):
+    """
+    Run a column-wide string operation for one pattern and record its time
+    
+    The histogram is per pattern and text, so the column's matching time is
+    observed once per call as the mean per text.
+    
+    Args:
+        texts: Texts the operation runs over
+        group: Pattern group name (see RECEIPT_PATTERN_GROUPS)
+        index: Pattern index in the group
+        operation: Callable doing the matching
+    
+    Returns:
+        Result of operation()
+    """
+    start = time.perf_counter()
+    result = operation()
+    if len(texts):
+        extraction_pattern_seconds.labels(group=group, pattern=str(index)).observe(
+            (time.perf_counter() - start) / len(texts))
+    return result
+
+
+def _first_group(texts: pd.Series, pattern: str, flags: int, group: str, index: int) -> pd.Series:
+    """Group 1 of the first match of pattern in each text (NaN if none)"""
+    return _timed(texts, group, index,
+                  lambda: texts.str.extract(pattern, flags=flags, expand=True)[0])
+
+
+def _first_match(texts: pd.Series, pattern: str, flags: int, group: str, index: int) -> pd.Series:
+    """Whole first match of pattern in each text (NaN if none)"""
+    return _timed(texts, group, index,
+                  lambda: texts.str.extract(f"({pattern})", flags=flags, expand=True)[0])
+
+
+def _clean_merchant_names(names: pd.Series) -> pd.Series:
+    """Array version of ReceiptProcessor._clean_merchant_name"""
+    for index, keyword in enumerate(IGNORE_KEYWORDS):
+        names = _timed(names, "ignore", index,
+                       lambda: names.str.replace(keyword, "", regex=True, flags=re.IGNORECASE))
+    
+    names = names.str.replace(NON_NAME_CHARS.pattern, " ", regex=True)
+    names = names.str.split().str.join(" ").str.strip()
+    return names.str.slice(0, 100).where(names != "", "Unknown")
+
+
+def _capitalized_line(text: str) -> Optional[str]:
+    """First of the first five lines with at least three capitals"""
+    for line in text.split('\n')[:5]:
+        line = line.strip()
+        if len(line) > 5 and sum(1 for c in line if c.isupper()) >= 3:
+            return line
+    return None
+
+
+def _extract_merchant_names(texts: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Merchant names, keyword patterns first, then the capitalized-line fallback, and their sources"""
+    names = pd.Series(np.nan, index=texts.index, dtype=object)
+    for index, pattern in enumerate(MERCHANT_KEYWORDS):
+        missing = names.isna()
+        if not missing.any():
+            break
+        names[missing] = _first_group(texts[missing], pattern, re.IGNORECASE | re.MULTILINE,
+                                      "merchant", index).str.strip()
+    
+    found = names.notna()
+    names[~found] = texts[~found].map(_capitalized_line)
+    
+    result = pd.Series("Unknown", index=texts.index, dtype=object)
+    named = names.notna()
+    if named.any():
+        result[named] = _clean_merchant_names(names[named].astype(str))
+    
+    sources = pd.Series(None, index=texts.index, dtype=object)
+    sources[named] = "line"
+    sources[found] = "keyword"
+    return result, sources
+
+
+def _extract_dates(texts: pd.Series, default_date: Optional[str]) -> pd.Series:
+    """First date, in pattern order, that clean_date could standardize"""
+    dates = pd.Series(np.nan, index=texts.index, dtype=object)
+    for index, pattern in enumerate(DATE_PATTERNS):
+        missing = dates.isna()
+        if not missing.any():
+            break
+        raw = _first_match(texts[missing], pattern, re.IGNORECASE, "date", index)
+        cleaned = clean_date_array(raw)
+        valid = raw.notna() & cleaned.notna() & (cleaned != "") & (cleaned != raw)
+        dates[valid[valid].index] = cleaned[valid]
+    
+    return dates.where(dates.notna(), default_date)
+
+
+def _extract_total_amounts(texts: pd.Series) -> pd.Series:
+    """Largest positive amount matched by any amount pattern"""
+    matches = [
+        _timed(texts, "amount", index,
+               lambda: texts.str.extractall(pattern, flags=re.IGNORECASE)[0])
+        for index, pattern in enumerate(AMOUNT_PATTERNS)
+    ]
+    amounts = pd.concat(matches)
+    if amounts.empty:
+        return pd.Series(0.0, index=texts.index)
+    
+    amounts = clean_amount_array(amounts)
+    amounts = amounts[amounts > 0]
+    totals = amounts.groupby(level=0).max()
+    return totals.reindex(texts.index, fill_value=0.0).astype(float)
+
+
+def _extract_phones(texts: pd.Series) -> pd.Series:
+    """First pattern match that cleans to at least 10 characters"""
+    phones = pd.Series(np.nan, index=texts.index, dtype=object)
+    for index, pattern in enumerate(PHONE_PATTERNS):
+        missing = phones.isna()
+        if not missing.any():
+            break
+        cleaned = clean_phone_array(_first_group(texts[missing], pattern, re.IGNORECASE,
+                                                 "phone", index))
+        valid = cleaned.str.len() >= 10
+        phones[valid[valid].index] = cleaned[valid]
+    
+    return phones.fillna("")
+
+
+def _extract_taxes(texts: pd.Series) -> pd.Series:
+    """Amount of the first matching tax pattern"""
+    taxes = pd.Series(np.nan, index=texts.index, dtype=object)
+    for index, pattern in enumerate(TAX_PATTERNS):
+        missing = taxes.isna()
+        if not missing.any():
+            break
+        taxes[missing] = _first_group(texts[missing], pattern, re.IGNORECASE, "tax", index)
+    
+    found = taxes.notna()
+    result = pd.Series(0.0, index=texts.index)
+    result[found] = clean_amount_array(taxes[found])
+    return result
+
+
+_FIELD_EXTRACTORS = {
+    "total_amount": _extract_total_amounts,
+    "phone": _extract_phones,
+    "tax": _extract_taxes
+}
+
+
+def _extract_chunk(texts: pd.Series, fields: Sequence[str],
+                   default_date: Optional[str]) -> pd.DataFrame:
+    """Extract fields for one chunk of texts"""
+    columns = {}
+    for field in fields:
+        if field == "receipt_date":
+            columns[field] = _extract_dates(texts, default_date)
+        elif field == "merchant_name":
+            columns[field], columns["merchant_source"] = _extract_merchant_names(texts)
+        else:
+            columns[field] = _FIELD_EXTRACTORS[field](texts)
+    return pd.DataFrame(columns, index=texts.index)
+
+
+def extract_entities_bulk(texts, fields: Sequence[str] = BULK_FIELDS,
+                          workers: int = None, chunk_size: int = None,
+                          default_date: Optional[str] = "today") -> pd.DataFrame:
+    """
+    Extract entities from many receipt texts
+    
+    Args:
+        texts: pandas Series, pyarrow array or list of receipt texts
+        fields: Fields to extract (subset of BULK_FIELDS)
+        workers: Processes extracting chunks in parallel
+            (defaults to BULK_EXTRACTION_WORKERS; 1 runs in-process)
+        chunk_size: Texts per chunk (defaults to BULK_EXTRACTION_CHUNK_SIZE)
+        default_date: Date for texts without one; "today" matches
+            extract_entities, None leaves them missing
+    
+    Returns:
+        pd.DataFrame: One row per text (same index), one column per field,
+            plus merchant_source ("keyword", "line" or None) with merchant_name
+    """
+    unknown = set(fields) - set(BULK_FIELDS)
+    if unknown:
+        raise ValueError(f"Unsupported bulk fields: {sorted(unknown)}")
+    
+    # Length caps against catastrophic backtracking, before the texts reach workers
+    texts = as_text_series(texts).map(guard_text)
+    index = texts.index
+    texts = texts.reset_index(drop=True)
+    workers = workers or BULK_EXTRACTION_WORKERS
+    chunk_size = chunk_size or BULK_EXTRACTION_CHUNK_SIZE
+    if default_date == "today":
+        default_date = datetime.now().strftime('%Y-%m-%d')
+    
+    chunks = [texts.iloc[start:start + chunk_size]
+              for start in range(0, len(texts), chunk_size)]
+    if not chunks:
+        columns = list(fields) + (["merchant_source"] if "merchant_name" in fields else [])
+        return pd.DataFrame(columns=columns, index=index)
+    
+    logger.info(f"Bulk extracting {len(texts)} texts: "
+               f"{len(chunks)} chunks, {workers} workers")
+    
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _extract_chunk, chunks,
+                [fields] * len(chunks), [default_date] * len(chunks)
+            ))
+    else:
+        results = [_extract_chunk(chunk, fields, default_date) for chunk in chunks]
+    
+    entities = pd.concat(results)
+    entities.index = index
+    return entities
+
+
+def reextract_receipts(data_adapter: DataAdapter, fields: Sequence[str] = BULK_FIELDS,
+                       batch_size: int = None, workers: int = None,
+                       include_corrected: bool = False) -> Dict[str, Any]:
+    """
+    Re-extract entities from stored raw_text and save changed receipts
+    
+    Receipts corrected by a user are left alone unless include_corrected is
+    set. A stored date is kept when no date is found in the text. With a
+    merchant index attached to the adapter, merchant names are resolved
+    through it like ReceiptProcessor does, which also refreshes merchant_id.
+    
+    Args:
+        data_adapter: Storage holding the receipts
+        fields: Fields to re-extract
+        batch_size: Receipts per save_receipts call
+            (defaults to BULK_EXTRACTION_BATCH_SIZE)
+        workers: Extraction processes (see extract_entities_bulk)
+        include_corrected: Also overwrite corrected receipts
+    
+    Returns:
+        dict: Counts of scanned, updated and failed receipts
+    """
+    batch_size = batch_size or BULK_EXTRACTION_BATCH_SIZE
+    receipts = [
+        receipt for receipt in data_adapter.list_receipts()
+        if receipt.get("raw_text") and (include_corrected or not receipt.get("corrected"))
+    ]
+    
+    stats = {"scanned": len(receipts), "updated": 0, "failed": 0}
+    if not receipts:
+        return stats
+    
+    entities = extract_entities_bulk(
+        [receipt["raw_text"] for receipt in receipts], fields,
+        workers=workers, default_date=None
+    )
+    
+    index = data_adapter.merchant_index
+    changed: List[Dict[str, Any]] = []
+    for receipt, values in zip(receipts, entities.to_dict(orient="records")):
+        merchant = {}
+        if "merchant_name" in values:
+            source = values.pop("merchant_source")
+            merchant = {"merchant_name": values.pop("merchant_name"),
+                        "merchant_source": None if pd.isna(source) else source}
+            if index is not None:
+                index.resolve_entities(merchant, receipt["raw_text"])
+            elif merchant["merchant_name"] != receipt.get("merchant_name"):
+                merchant["merchant_id"] = None
+        
+        updates = {
+            field: value for field, value in values.items()
+            if not pd.isna(value) and receipt.get(field) != value
+        }
+        # merchant_source and merchant_id are None when nothing was found
+        updates.update({field: value for field, value in merchant.items() if receipt.get(field) != value})
+        if updates:
+            changed.append({**receipt, **updates})
+    
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        if data_adapter.save_receipts(batch):
+            stats["updated"] += len(batch)
+        else:
+            stats["failed"] += len(batch)
+    
+    logger.info(f"Re-extraction finished: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Re-extract entities from stored receipts")
+    parser.add_argument("--fields", nargs="+", default=list(BULK_FIELDS))
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--include-corrected", action="store_true")
+    args = parser.parse_args()
+    
+    if os.getenv("STORAGE_BACKEND", "json") == "s3":
+        from data_manager.s3_adapter import S3DataAdapter
+        adapter = S3DataAdapter()
+    else:
+        from data_manager.json_adapter import JSONDataAdapter
+        adapter = JSONDataAdapter()
+    
+    # Same index as the worker, so names are canonicalized and merchant_id kept
+    from data_manager.merchant_index import create_merchant_index
+    adapter.merchant_index = create_merchant_index(adapter)
+    
+    result = reextract_receipts(adapter, args.fields, args.batch_size,
+                                args.workers, args.include_corrected)
+    print(f"\nScanned: {result['scanned']}  Updated: {result['updated']}  "
+          f"Failed: {result['failed']}")
@@ -0,0 +1,569 @@
+"""
+Compiled entity extraction engine
+
+Receipt patterns are compiled once. Patterns that start with a keyword
+alternation, e.g. "(?:T[ổo]ng|Total|Sum)...", are anchored: a single
+keyword-trie pass over the case-folded text finds every keyword occurrence,
+and the pattern is only tried at positions where one of its keywords starts.
+Patterns without a literal prefix (dates, bare amounts, items) are scanned
+as usual. Matches come out in the same order as re.search / re.finditer /
+re.sub would produce them, so extraction results are unchanged.
+
+Patterns run on RE2 (linear time, no catastrophic backtracking) when
+google-re2 is installed. Over-long lines and texts are truncated before
+matching on every backend (guard_text), so results do not depend on the
+backend and bulk extraction, which matches with pandas on Python re, gives
+the same results. On Python re a pattern that uses up its time budget on a
+text stops producing matches. Matching time is exported per pattern.
+"""
+import os
+import re
+import time
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+
+from processing.patterns import (
+    DATE_PATTERNS, AMOUNT_PATTERNS, PHONE_PATTERNS,
+    MERCHANT_KEYWORDS, ITEM_PATTERNS, TAX_PATTERNS,
+    ADDRESS_PATTERNS, IGNORE_KEYWORDS
+)
+from monitoring.logging_config import get_logger
+from monitoring.metrics import extraction_pattern_seconds, extraction_pattern_budget_exceeded_total
+
+try:
+    import re2
+except ImportError:  # Optional dependency (google-re2)
+    re2 = None
+
+logger = get_logger(__name__)
+
+REGEX_BACKENDS = ("auto", "re2", "re")
+
+# Backtracking guards (see guard_text)
+EXTRACTION_MAX_LINE_LENGTH = int(os.getenv("EXTRACTION_MAX_LINE_LENGTH", "500"))
+EXTRACTION_MAX_TEXT_LENGTH = int(os.getenv("EXTRACTION_MAX_TEXT_LENGTH", "20000"))
+# Matching time per pattern and text after which its remaining matches are dropped
+EXTRACTION_PATTERN_BUDGET_MS = float(os.getenv("EXTRACTION_PATTERN_BUDGET_MS", "50"))
+
+# Pattern groups used by ReceiptProcessor: name -> (patterns, flags)
+RECEIPT_PATTERN_GROUPS = {
+    "merchant": (MERCHANT_KEYWORDS, re.IGNORECASE | re.MULTILINE),
+    "date": (DATE_PATTERNS, re.IGNORECASE),
+    "amount": (AMOUNT_PATTERNS, re.IGNORECASE),
+    "phone": (PHONE_PATTERNS, re.IGNORECASE),
+    "address": (ADDRESS_PATTERNS, re.IGNORECASE | re.MULTILINE),
+    "item": (ITEM_PATTERNS, re.MULTILINE),
+    "tax": (TAX_PATTERNS, re.IGNORECASE),
+    "ignore": (IGNORE_KEYWORDS, re.IGNORECASE)
+}
+
+# Characters re.IGNORECASE matches to a letter although str.lower() does not
+_FOLD_EXTRA = {"İ": "i", "ı": "i", "ſ": "s"}
+_FOLD_EXTRA_CHARS = re.compile("[İıſ]")
+
+# Largest number of literal prefixes expanded from one pattern
+MAX_KEYWORD_PREFIXES = 64
+
+_TERMINAL = ""
+
+
+def guard_text(text: str) -> str:
+    """
+    Truncate over-long lines and text before matching
+    
+    Used by every extraction path, so single-receipt and bulk extraction
+    see the same text whichever regex engine runs the patterns.
+    
+    Args:
+        text: Text to extract from
+        
+    Returns:
+        str: Text with lines cut to EXTRACTION_MAX_LINE_LENGTH and the whole
+            text to EXTRACTION_MAX_TEXT_LENGTH characters
+    """
+    if not text:
+        return text
+    
+    if len(text) > EXTRACTION_MAX_TEXT_LENGTH:
+        text = text[:EXTRACTION_MAX_TEXT_LENGTH]
+    if any(len(line) > EXTRACTION_MAX_LINE_LENGTH for line in text.split("\n")):
+        text = "\n".join(line[:EXTRACTION_MAX_LINE_LENGTH] for line in text.split("\n"))
+    return text
+
+
+def fold_case(text: str) -> str:
+    """Lowercase text the way re.IGNORECASE compares it, keeping positions"""
+    folded = text.lower()
+    if len(folded) != len(text) or _FOLD_EXTRA_CHARS.search(text):
+        folded = "".join(
+            _FOLD_EXTRA.get(c) or (c.lower() if len(c.lower()) == 1 else c) for c in text
+        )
+    return folded
+
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """Split a regex on top-level '|' (outside groups and character classes)"""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            close = pattern.find("]", i + 2)
+            i = close + 1 if close > 0 else len(pattern)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    
+    parts.append(pattern[start:])
+    return parts
+
+
+def _group_end(pattern: str, start: int) -> Optional[int]:
+    """Index of the ')' closing the group opened at start"""
+    depth, i = 0, start
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            close = pattern.find("]", i + 2)
+            if close < 0:
+                return None
+            i = close + 1
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return None
+
+
+def _literal_prefixes(pattern: str) -> Set[str]:
+    """Literal strings one of which starts every match (empty if unknown)"""
+    options = {""}
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if not escaped or escaped.isalnum():
+                break
+            chars, end = {escaped}, i + 2
+        elif char == "[":
+            close = pattern.find("]", i + 2)
+            body = pattern[i + 1:close]
+            if close < 0 or any(c in body for c in "\\^-["):
+                break
+            chars, end = set(body), close + 1
+        elif char in ".^$|()?*+{}":
+            break
+        else:
+            chars, end = {char}, i + 1
+        
+        quantifier = pattern[end:end + 1]
+        if quantifier and quantifier in "?*{":
+            break
+        
+        expanded = {option + c for option in options for c in chars}
+        if len(expanded) > MAX_KEYWORD_PREFIXES:
+            break
+        options = expanded
+        i = end
+        if quantifier == "+":
+            break
+    
+    return {fold_case(option) for option in options if option}
+
+
+def keyword_prefixes(pattern: str) -> Optional[Set[str]]:
+    """
+    Case-folded keywords one of which every match of a pattern starts with
+    
+    Handles patterns made of literal alternatives, optionally wrapped in a
+    leading non-capturing group, e.g. "(?:Tel|Phone|ĐT)[:\\s]*...".
+    
+    Args:
+        pattern: Regular expression source
+        
+    Returns:
+        set: Keyword prefixes, or None when the pattern has no literal prefix
+    """
+    alternatives = _split_alternatives(pattern)
+    if len(alternatives) == 1 and pattern.startswith("(?:"):
+        end = _group_end(pattern, 0)
+        if end is None or pattern[end + 1:end + 2] in ("?", "*", "{"):
+            return None
+        alternatives = _split_alternatives(pattern[3:end])
+    
+    keywords = set()
+    for alternative in alternatives:
+        prefixes = _literal_prefixes(alternative)
+        if not prefixes:
+            return None
+        keywords |= prefixes
+    
+    return keywords
+
+
+class KeywordTrie:
+    """
+    Trie of keywords reporting every (payload, start position) in one pass
+    
+    The trie is compiled into a regex with shared prefixes factored out
+    (e.g. "t(?:ax|hu(?:e|ế)|o(?:ng|tal))"), whose greedy branches match the
+    longest keyword starting at a position. Shorter keywords starting there
+    are its prefixes, so their payloads are looked up with it.
+    """
+    
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+        self._regex = None
+        self._payloads: Dict[str, List[Any]] = {}
+    
+    def add(self, keyword: str, payload):
+        """Register a keyword for a payload"""
+        node = self.root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node.setdefault(_TERMINAL, []).append(payload)
+        self._regex = None
+    
+    def _compile(self, node: Dict[str, Any], prefix: str, payloads: List[Any]) -> str:
+        """Regex for the keywords below node; fills self._payloads"""
+        payloads = payloads + [p for p in node.get(_TERMINAL, ()) if p not in payloads]
+        if _TERMINAL in node:
+            self._payloads[prefix] = payloads
+        
+        branches = [
+            re.escape(char) + self._compile(child, prefix + char, payloads)
+            for char, child in sorted(node.items()) if char != _TERMINAL
+        ]
+        if not branches:
+            return ""
+        
+        regex = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A keyword ending here may be extended by a longer one
+        return f"(?:{regex})?" if _TERMINAL in node else regex
+    
+    def find(self, folded: str) -> Dict[Any, List[int]]:
+        """
+        Find all keyword occurrences in case-folded text
+        
+        Args:
+            folded: Text from fold_case()
+            
+        Returns:
+            dict: payload -> sorted start positions of its keywords
+        """
+        hits: Dict[Any, List[int]] = {}
+        if not self.root:
+            return hits
+        
+        if self._regex is None:
+            self._payloads = {}
+            self._regex = re.compile(self._compile(self.root, "", []))
+        
+        search = self._regex.search
+        match = search(folded)
+        while match:
+            start = match.start()
+            for payload in self._payloads[match.group()]:
+                positions = hits.setdefault(payload, [])
+                if not positions or positions[-1] != start:
+                    positions.append(start)
+            match = search(folded, start + 1)
+        
+        return hits
+
+
+# Python's Unicode \s, \d and \w for RE2, whose classes are ASCII-only
+_RE2_CLASSES = {
+    "s": r"\t-\r\x{1c}-\x{20}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}"
+         r"\x{202f}\x{205f}\x{3000}",
+    "d": r"\p{Nd}",
+    "w": r"\p{L}\p{N}_"
+}
+
+
+def to_re2_pattern(pattern: str, flags: int) -> str:
+    r"""
+    Rewrite a Python regex for RE2
+    
+    Flags become inline flags, \uXXXX escapes become \x{XXXX} and \s, \d,
+    \w get Python's Unicode meaning. \b stays ASCII-based in RE2.
+    
+    Args:
+        pattern: Python regular expression source
+        flags: re flags (IGNORECASE, MULTILINE and DOTALL are supported)
+        
+    Returns:
+        str: RE2 pattern
+    """
+    out, in_class, i = [], False, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if escaped in _RE2_CLASSES:
+                members = _RE2_CLASSES[escaped]
+                out.append(members if in_class else f"[{members}]")
+            elif escaped in "uU":
+                digits = 4 if escaped == "u" else 8
+                out.append(f"\\x{{{pattern[i + 2:i + 2 + digits]}}}")
+                i += 2 + digits
+                continue
+            else:
+                out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if char == "[" and not in_class:
+            in_class = True
+            # A leading "]" or "^]" is a literal member
+            prefix = "[^]" if pattern.startswith("[^]", i) else "[]" if pattern.startswith("[]", i) else None
+            if prefix:
+                out.append(prefix)
+                i += len(prefix)
+                continue
+        elif char == "]" and in_class:
+            in_class = False
+        out.append(char)
+        i += 1
+    
+    inline = "".join(flag for flag, bit in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL))
+                     if flags & bit)
+    return (f"(?{inline})" if inline else "") + "".join(out)
+
+
+def compile_pattern(pattern: str, flags: int, backend: str = "auto"):
+    """
+    Compile a pattern with RE2 when requested and possible, else Python re
+    
+    Args:
+        pattern: Python regular expression source
+        flags: re flags
+        backend: One of REGEX_BACKENDS
+        
+    Returns:
+        Compiled pattern with the re.Pattern match/search/finditer/sub API
+    """
+    if backend not in REGEX_BACKENDS:
+        raise ValueError(f"Unknown regex backend '{backend}'. Available: {', '.join(REGEX_BACKENDS)}")
+    if backend == "re2" and re2 is None:
+        raise ImportError("google-re2 is not installed. Install it with 'pip install google-re2' "
+                          "or use EXTRACTION_REGEX_BACKEND=re")
+    
+    if backend != "re" and re2 is not None:
+        try:
+            return re2.compile(to_re2_pattern(pattern, flags))
+        except re2.error as e:
+            logger.warning(f"Pattern not supported by RE2, using re: {pattern!r} ({e})")
+    
+    return re.compile(pattern, flags)
+
+
+class CompiledPattern:
+    """A compiled pattern, the keywords that anchor it (None if unanchored) and its metrics"""
+    
+    __slots__ = ("regex", "keywords", "linear", "seconds", "budget_exceeded")
+    
+    def __init__(self, pattern: str, flags: int, anchored: bool = True, backend: str = "auto",
+                 label: Tuple[str, int] = ("", 0)):
+        self.regex = compile_pattern(pattern, flags, backend)
+        self.linear = not isinstance(self.regex, re.Pattern)
+        # RE2 re-encodes the text on every call, so one linear scan beats anchored matches
+        anchored = anchored and not self.linear
+        self.keywords = keyword_prefixes(pattern) if anchored and flags & re.IGNORECASE else None
+        
+        group, index = label
+        self.seconds = extraction_pattern_seconds.labels(group=group, pattern=str(index))
+        self.budget_exceeded = extraction_pattern_budget_exceeded_total.labels(group=group, pattern=str(index))
+
+
+class ExtractionEngine:
+    """
+    Precompiled pattern groups sharing one keyword pass per text
+    
+    scan() runs the keyword trie once; search(), finditer() and sub() then
+    reuse its hits for every anchored pattern of any group.
+    """
+    
+    def __init__(self, groups: Dict[str, Tuple[List[str], int]] = None, anchored: bool = True,
+                 backend: str = None, budget_ms: float = None):
+        """
+        Initialize extraction engine
+        
+        Args:
+            groups: name -> (patterns, flags) (default: RECEIPT_PATTERN_GROUPS)
+            anchored: Try keyword patterns only at keyword hits; False scans
+                every pattern over the whole text like plain re calls
+            backend: "auto" (RE2 if installed), "re2" or "re"
+                (defaults to EXTRACTION_REGEX_BACKEND env var)
+            budget_ms: Matching time budget per pattern and text
+                (defaults to EXTRACTION_PATTERN_BUDGET_MS)
+        """
+        backend = backend or os.getenv("EXTRACTION_REGEX_BACKEND", "auto")
+        self.budget = (budget_ms if budget_ms is not None else EXTRACTION_PATTERN_BUDGET_MS) / 1000
+        self.groups: Dict[str, List[CompiledPattern]] = {}
+        self.trie = KeywordTrie()
+        
+        for name, (patterns, flags) in (groups or RECEIPT_PATTERN_GROUPS).items():
+            compiled = [CompiledPattern(pattern, flags, anchored, backend, (name, index))
+                        for index, pattern in enumerate(patterns)]
+            for index, pattern in enumerate(compiled):
+                for keyword in pattern.keywords or ():
+                    self.trie.add(keyword, (name, index))
+            self.groups[name] = compiled
+        
+        self.linear = all(pattern.linear for compiled in self.groups.values() for pattern in compiled)
+    
+    def guard(self, text: str) -> str:
+        """
+        Truncate over-long lines and text (see guard_text)
+        
+        Args:
+            text: Text to extract from
+            
+        Returns:
+            str: Text safe to run backtracking patterns on
+        """
+        return guard_text(text)
+    
+    def scan(self, text: str) -> Dict[Tuple[str, int], List[int]]:
+        """
+        Single keyword pass over text
+        
+        Args:
+            text: Text to extract from
+            
+        Returns:
+            dict: (group, pattern index) -> start positions of its keywords
+        """
+        return self.trie.find(fold_case(text))
+    
+    def _matches(self, group: str, index: int, text: str, hits: Dict) -> Iterator:
+        """Non-overlapping matches of one pattern, anchored at its keyword hits if it has keywords"""
+        pattern = self.groups[group][index]
+        if pattern.keywords is None:
+            yield from pattern.regex.finditer(text)
+            return
+        
+        end = 0
+        for position in hits.get((group, index), ()):
+            if position < end:
+                continue
+            match = pattern.regex.match(text, position)
+            if match:
+                yield match
+                end = max(match.end(), position + 1)
+    
+    def _budgeted(self, group: str, index: int, text: str, hits: Dict) -> Iterator:
+        """Matches of one pattern, timed and cut off once its time budget is used up"""
+        pattern = self.groups[group][index]
+        matches = self._matches(group, index, text, hits)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                match = next(matches, None)
+                elapsed += time.perf_counter() - start
+                if match is None:
+                    return
+                
+                yield match
+                if elapsed > self.budget:
+                    pattern.budget_exceeded.inc()
+                    logger.warning(f"Pattern {group}[{index}] exceeded its time budget "
+                                   f"({elapsed * 1000:.1f} ms, {len(text)} chars)")
+                    return
+        finally:
+            pattern.seconds.observe(elapsed)
+    
+    def _hits_for(self, group: str, text: str, hits: Optional[Dict]) -> Dict:
+        """Keyword hits, scanned only if an anchored pattern of the group needs them"""
+        if hits is None and any(pattern.keywords is not None for pattern in self.groups[group]):
+            hits = self.scan(text)
+        return hits or {}
+    
+    def search(self, group: str, text: str, hits: Dict = None) -> Iterator[re.Match]:
+        """
+        First match of each pattern of a group, in pattern order
+        
+        Equivalent to calling re.search with each pattern in turn; patterns
+        without a match are skipped.
+        
+        Args:
+            group: Pattern group name
+            text: Text to search
+            hits: Result of scan(text), computed if not given
+            
+        Yields:
+            re.Match: One match per matching pattern
+        """
+        hits = self._hits_for(group, text, hits)
+        for index in range(len(self.groups[group])):
+            matches = self._budgeted(group, index, text, hits)
+            match = next(matches, None)
+            matches.close()
+            if match:
+                yield match
+    
+    def finditer(self, group: str, text: str, hits: Dict = None) -> Iterator[re.Match]:
+        """
+        All matches of each pattern of a group, pattern by pattern
+        
+        Equivalent to chaining re.finditer over the group's patterns.
+        
+        Args:
+            group: Pattern group name
+            text: Text to search
+            hits: Result of scan(text), computed if not given
+            
+        Yields:
+            re.Match: Non-overlapping matches of each pattern
+        """
+        hits = self._hits_for(group, text, hits)
+        for index in range(len(self.groups[group])):
+            yield from self._budgeted(group, index, text, hits)
+    
+    def sub(self, group: str, repl: str, text: str) -> str:
+        """
+        Apply re.sub with each pattern of a group in turn
+        
+        Patterns whose keywords do not occur are skipped; the text is
+        rescanned only after a substitution changed it.
+        
+        Args:
+            group: Pattern group name
+            repl: Replacement string
+            text: Text to rewrite
+            
+        Returns:
+            str: Rewritten text
+        """
+        hits = None
+        for index, pattern in enumerate(self.groups[group]):
+            if pattern.keywords is not None:
+                if hits is None:
+                    hits = self.scan(text)
+                if (group, index) not in hits:
+                    continue
+            
+            start = time.perf_counter()
+            replaced = pattern.regex.sub(repl, text)
+            pattern.seconds.observe(time.perf_counter() - start)
+            if replaced != text:
+                text = replaced
+                hits = None
+        
+        return text
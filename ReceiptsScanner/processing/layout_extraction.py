@@ -0,0 +1,201 @@
+"""
+Layout-aware extraction from OCR word boxes
+
+Flat OCR text loses where a number sits on the receipt, so the regex path
+falls back to the largest amount. ReceiptLayout groups word boxes into lines
+(by vertical centre) and columns (by right edge) with numpy, and keeps the
+line centres as a sorted interval index on y. The total is the right-aligned
+amount on the bottom-most line with a total keyword.
+"""
+import os
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ocr_engines.boxes import OCRBoxes, as_columnar
+from processing.patterns import clean_amount
+
+# Words whose vertical centres are closer than this share of the median word
+# height belong to the same line
+LAYOUT_LINE_TOLERANCE = float(os.getenv("LAYOUT_LINE_TOLERANCE", "0.5"))
+
+# Total keywords, strongest first; "subtotal" never matches "total"
+TOTAL_KEYWORDS = [
+    re.compile(r'(?<!\w)(?:grand\s+total|total|t[ổo]ng(?:\s+c[ộo]ng)?)(?!\w)', re.IGNORECASE),
+    re.compile(r'(?<!\w)(?:th[àa]nh\s+ti[ềe]n|s[ốo]\s+ti[ềe]n|amount)(?!\w)', re.IGNORECASE),
+    re.compile(r'(?<!\w)(?:thanh\s+to[áa]n|payment)(?!\w)', re.IGNORECASE),
+]
+
+# Three or more digits: quantities and item counts are shorter than any amount
+AMOUNT_TOKEN = re.compile(r'\d[.,]?\d[.,]?\d[\d.,]*')
+
+
+class ReceiptLayout:
+    """Word boxes in reading order, grouped into lines and right-edge columns"""
+    
+    def __init__(self, boxes, line_tolerance: float = None):
+        """
+        Group boxes into lines
+        
+        Sorting by vertical centre is the only super-linear step; Tesseract
+        emits words in reading order, so the stable sort is close to linear.
+        
+        Args:
+            boxes: OCRBoxes or list-of-dicts boxes
+            line_tolerance: Line split gap as a share of the median word
+                height (defaults to LAYOUT_LINE_TOLERANCE)
+        """
+        boxes = as_columnar(boxes)
+        ratio = LAYOUT_LINE_TOLERANCE if line_tolerance is None else line_tolerance
+        self.tolerance = max(1.0, float(np.median(boxes.height)) * ratio) if len(boxes) else 1.0
+        
+        order = np.argsort(boxes.center_y, kind="stable")
+        centers = boxes.center_y[order]
+        line_of = np.zeros(len(order), dtype=np.int64)
+        line_of[1:] = np.cumsum(np.diff(centers) > self.tolerance)
+        
+        # Left to right inside each line; line ids are already non-decreasing
+        order = order[np.lexsort((boxes.x[order], line_of))]
+        self.boxes: OCRBoxes = boxes[order]
+        
+        self.starts = np.flatnonzero(np.diff(line_of, prepend=-1)) if len(order) else np.zeros(0, dtype=np.int64)
+        self.ends = np.append(self.starts[1:], len(order))
+        
+        # Mean centre per line; chunks of a sorted array, so sorted as well
+        self.centers = np.add.reduceat(centers, self.starts) / (self.ends - self.starts) \
+            if len(order) else np.zeros(0)
+        
+        self.amounts = np.array([self._parse_amount(text) for text in self.boxes.text], dtype=np.float64)
+    
+    def __len__(self) -> int:
+        """Number of lines"""
+        return len(self.starts)
+    
+    @staticmethod
+    def _parse_amount(text: str) -> float:
+        match = AMOUNT_TOKEN.search(text)
+        return clean_amount(match.group(0).rstrip(".,")) if match else 0.0
+    
+    def line_text(self, line: int) -> Tuple[str, List[int]]:
+        """
+        Words of a line joined by spaces
+        
+        Returns:
+            tuple: (text, start offset of each word in the text)
+        """
+        words = self.boxes.text[self.starts[line]:self.ends[line]]
+        offsets = list(accumulate((len(word) + 1 for word in words[:-1]), initial=0))
+        return " ".join(words), offsets
+    
+    def lines_between(self, top: float, bottom: float) -> range:
+        """Lines whose centre lies in [top, bottom], by binary search"""
+        return range(int(np.searchsorted(self.centers, top, side="left")),
+                     int(np.searchsorted(self.centers, bottom, side="right")))
+    
+    def columns(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cluster boxes by right edge
+        
+        Args:
+            rows: Box indices
+        
+        Returns:
+            tuple: (column id per row, right edge per column), columns left to right
+        """
+        rights = self.boxes.right[rows]
+        order = np.argsort(rights, kind="stable")
+        column = np.zeros(len(rows), dtype=np.int64)
+        column[order[1:]] = np.cumsum(np.diff(rights[order]) > self.tolerance)
+        edges = np.zeros(column.max() + 1 if len(rows) else 0)
+        np.maximum.at(edges, column, rights)
+        return column, edges
+    
+    def amount_column(self) -> Optional[float]:
+        """Right edge of the column holding the most amounts (rightmost on ties)"""
+        rows = np.flatnonzero(self.amounts > 0)
+        if not len(rows):
+            return None
+        
+        column, edges = self.columns(rows)
+        counts = np.bincount(column)
+        return float(edges[np.flatnonzero(counts == counts.max())[-1]])
+    
+    def _merged_amount(self, index: int) -> float:
+        """Amount of a box joined with digit-only boxes OCR split off its left"""
+        text = self.boxes.text[index]
+        first = self.starts[np.searchsorted(self.starts, index, side="right") - 1]
+        left = index - 1
+        while (left >= first and self.boxes.text[left].isdigit()
+               and self.boxes.x[left + 1] - self.boxes.right[left] < self.boxes.height[left]):
+            text = self.boxes.text[left] + text
+            left -= 1
+        return self._parse_amount(text) if left < index - 1 else float(self.amounts[index])
+    
+    def _rows_near(self, index: int) -> np.ndarray:
+        """Boxes on lines whose centre is within the line tolerance of a box"""
+        lines = self.lines_between(self.boxes.y[index] - self.tolerance,
+                                   self.boxes.bottom[index] + self.tolerance)
+        if not len(lines):
+            return np.zeros(0, dtype=np.int64)
+        return np.arange(self.starts[lines.start], self.ends[lines.stop - 1])
+    
+    def _amounts_right_of(self, keyword: int, rows: np.ndarray) -> np.ndarray:
+        return rows[(self.amounts[rows] > 0) & (self.boxes.x[rows] >= self.boxes.right[keyword])]
+    
+    def find_total(self) -> float:
+        """
+        Right-aligned amount on the bottom-most line with a total keyword
+        
+        Amounts right of the keyword on its own line count first, then those
+        on lines whose centre lies within the line tolerance of the keyword's
+        box (a skewed or misaligned print). Amounts in the main amount column
+        win over others.
+        
+        Returns:
+            float: Total amount, 0.0 if no total line has an amount
+        """
+        texts = {}
+        column_edge = self.amount_column()
+        
+        for pattern in TOTAL_KEYWORDS:
+            for line in reversed(range(len(self))):
+                if line not in texts:
+                    texts[line] = self.line_text(line)
+                text, offsets = texts[line]
+                match = pattern.search(text)
+                if not match:
+                    continue
+                
+                keyword = self.starts[line] + bisect_right(offsets, match.end() - 1) - 1
+                rows = self._amounts_right_of(keyword, np.arange(self.starts[line], self.ends[line]))
+                if not len(rows):
+                    # Amount printed a little lower or higher than the keyword
+                    rows = self._amounts_right_of(keyword, self._rows_near(keyword))
+                if not len(rows):
+                    continue
+                
+                rights = self.boxes.right[rows]
+                if column_edge is not None and np.any(np.abs(rights - column_edge) <= self.tolerance):
+                    rows = rows[np.abs(rights - column_edge) <= self.tolerance]
+                    rights = self.boxes.right[rows]
+                return self._merged_amount(int(rows[np.argmax(rights)]))
+        
+        return 0.0
+
+
+def find_layout_total(boxes) -> float:
+    """
+    Total amount from OCR word boxes
+    
+    Args:
+        boxes: OCRBoxes or list-of-dicts boxes
+    
+    Returns:
+        float: Total amount, 0.0 when the layout has no total line
+    """
+    if boxes is None or not len(boxes):
+        return 0.0
+    return ReceiptLayout(boxes).find_total()
@@ -1,7 +1,10 @@
 """
 Regex patterns for extracting entities from receipt text
 """
+import os
 import re
+from datetime import datetime
+from functools import lru_cache
 
 # Date patterns (Vietnamese and international formats)
 DATE_PATTERNS = [
@@ -119,33 +122,119 @@ def clean_phone(phone_str: str) -> str:
     return cleaned
 
 
-def clean_date(date_str: str) -> str:
+def _date_tokens(first: int, last: int, space: bool = False) -> dict:
+    """Accepted spellings of day/month numbers (as strptime's %d/%m) -> value"""
+    tokens = {f"{n:02d}": n for n in range(max(first, 1), last + 1)}
+    tokens.update({str(n): n for n in range(first, last + 1)})
+    if space:
+        tokens.update({f" {n}": n for n in range(1, 10)})
+    return tokens
+
+
+_DAYS = _date_tokens(1, 31, space=True)
+_MONTHS = _date_tokens(1, 12)
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Numeric dates with one separator used twice, e.g. 15/10/2024 or 2024-10-15
+_NUMERIC_DATE = re.compile(r'(\d+| \d)([/-])(\d+| \d)\2(\d+| \d)')
+# Vietnamese long form, e.g. "15 Tháng 10 2024"
+_THANG_DATE = re.compile(r'(\d{1,2})\s+(?:Th[áa]ng|T)\s+(\d{1,2})\s+(\d{4})', re.IGNORECASE)
+
+# Day-first (15/10/2024) unless DATE_DAYFIRST=false, then 10/15/2024 wins
+DATE_DAYFIRST = os.getenv("DATE_DAYFIRST", "true").lower() == "true"
+DATE_CACHE_SIZE = int(os.getenv("DATE_CACHE_SIZE", "4096"))
+
+
+def _full_year(token: str) -> int:
+    """Value of a four-digit year (strptime %Y), 0 if malformed"""
+    return int(token) if len(token) == 4 and token.isdigit() else 0
+
+
+def _short_year(token: str) -> int:
+    """Value of a two-digit year (strptime %y: 69-99 -> 19xx, else 20xx), 0 if malformed"""
+    if len(token) != 2 or not token.isdigit():
+        return 0
+    year = int(token)
+    return year + (1900 if year >= 69 else 2000)
+
+
+def normalize_date_parts(day, month, year: int) -> str:
+    """
+    Format validated date parts as YYYY-MM-DD
+    
+    Args:
+        day: Day token or number
+        month: Month token or number
+        year: Full year (0 for a malformed year)
+        
+    Returns:
+        str: Standardized date, or "" if the parts are not a valid date
+    """
+    day = _DAYS.get(day) if isinstance(day, str) else day
+    month = _MONTHS.get(month) if isinstance(month, str) else month
+    if not day or not month or not 1 <= month <= 12 or year < 1:
+        return ""
+    
+    days = _DAYS_IN_MONTH[month - 1]
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        days = 29
+    if not 1 <= day <= days:
+        return ""
+    
+    if year < 1000:
+        return datetime(year, month, day).strftime('%Y-%m-%d')
+    return f"{year}-{month:02d}-{day:02d}"
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _normalize_date(date_str: str, dayfirst: bool) -> str:
+    """Cached parse of a stripped date string ("" if it is not a date)"""
+    match = _NUMERIC_DATE.fullmatch(date_str)
+    if match:
+        a, _, b, c = match.groups()
+        # Same candidate order as the former strptime format list
+        candidates = [
+            (a, b, _full_year(c)),    # DD/MM/YYYY
+            (a, b, _short_year(c)),   # DD/MM/YY
+            (c, b, _full_year(a)),    # YYYY/MM/DD
+            (b, a, _full_year(c))     # MM/DD/YYYY
+        ]
+        if not dayfirst:
+            candidates.insert(0, candidates.pop())
+        
+        for day, month, year in candidates:
+            normalized = normalize_date_parts(day, month, year)
+            if normalized:
+                return normalized
+        return ""
+    
+    match = _THANG_DATE.fullmatch(date_str)
+    if match:
+        day, month, year = match.groups()
+        return normalize_date_parts(day, month, _full_year(year))
+    
+    return ""
+
+
+def clean_date(date_str: str, dayfirst: bool = None) -> str:
     """
     Clean and standardize date format to YYYY-MM-DD
     
+    Accepts DD/MM/YYYY, DD/MM/YY, YYYY/MM/DD and MM/DD/YYYY with "/" or "-"
+    (tried in that order, month-first first when dayfirst is False), and the
+    Vietnamese "DD Tháng MM YYYY" form. Results are cached per string.
+    
     Args:
         date_str: Raw date string
+        dayfirst: Prefer DD/MM over MM/DD (defaults to DATE_DAYFIRST)
         
     Returns:
         str: Standardized date string (YYYY-MM-DD)
     """
-    from datetime import datetime
-    
     if not date_str:
         return ""
     
-    # Try different date formats
-    formats = [
-        '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y',
-        '%Y/%m/%d', '%Y-%m-%d',
-        '%m/%d/%Y', '%m-%d-%Y'
-    ]
-    
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(date_str.strip(), fmt)
-            return dt.strftime('%Y-%m-%d')
-        except ValueError:
-            continue
-    
-    return date_str  # Return original if parsing fails
\ No newline at end of file
+    if dayfirst is None:
+        dayfirst = DATE_DAYFIRST
+    
+    return _normalize_date(date_str.strip(), dayfirst) or date_str  # Original if parsing fails
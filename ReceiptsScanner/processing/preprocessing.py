@@ -4,36 +4,131 @@ Image preprocessing for better OCR results
 import cv2
 import numpy as np
 from PIL import Image
+import io
 import os
+from typing import Optional, Tuple, Dict, Any, Union
 from monitoring.logging_config import get_logger
 
 logger = get_logger(__name__)
 
-def preprocess_image(image_path: str, dpi: int = 300) -> np.ndarray:
+# Resolution control: resample so glyphs are about TARGET_GLYPH_HEIGHT pixels
+# tall (Tesseract works best around 20-35px), never exceeding MAX_PIXELS
+TARGET_GLYPH_HEIGHT = int(os.getenv("OCR_TARGET_GLYPH_HEIGHT", "30"))
+MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", "12000000"))
+MAX_UPSCALE = 300 / 72
+
+# Size of the thumbnail used for glyph measurement
+GLYPH_THUMBNAIL_SIZE = 1200
+
+# Denoising recipes, cheapest first. "auto" picks one per image from the
+# measured noise level relative to the image contrast (in percent)
+DENOISE_RECIPES = ("none", "median", "bilateral", "nlm")
+DENOISE_RECIPE = os.getenv("OCR_DENOISE_RECIPE", "auto")
+RELATIVE_NOISE_THRESHOLDS = {
+    "none": 1.5,
+    "median": 3.0,
+    "bilateral": 6.0
+}
+# Laplacian variance below which an image counts as blurry
+BLUR_THRESHOLD = 100.0
+QUALITY_SAMPLE_SIZE = 800
+
+# Encoded images larger than this are decoded at 1/2 or 1/4 resolution
+# (IMREAD_REDUCED_GRAYSCALE_*), as long as the reduced image still fills
+# the pixel budget. Set OCR_REDUCED_DECODE=false to always decode full size
+REDUCED_DECODE = os.getenv("OCR_REDUCED_DECODE", "true").lower() == "true"
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4
+}
+
+ImageSource = Union[str, bytes, bytearray, memoryview, np.ndarray]
+
+# Bump when the pipeline changes in a way that alters its output
+PREPROCESSING_VERSION = 1
+
+# Receipt region detection: crop photos to the paper before the heavy stages.
+# The paper must cover DOCUMENT_MIN_AREA..DOCUMENT_MAX_AREA of the frame
+DOCUMENT_CROP = os.getenv("OCR_DOCUMENT_CROP", "true").lower() == "true"
+DOCUMENT_SAMPLE_SIZE = 500
+DOCUMENT_MIN_AREA = 0.15
+DOCUMENT_MAX_AREA = 0.95
+DOCUMENT_MARGIN = 0.01
+
+# Skew search range, thumbnail size and minimum confidence to rotate
+DESKEW_MAX_ANGLE = 15.0
+DESKEW_SAMPLE_SIZE = 800
+DESKEW_MIN_CONFIDENCE = 0.5
+
+def preprocess_image(image: ImageSource, dpi: int = 300, max_pixels: int = None,
+                     recipe: str = None, return_info: bool = False,
+                     reduced_decode: bool = None, crop: bool = None):
     """
     Preprocess receipt image for better OCR accuracy
     
     Args:
-        image_path: Path to the image file
-        dpi: Target DPI for image (default: 300)
+        image: Path to the image file, encoded image bytes (bytes, bytearray,
+            memoryview or 1-D uint8 array) or an already decoded image array
+        dpi: Target DPI, used when scale comes from image DPI metadata
+        max_pixels: Pixel budget for the working image (default: OCR_MAX_PIXELS)
+        recipe: Denoising recipe, one of DENOISE_RECIPES or "auto"
+            (default: OCR_DENOISE_RECIPE)
+        return_info: Also return a dict describing what was applied
+        reduced_decode: Allow reduced-resolution decoding of large images
+            (default: OCR_REDUCED_DECODE)
+        crop: Crop to the detected receipt region (default: OCR_DOCUMENT_CROP)
         
     Returns:
-        np.ndarray: Preprocessed image
+        np.ndarray: Preprocessed image, or (image, info) if return_info
     """
+    info: Dict[str, Any] = {"recipe": "fallback"}
+    gray = None
+    
     try:
-        logger.info(f"Preprocessing image: {image_path}")
-        
-        # Read image
-        image = cv2.imread(image_path)
-        
-        if image is None:
-            raise ValueError(f"Could not read image: {image_path}")
+        logger.info(f"Preprocessing image: {describe_source(image)}")
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Decode once, straight to grayscale
+        gray, image_dpi, reduction = load_grayscale(
+            image, max_pixels=max_pixels, reduced_decode=reduced_decode
+        )
         
-        # Apply denoising
-        denoised = cv2.fastNlMeansDenoising(gray, None, h=10, templateWindowSize=7, searchWindowSize=21)
+        # Crop to the receipt so background is not denoised or OCR'd
+        crop_pixels_saved = 0
+        if crop is None:
+            crop = DOCUMENT_CROP
+        if crop:
+            pixels = gray.size
+            gray = crop_to_region(gray, detect_receipt_region(gray))
+            crop_pixels_saved = pixels - gray.size
+        
+        # Resample toward the target glyph size. Downscaling happens before
+        # the expensive denoise step, upscaling after it (on fewer pixels)
+        scale, source = estimate_scale(
+            gray,
+            image_dpi=image_dpi,
+            target_dpi=dpi,
+            max_pixels=max_pixels
+        )
+        if scale < 1.0:
+            # The pixel budget is a hard limit, so no tolerance there
+            tolerance = 0.0 if source.endswith("+budget") else 0.1
+            gray = resize_to_scale(gray, scale, tolerance=tolerance)
+        
+        # Apply denoising, as strong as the measured image quality requires
+        quality = estimate_image_quality(gray)
+        chosen = recipe or DENOISE_RECIPE
+        if chosen == "auto":
+            chosen = choose_denoise_recipe(quality)
+        denoised = denoise_image(gray, chosen)
+        
+        if scale > 1.0:
+            denoised = resize_to_scale(denoised, scale)
+        logger.info(f"Working resolution {denoised.shape} (scale={scale:.2f}, source={source}, "
+                   f"recipe={chosen}, noise={quality['relative_noise']:.2f}%)")
+        
+        info = dict(quality, recipe=chosen, scale=round(scale, 4), scale_source=source,
+                    decode_reduction=reduction, crop_pixels_saved=crop_pixels_saved)
         
         # Apply adaptive thresholding
         thresh = cv2.adaptiveThreshold(
@@ -46,52 +141,456 @@ def preprocess_image(image_path: str, dpi: int = 300) -> np.ndarray:
         )
         
         # Deskew if needed
-        deskewed = deskew_image(thresh)
-        
-        # Resize to target DPI if image is too small
-        resized = resize_to_dpi(deskewed, target_dpi=dpi)
+        skew = estimate_skew(thresh)
+        deskewed = deskew_image(thresh, skew)
+        info["skew_angle"], info["skew_confidence"] = skew
         
         # Enhance contrast
-        enhanced = enhance_contrast(resized)
+        enhanced = enhance_contrast(deskewed)
         
         logger.info(f"Image preprocessed: {enhanced.shape}")
         
-        return enhanced
+        return (enhanced, info) if return_info else enhanced
         
     except Exception as e:
         logger.error(f"Preprocessing failed: {str(e)}")
-        # Return original grayscale image if preprocessing fails
-        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        return image if image is not None else np.zeros((100, 100), dtype=np.uint8)
+        # Return the decoded grayscale image if preprocessing fails
+        if gray is None:
+            gray = np.zeros((100, 100), dtype=np.uint8)
+        return (gray, info) if return_info else gray
+
 
+def preprocessing_settings() -> Dict[str, Any]:
+    """Settings that determine preprocess_image output, for cache fingerprints"""
+    return {
+        "version": PREPROCESSING_VERSION,
+        "target_glyph_height": TARGET_GLYPH_HEIGHT,
+        "max_pixels": MAX_PIXELS,
+        "denoise_recipe": DENOISE_RECIPE,
+        "reduced_decode": REDUCED_DECODE,
+        "document_crop": DOCUMENT_CROP
+    }
 
-def deskew_image(image: np.ndarray) -> np.ndarray:
+
+def describe_source(image: ImageSource) -> str:
+    """Short description of an image source for logging"""
+    if isinstance(image, str):
+        return image
+    if isinstance(image, np.ndarray):
+        return f"<array {image.shape} {image.dtype}>"
+    return f"<{type(image).__name__} {memoryview(image).nbytes} bytes>"
+
+
+def load_grayscale(image: ImageSource, max_pixels: int = None,
+                   reduced_decode: bool = None) -> Tuple[np.ndarray, Optional[float], int]:
     """
-    Detect and correct skew in image
+    Decode an image source to grayscale exactly once
+    
+    Files are read into memory and decoded with cv2.imdecode, like in-memory
+    bytes, so metadata (size, DPI) comes from the same buffer. When the
+    encoded image is much larger than the pixel budget it is decoded at
+    1/2 or 1/4 resolution, which is cheaper than decoding and downscaling.
+    
+    Args:
+        image: Path, encoded bytes/bytearray/memoryview/1-D uint8 array,
+            or a decoded grayscale/BGR/BGRA array
+        max_pixels: Pixel budget for the working image (default: OCR_MAX_PIXELS)
+        reduced_decode: Allow reduced-resolution decoding (default: OCR_REDUCED_DECODE)
+        
+    Returns:
+        tuple: (grayscale image, DPI of the decoded image or None, reduction factor)
+    """
+    if isinstance(image, np.ndarray) and image.ndim > 1:
+        return to_grayscale(image), None, 1
+    
+    if isinstance(image, str):
+        data = np.fromfile(image, dtype=np.uint8)
+    else:
+        data = np.frombuffer(image, dtype=np.uint8)
+    
+    if data.size == 0:
+        raise ValueError("Could not read image: empty input")
+    
+    size, image_dpi = read_image_header(data)
+    
+    if reduced_decode is None:
+        reduced_decode = REDUCED_DECODE
+    reduction = choose_decode_reduction(size, max_pixels) if reduced_decode else 1
+    
+    gray = cv2.imdecode(data, REDUCED_DECODE_FLAGS[reduction])
+    if gray is None:
+        raise ValueError(f"Could not decode image: {describe_source(image)}")
+    
+    if image_dpi and reduction > 1:
+        image_dpi /= reduction
+    
+    return gray, image_dpi, reduction
+
+
+def to_grayscale(image: np.ndarray) -> np.ndarray:
+    """Convert a decoded grayscale, BGR or BGRA image to 8-bit grayscale"""
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    elif image.ndim == 3 and image.shape[2] == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    elif image.ndim == 3:
+        image = image[:, :, 0]
+    
+    if image.dtype != np.uint8:
+        image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    
+    return image
+
+
+def choose_decode_reduction(size: Optional[Tuple[int, int]], max_pixels: int = None) -> int:
+    """
+    Pick the largest decode reduction (1, 2 or 4) that stays within budget
+    
+    The reduced image must still have at least max_pixels pixels, so the
+    working image never ends up smaller than it would with a full decode.
+    
+    Args:
+        size: (width, height) from the image header, or None if unknown
+        max_pixels: Pixel budget for the working image (default: OCR_MAX_PIXELS)
+        
+    Returns:
+        int: Reduction factor
+    """
+    if not size:
+        return 1
+    
+    pixels = size[0] * size[1]
+    max_pixels = max_pixels or MAX_PIXELS
+    
+    for factor in (4, 2):
+        if pixels / (factor * factor) >= max_pixels:
+            return factor
+    return 1
+
+
+def read_image_header(data: Union[bytes, np.ndarray]) -> Tuple[Optional[Tuple[int, int]], Optional[float]]:
+    """
+    Read image size and DPI from encoded bytes without decoding pixels
+    
+    Args:
+        data: Encoded image bytes
+        
+    Returns:
+        tuple: ((width, height) or None, DPI or None)
+    """
+    try:
+        with Image.open(io.BytesIO(memoryview(data))) as img:
+            return img.size, _dpi_from_pil(img)
+    except Exception as e:
+        logger.warning(f"Could not read image header: {str(e)}")
+        return None, None
+
+
+def detect_receipt_region(image: np.ndarray, sample_size: int = DOCUMENT_SAMPLE_SIZE,
+                          min_area: float = DOCUMENT_MIN_AREA,
+                          max_area: float = DOCUMENT_MAX_AREA) -> Optional[np.ndarray]:
+    """
+    Find the receipt paper in a photo using a thumbnail
+    
+    The paper is taken as the largest bright region (Otsu threshold). A clean
+    four-sided outline away from the frame edges gives a quadrilateral for a
+    perspective warp; otherwise the region's bounding box is used, so paper
+    running off the frame is never clipped. Nothing is returned when the
+    region is too small or large, or when paper-bright pixels remain outside
+    it (e.g. a scan with large dark areas).
     
     Args:
         image: Grayscale image
+        sample_size: Longest side of the thumbnail
+        min_area: Minimum region area as a fraction of the image
+        max_area: Maximum region area; larger regions save too little to crop
         
     Returns:
-        np.ndarray: Deskewed image
+        np.ndarray: Corners (top-left, top-right, bottom-right, bottom-left)
+            as a 4x2 float32 array in image coordinates, or None
     """
     try:
-        # Calculate skew angle
-        coords = np.column_stack(np.where(image > 0))
+        h, w = image.shape[:2]
+        factor = min(1.0, sample_size / float(max(h, w)))
+        thumbnail = cv2.resize(image, (max(1, int(w * factor)), max(1, int(h * factor))),
+                               interpolation=cv2.INTER_AREA)
+        th, tw = thumbnail.shape
+        
+        blurred = cv2.GaussianBlur(thumbnail, (5, 5), 0)
+        _, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((9, 9), np.uint8))
+        
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        
+        hull = cv2.convexHull(max(contours, key=cv2.contourArea))
+        hull_area = cv2.contourArea(hull)
+        if not min_area <= hull_area / (th * tw) <= max_area:
+            return None
+        
+        # Paper-bright pixels outside the region mean it is not the whole paper
+        region = np.zeros_like(mask)
+        cv2.fillConvexPoly(region, hull, 255)
+        outside = region == 0
+        if np.count_nonzero(mask[outside]) > 0.05 * np.count_nonzero(outside):
+            return None
+        
+        quad = cv2.approxPolyDP(hull, 0.02 * cv2.arcLength(hull, True), True).reshape(-1, 2)
+        border = max(2, int(0.01 * max(th, tw)))
+        x, y, bw, bh = cv2.boundingRect(hull)
+        touches_border = x < border or y < border or x + bw > tw - border or y + bh > th - border
+        
+        if (len(quad) == 4 and not touches_border
+                and abs(cv2.contourArea(quad) / hull_area - 1.0) < 0.1):
+            corners = order_corners(quad.astype(np.float32))
+        else:
+            corners = np.array([[x, y], [x + bw, y], [x + bw, y + bh], [x, y + bh]],
+                               dtype=np.float32)
+        
+        return corners / factor
         
-        if len(coords) < 5:
-            return image
+    except Exception as e:
+        logger.warning(f"Receipt region detection failed: {str(e)}")
+        return None
+
+
+def order_corners(points: np.ndarray) -> np.ndarray:
+    """Order four points as top-left, top-right, bottom-right, bottom-left"""
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)]
+    ], dtype=np.float32)
+
+
+def crop_to_region(image: np.ndarray, corners: Optional[np.ndarray],
+                   margin: float = DOCUMENT_MARGIN) -> np.ndarray:
+    """
+    Crop an image to a detected receipt region
+    
+    Axis-aligned regions are sliced (no copy); other quadrilaterals are
+    perspective-warped to a rectangle at the region's own resolution.
+    
+    Args:
+        image: Grayscale image
+        corners: Corners from detect_receipt_region, or None to skip
+        margin: Extra border kept around the region, as a fraction of its size
+        
+    Returns:
+        np.ndarray: Cropped image
+    """
+    if corners is None:
+        return image
+    
+    try:
+        h, w = image.shape[:2]
+        tl, tr, br, bl = corners
+        
+        if tl[1] == tr[1] and tl[0] == bl[0] and br[1] == bl[1] and br[0] == tr[0]:
+            pad_x = margin * (tr[0] - tl[0])
+            pad_y = margin * (bl[1] - tl[1])
+            left = max(0, int(tl[0] - pad_x))
+            top = max(0, int(tl[1] - pad_y))
+            right = min(w, int(np.ceil(br[0] + pad_x)))
+            bottom = min(h, int(np.ceil(br[1] + pad_y)))
+            return image[top:bottom, left:right]
+        
+        # Grow the quadrilateral around its centre, then map it to a rectangle
+        center = corners.mean(axis=0)
+        corners = center + (corners - center) * (1.0 + 2 * margin)
+        tl, tr, br, bl = corners
+        width = int(round(max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))))
+        height = int(round(max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))))
+        
+        target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]],
+                          dtype=np.float32)
+        M = cv2.getPerspectiveTransform(corners.astype(np.float32), target)
+        return cv2.warpPerspective(image, M, (width, height), flags=cv2.INTER_LINEAR,
+                                   borderMode=cv2.BORDER_REPLICATE)
+        
+    except Exception as e:
+        logger.warning(f"Receipt crop failed: {str(e)}")
+        return image
+
+
+def estimate_image_quality(image: np.ndarray, sample_size: int = QUALITY_SAMPLE_SIZE) -> Dict[str, float]:
+    """
+    Fast image quality estimate on a downsampled copy
+    
+    Noise sigma uses Immerkaer's Laplacian-difference estimator restricted
+    to flat (low-gradient) pixels, so text edges do not count as noise. The
+    copy is decimated rather than averaged to keep per-pixel noise intact.
+    
+    Args:
+        image: Grayscale image
+        sample_size: Longest side of the sampled copy
+        
+    Returns:
+        dict: noise_sigma, relative_noise (% of contrast), blur (Laplacian
+            variance, lower is blurrier) and contrast (p95 - p5 intensity)
+    """
+    h, w = image.shape[:2]
+    step = max(1, -(-max(h, w) // sample_size))
+    sample = image[::step, ::step].astype(np.float32)
+    
+    if min(sample.shape) < 3:
+        return {"noise_sigma": 0.0, "relative_noise": 0.0, "blur": 0.0, "contrast": 0.0}
+    
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    response = np.abs(cv2.filter2D(sample, -1, kernel)[1:-1, 1:-1])
+    
+    gradient = (np.abs(cv2.Sobel(sample, cv2.CV_32F, 1, 0)) +
+                np.abs(cv2.Sobel(sample, cv2.CV_32F, 0, 1)))[1:-1, 1:-1]
+    flat = gradient <= np.median(gradient)
+    noise_sigma = float(np.sqrt(np.pi / 2) * response[flat].mean() / 6) if flat.any() else 0.0
+    
+    thumb = cv2.resize(image, (max(1, w // step), max(1, h // step)), interpolation=cv2.INTER_AREA)
+    blur = float(cv2.Laplacian(thumb, cv2.CV_32F).var())
+    p5, p95 = np.percentile(thumb, [5, 95])
+    contrast = float(p95 - p5)
+    
+    return {
+        "noise_sigma": round(noise_sigma, 3),
+        "relative_noise": round(100.0 * noise_sigma / max(contrast, 1.0), 3),
+        "blur": round(blur, 1),
+        "contrast": contrast
+    }
+
+
+def choose_denoise_recipe(quality: Dict[str, float]) -> str:
+    """
+    Pick the cheapest denoising recipe that handles the measured noise
+    
+    Args:
+        quality: Output of estimate_image_quality
+        
+    Returns:
+        str: One of DENOISE_RECIPES
+    """
+    relative_noise = quality["relative_noise"]
+    
+    for recipe in ("none", "median", "bilateral"):
+        if relative_noise < RELATIVE_NOISE_THRESHOLDS[recipe]:
+            return recipe
+    
+    # NLM smears already blurry text; use the edge-preserving filter instead
+    if quality["blur"] < BLUR_THRESHOLD:
+        return "bilateral"
+    
+    return "nlm"
+
+
+def denoise_image(image: np.ndarray, recipe: str) -> np.ndarray:
+    """
+    Apply a denoising recipe
+    
+    Args:
+        image: Grayscale image
+        recipe: One of DENOISE_RECIPES
         
-        angle = cv2.minAreaRect(coords)[-1]
+    Returns:
+        np.ndarray: Denoised image
+    """
+    if recipe == "none":
+        return image
+    if recipe == "median":
+        return cv2.medianBlur(image, 3)
+    if recipe == "bilateral":
+        return cv2.bilateralFilter(image, 5, 30, 5)
+    if recipe == "nlm":
+        return cv2.fastNlMeansDenoising(image, None, h=10, templateWindowSize=7, searchWindowSize=21)
+    
+    raise ValueError(f"Unknown denoise recipe: {recipe}. Available: {', '.join(DENOISE_RECIPES)}")
+
+
+def estimate_skew(image: np.ndarray, max_angle: float = DESKEW_MAX_ANGLE,
+                  sample_size: int = DESKEW_SAMPLE_SIZE) -> Tuple[float, float]:
+    """
+    Estimate text skew with a projection-profile search on a thumbnail
+    
+    Dark (text) pixels of a downsampled copy are projected onto the vertical
+    axis for each candidate angle; text lines line up into sharp peaks at
+    the right angle. The profile is high-pass filtered so background texture
+    does not count, and pixels are taken from the inscribed circle so every
+    angle sees the same footprint. A coarse 1 degree search is refined in
+    0.1 degree steps.
+    
+    Args:
+        image: Grayscale or binary image, dark text on light background
+        max_angle: Largest skew searched, in degrees
+        sample_size: Longest side of the thumbnail
         
-        # Adjust angle
-        if angle < -45:
-            angle = 90 + angle
-        elif angle > 45:
-            angle = angle - 90
+    Returns:
+        tuple: (correction angle in degrees for cv2.getRotationMatrix2D,
+            confidence in 0-1)
+    """
+    h, w = image.shape[:2]
+    scale = min(1.0, sample_size / max(h, w))
+    
+    thumb = image
+    if scale < 1.0:
+        thumb = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    
+    ys, xs = np.nonzero(thumb < 128)
+    if len(ys) < 50:
+        return 0.0, 0.0
+    
+    th, tw = thumb.shape[:2]
+    ys = ys.astype(np.float32) - th / 2
+    xs = xs.astype(np.float32) - tw / 2
+    radius = min(th, tw) / 2
+    inside = ys * ys + xs * xs <= radius * radius
+    ys, xs = ys[inside], xs[inside]
+    if len(ys) < 50:
+        return 0.0, 0.0
+    
+    bins = int(2 * radius) + 3
+    kernel = np.ones(31, dtype=np.float64) / 31
+    
+    def profile_score(angle: float) -> float:
+        theta = np.deg2rad(angle)
+        rows = (ys * np.cos(theta) - xs * np.sin(theta) + bins / 2).astype(np.int32)
+        profile = np.bincount(rows, minlength=bins).astype(np.float64)
+        detail = profile - np.convolve(profile, kernel, mode="same")
+        return float(np.dot(detail, detail))
+    
+    coarse_angles = np.arange(-max_angle, max_angle + 0.5, 1.0)
+    coarse_scores = np.array([profile_score(a) for a in coarse_angles])
+    best_coarse = coarse_angles[coarse_scores.argmax()]
+    
+    fine_angles = np.arange(best_coarse - 1.0, best_coarse + 1.05, 0.1)
+    fine_scores = np.array([profile_score(a) for a in fine_angles])
+    best = int(fine_scores.argmax())
+    
+    best_score = fine_scores[best]
+    if best_score <= 0:
+        return 0.0, 0.0
+    
+    confidence = (best_score - float(np.median(coarse_scores))) / best_score
+    return round(float(fine_angles[best]), 2), round(max(0.0, confidence), 3)
+
+
+def deskew_image(image: np.ndarray, skew: Tuple[float, float] = None) -> np.ndarray:
+    """
+    Detect and correct skew in image
+    
+    Args:
+        image: Grayscale image
+        skew: Precomputed (angle, confidence) from estimate_skew
+        
+    Returns:
+        np.ndarray: Deskewed image
+    """
+    try:
+        angle, confidence = skew if skew is not None else estimate_skew(image)
         
-        # Only deskew if angle is significant
-        if abs(angle) > 0.5:
+        # Only deskew if the estimate is reliable and the angle is significant
+        if confidence >= DESKEW_MIN_CONFIDENCE and abs(angle) > 0.5:
             # Get image center and rotation matrix
             (h, w) = image.shape[:2]
             center = (w // 2, h // 2)
@@ -106,7 +605,7 @@ def deskew_image(image: np.ndarray) -> np.ndarray:
                 borderMode=cv2.BORDER_REPLICATE
             )
             
-            logger.info(f"Image deskewed by {angle:.2f} degrees")
+            logger.info(f"Image deskewed by {angle:.2f} degrees (confidence {confidence:.2f})")
             return rotated
         
         return image
@@ -116,6 +615,178 @@ def deskew_image(image: np.ndarray) -> np.ndarray:
         return image
 
 
+def _dpi_from_pil(img: Image.Image) -> Optional[float]:
+    """DPI of an opened PIL image, ignoring placeholder screen values"""
+    dpi = img.info.get("dpi")
+    if not dpi:
+        # EXIF XResolution (282) with ResolutionUnit (296) == inches
+        exif = img.getexif()
+        if exif.get(282) and exif.get(296, 2) == 2:
+            dpi = (float(exif[282]),)
+    
+    if not dpi:
+        return None
+    
+    value = float(dpi[0])
+    
+    # Phones and editors write 72/96 regardless of the real resolution
+    if value < 100:
+        return None
+    
+    return value
+
+
+def estimate_glyph_height(image: np.ndarray, thumbnail_size: int = GLYPH_THUMBNAIL_SIZE) -> Optional[float]:
+    """
+    Estimate typical text glyph height in pixels from a thumbnail
+    
+    Connected components of the binarized thumbnail are kept only when they
+    sit on a text line: at least two neighbours of similar height on the same
+    baseline band within one glyph height. This rejects paper texture and
+    background noise. Rotated (90 degree) receipts are handled by also
+    measuring along the other axis.
+    
+    Args:
+        image: Grayscale image
+        thumbnail_size: Longest side of the measurement thumbnail
+        
+    Returns:
+        float: Median glyph height in full-resolution pixels, or None
+    """
+    try:
+        h, w = image.shape[:2]
+        scale = min(1.0, thumbnail_size / max(h, w))
+        
+        thumb = image
+        if scale < 1.0:
+            thumb = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        
+        binary = cv2.adaptiveThreshold(
+            thumb, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 15
+        )
+        _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        stats = stats[1:]  # Drop background
+        
+        best = None
+        for x_col, y_col, w_col, h_col in ((0, 1, 2, 3), (1, 0, 3, 2)):
+            heights = _line_glyph_heights(
+                stats[:, x_col], stats[:, y_col], stats[:, w_col], stats[:, h_col],
+                stats[:, cv2.CC_STAT_AREA], max(thumb.shape)
+            )
+            if best is None or len(heights) > len(best):
+                best = heights
+        
+        if best is None or len(best) < 10:
+            return None
+        
+        return float(np.median(best)) / scale
+        
+    except Exception as e:
+        logger.warning(f"Glyph height estimation failed: {str(e)}")
+        return None
+
+
+def _line_glyph_heights(x, y, widths, heights, areas, max_side: int,
+                        window: int = 96) -> np.ndarray:
+    """Heights of glyph-like components that have neighbours on the same line"""
+    glyph_like = (
+        (heights >= 4) &
+        (heights <= max_side * 0.05) &
+        (widths <= heights * 3) &
+        (areas >= 0.15 * heights * widths)
+    )
+    x, y, widths, heights = x[glyph_like], y[glyph_like], widths[glyph_like], heights[glyph_like]
+    
+    # Components of one text line are contiguous when sorted by vertical
+    # center, so comparing each one with a window of its successors is enough
+    h = heights.astype(np.float32)
+    center = y + h / 2
+    order = np.argsort(center, kind="stable")
+    x, widths, h, center = x[order], widths[order], h[order], center[order]
+    right = x + widths
+    
+    neighbours = np.zeros(len(h), dtype=np.int32)
+    for k in range(1, min(window, len(h))):
+        h_a, h_b = h[:-k], h[k:]
+        similar = np.abs(h_a - h_b) <= 0.2 * np.maximum(h_a, h_b)
+        same_line = np.abs(center[:-k] - center[k:]) <= 0.3 * np.minimum(h_a, h_b)
+        gap = np.maximum(x[k:] - right[:-k], x[:-k] - right[k:])
+        near = gap <= np.minimum(h_a, h_b)
+        
+        match = similar & same_line & near
+        neighbours[:-k] += match
+        neighbours[k:] += match
+    
+    return heights[order][neighbours >= 2]
+
+
+def estimate_scale(image: np.ndarray, image_dpi: float = None, target_dpi: int = 300,
+                   target_glyph_height: int = None, max_pixels: int = None) -> Tuple[float, str]:
+    """
+    Choose a resampling factor for OCR
+    
+    The measured glyph height is preferred; image DPI metadata is the
+    fallback. The result is clamped to the pixel budget.
+    
+    Args:
+        image: Grayscale image
+        image_dpi: DPI from image metadata, if known
+        target_dpi: Target DPI when scaling from metadata
+        target_glyph_height: Desired glyph height (default: OCR_TARGET_GLYPH_HEIGHT)
+        max_pixels: Pixel budget (default: OCR_MAX_PIXELS)
+        
+    Returns:
+        tuple: (scale factor, source of the estimate)
+    """
+    target_glyph_height = target_glyph_height or TARGET_GLYPH_HEIGHT
+    max_pixels = max_pixels or MAX_PIXELS
+    
+    scale, source = 1.0, "none"
+    
+    glyph_height = estimate_glyph_height(image)
+    if glyph_height:
+        scale, source = target_glyph_height / glyph_height, "glyph"
+    elif image_dpi:
+        scale, source = target_dpi / image_dpi, "dpi"
+    
+    scale = min(scale, MAX_UPSCALE)
+    
+    # Enforce pixel budget
+    h, w = image.shape[:2]
+    budget_scale = (max_pixels / float(h * w)) ** 0.5
+    if scale > budget_scale:
+        scale, source = budget_scale, f"{source}+budget"
+    
+    return scale, source
+
+
+def resize_to_scale(image: np.ndarray, scale: float, tolerance: float = 0.1) -> np.ndarray:
+    """
+    Resample image by a scale factor
+    
+    Args:
+        image: Input image
+        scale: Scale factor
+        tolerance: Skip resampling when scale is within this distance of 1.0
+        
+    Returns:
+        np.ndarray: Resized image
+    """
+    if abs(scale - 1.0) < tolerance:
+        return image
+    
+    try:
+        new_width = max(1, int(round(image.shape[1] * scale)))
+        new_height = max(1, int(round(image.shape[0] * scale)))
+        
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+        return cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+        
+    except Exception as e:
+        logger.warning(f"Resize failed: {str(e)}")
+        return image
+
+
 def resize_to_dpi(image: np.ndarray, target_dpi: int = 300, current_dpi: int = 72) -> np.ndarray:
     """
     Resize image to target DPI
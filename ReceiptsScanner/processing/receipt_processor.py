@@ -1,35 +1,64 @@
 """
 Receipt processor for entity extraction using regex patterns
 """
+import os
 import re
-from typing import Dict, Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Callable, Optional
 import numpy as np
 from datetime import datetime
 
 from ocr_engines.base import OCRAdapter
-from processing.patterns import (
-    DATE_PATTERNS, AMOUNT_PATTERNS, PHONE_PATTERNS,
-    MERCHANT_KEYWORDS, ITEM_PATTERNS, TAX_PATTERNS,
-    ADDRESS_PATTERNS, IGNORE_KEYWORDS,
-    clean_amount, clean_phone, clean_date
-)
+from ocr_engines.factory import create_ocr_adapter
+from ocr_engines.strip_adapter import find_band_cuts
+from processing.patterns import clean_amount, clean_phone, clean_date
+from processing.extraction_engine import ExtractionEngine
+from processing.layout_extraction import find_layout_total
+from data_manager.merchant_index import MerchantIndex
 from monitoring.logging_config import get_logger
+from monitoring.metrics import ocr_partial_result_seconds
 
 logger = get_logger(__name__)
 
+# Share of the image height OCR'd first in progressive mode: merchant and
+# date usually sit in the header band, the total in the bottom band
+HEADER_BAND_RATIO = float(os.getenv("OCR_HEADER_BAND_RATIO", "0.2"))
+FOOTER_BAND_RATIO = float(os.getenv("OCR_FOOTER_BAND_RATIO", "0.3"))
+
+# Take the total from OCR word boxes (the amount right of the total keyword)
+# instead of the largest amount in the text, when boxes are available
+EXTRACTION_LAYOUT = os.getenv("EXTRACTION_LAYOUT", "false").lower() == "true"
+
+NON_NAME_CHARS = re.compile(r'[^\w\s\u00C0-\u1EF9]')
+TRAILING_NUMBER = re.compile(r'\s*\d+[\.,]?\d*\s*$')
+
 
 class ReceiptProcessor:
     """Process receipt text and extract structured entities"""
     
-    def __init__(self, ocr_adapter: OCRAdapter):
+    def __init__(self, ocr_adapter: OCRAdapter = None, ocr_engine: str = None,
+                 engine: ExtractionEngine = None, merchant_index: MerchantIndex = None,
+                 layout: bool = None):
         """
         Initialize receipt processor
         
         Args:
             ocr_adapter: OCR adapter for text extraction
+            ocr_engine: Engine name used when no adapter is given
+                (defaults to OCR_ENGINE env var)
+            engine: Compiled entity extraction patterns
+            merchant_index: Known merchants, used to canonicalize keyword-extracted
+                names and to resolve the top lines when no keyword matched
+            layout: Extract the total from OCR word boxes when they are
+                passed to extract_entities (defaults to EXTRACTION_LAYOUT)
         """
-        self.ocr_adapter = ocr_adapter
-        logger.info("Receipt processor initialized")
+        self.ocr_adapter = ocr_adapter or create_ocr_adapter(ocr_engine)
+        self.engine = engine or ExtractionEngine()
+        self.merchant_index = merchant_index
+        self.layout = EXTRACTION_LAYOUT if layout is None else layout
+        logger.info(f"Receipt processor initialized: "
+                   f"ocr={type(self.ocr_adapter).__name__}")
     
     def extract_text(self, image: np.ndarray) -> Dict[str, Any]:
         """
@@ -43,41 +72,149 @@ class ReceiptProcessor:
         """
         return self.ocr_adapter.extract_text(image)
     
-    def extract_entities(self, text: str) -> Dict[str, Any]:
+    def extract_text_batch(self, images: List[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        Extract text from several receipt images concurrently
+        
+        Args:
+            images: Preprocessed images
+            
+        Returns:
+            list: OCR results, in input order
+        """
+        return self.ocr_adapter.extract_text_batch(images)
+    
+    def extract_text_progressive(self, image: np.ndarray,
+                                 on_partial: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """
+        Full-page OCR that publishes merchant, date and total early
+        
+        Full-page OCR starts in the background while the header and bottom
+        bands are OCR'd on their own; key entities from the bands are passed
+        to on_partial if the full result is not ready yet.
+        
+        Args:
+            image: Preprocessed image
+            on_partial: Callback receiving the partial entities
+                (merchant_name, receipt_date, total_amount, partial=True)
+            
+        Returns:
+            dict: Full OCR result with text and confidence
+        """
+        start = time.time()
+        full_future = self._get_executor().submit(self.extract_text, image)
+        
+        try:
+            partial = self.extract_partial_entities(image)
+            if partial is not None and not full_future.done():
+                on_partial(partial)
+                ocr_partial_result_seconds.observe(time.time() - start)
+                logger.info(f"Published partial result after {time.time() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"Partial extraction failed: {str(e)}")
+        
+        return full_future.result()
+    
+    def extract_partial_entities(self, image: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        OCR only the header and bottom bands and extract merchant, date and total
+        
+        Args:
+            image: Preprocessed image
+            
+        Returns:
+            dict: Partial entities, or None when the bands cover the whole image
+        """
+        bands = self._key_bands(image)
+        if bands is None:
+            return None
+        
+        header_result, footer_result = self.ocr_adapter.extract_text_batch(list(bands))
+        header_text = self.engine.guard(header_result.get("text", ""))
+        footer_text = self.engine.guard(footer_result.get("text", ""))
+        
+        merchant_name, merchant_source = self._extract_merchant_name(header_text)
+        partial = {
+            "merchant_name": merchant_name,
+            "receipt_date": self._extract_date(f"{header_text}\n{footer_text}"),
+            "total_amount": self._extract_total_amount(footer_text) or self._extract_total_amount(header_text),
+            "partial": True
+        }
+        self._apply_known_merchant(partial, header_text, merchant_source)
+        
+        return partial
+    
+    def _key_bands(self, image: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Header and bottom bands, cut through blank rows; None if they would overlap"""
+        height = image.shape[0]
+        header_bottom = find_band_cuts(image, max(1, int(height * HEADER_BAND_RATIO)))[0][1]
+        footer_top = height - find_band_cuts(image[::-1], max(1, int(height * FOOTER_BAND_RATIO)))[0][1]
+        
+        if header_bottom >= footer_top:
+            return None
+        
+        return image[:header_bottom], image[footer_top:]
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Executor running full-page OCR alongside the band OCR"""
+        if getattr(self, "_executor", None) is None:
+            self._executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                thread_name_prefix="receipt-ocr")
+        return self._executor
+    
+    def extract_entities(self, text: str, boxes=None) -> Dict[str, Any]:
         """
         Extract structured entities from receipt text
         
         Args:
             text: Raw OCR text
+            boxes: OCR word boxes, used for the total in layout mode
             
         Returns:
             dict: Extracted entities
         """
         logger.info("Extracting entities from receipt text")
         
+        # Bound backtracking on garbage lines, then one keyword pass shared by every field
+        text = self.engine.guard(text)
+        hits = self.engine.scan(text)
+        
+        merchant_name, merchant_source = self._extract_merchant_name(text, hits)
         entities = {
-            "merchant_name": self._extract_merchant_name(text),
-            "receipt_date": self._extract_date(text),
-            "total_amount": self._extract_total_amount(text),
-            "phone": self._extract_phone(text),
-            "address": self._extract_address(text),
-            "items": self._extract_items(text),
-            "tax": self._extract_tax(text)
+            "merchant_name": merchant_name,
+            "receipt_date": self._extract_date(text, hits),
+            "total_amount": self._extract_total_amount(text, hits, boxes),
+            "phone": self._extract_phone(text, hits),
+            "address": self._extract_address(text, hits),
+            "items": self._extract_items(text, hits),
+            "tax": self._extract_tax(text, hits)
         }
+        self._apply_known_merchant(entities, text, merchant_source)
         
         logger.info(f"Extracted entities: merchant={entities['merchant_name']}, "
                    f"amount={entities['total_amount']}, date={entities['receipt_date']}")
         
         return entities
     
-    def _extract_merchant_name(self, text: str) -> str:
-        """Extract merchant/store name"""
+    def _apply_known_merchant(self, entities: Dict[str, Any], text: str, source: Optional[str]):
+        """
+        Record where the merchant came from and resolve it against the index
+        
+        Args:
+            entities: Extracted entities, updated in place
+            text: Text the merchant was extracted from
+            source: Where the name came from ("keyword", "line" or None)
+        """
+        entities["merchant_source"] = source
+        if self.merchant_index is not None:
+            self.merchant_index.resolve_entities(entities, text)
+    
+    def _extract_merchant_name(self, text: str, hits: Dict = None) -> Tuple[str, Optional[str]]:
+        """Extract merchant/store name and its source ("keyword", "line" or None)"""
         # Try keyword-based patterns first
-        for pattern in MERCHANT_KEYWORDS:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                name = match.group(1).strip()
-                return self._clean_merchant_name(name)
+        for match in self.engine.search("merchant", text, hits):
+            name = match.group(1).strip()
+            return self._clean_merchant_name(name), "keyword"
         
         # Fallback: use first line with capital letters
         lines = text.split('\n')
@@ -85,98 +222,92 @@ class ReceiptProcessor:
             line = line.strip()
             # Look for lines with multiple capital letters
             if len(line) > 5 and sum(1 for c in line if c.isupper()) >= 3:
-                return self._clean_merchant_name(line)
+                return self._clean_merchant_name(line), "line"
         
-        return "Unknown"
+        return "Unknown", None
     
     def _clean_merchant_name(self, name: str) -> str:
         """Clean merchant name by removing special characters"""
         # Remove common receipt keywords
-        for keyword in IGNORE_KEYWORDS:
-            name = re.sub(keyword, '', name, flags=re.IGNORECASE)
+        name = self.engine.sub("ignore", '', name)
         
         # Clean up
-        name = re.sub(r'[^\w\s\u00C0-\u1EF9]', ' ', name)
+        name = NON_NAME_CHARS.sub(' ', name)
         name = ' '.join(name.split())
         
         return name.strip()[:100] if name.strip() else "Unknown"
     
-    def _extract_date(self, text: str) -> str:
+    def _extract_date(self, text: str, hits: Dict = None) -> str:
         """Extract receipt date"""
-        for pattern in DATE_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    date_str = match.group(0)
-                    cleaned = clean_date(date_str)
-                    if cleaned and cleaned != date_str:
-                        return cleaned
-                except Exception as e:
-                    logger.warning(f"Date parsing failed: {str(e)}")
-                    continue
+        for match in self.engine.search("date", text, hits):
+            try:
+                date_str = match.group(0)
+                cleaned = clean_date(date_str)
+                if cleaned and cleaned != date_str:
+                    return cleaned
+            except Exception as e:
+                logger.warning(f"Date parsing failed: {str(e)}")
+                continue
         
         # Fallback to today's date
         return datetime.now().strftime('%Y-%m-%d')
     
-    def _extract_total_amount(self, text: str) -> float:
+    def _extract_total_amount(self, text: str, hits: Dict = None, boxes=None) -> float:
         """Extract total amount"""
+        if self.layout and boxes is not None:
+            total = find_layout_total(boxes)
+            if total > 0:
+                return total
+        
         amounts = []
         
-        for pattern in AMOUNT_PATTERNS:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                try:
-                    amount_str = match.group(1)
-                    amount = clean_amount(amount_str)
-                    if amount > 0:
-                        amounts.append(amount)
-                except (IndexError, ValueError) as e:
-                    continue
+        for match in self.engine.finditer("amount", text, hits):
+            try:
+                amount_str = match.group(1)
+                amount = clean_amount(amount_str)
+                if amount > 0:
+                    amounts.append(amount)
+            except (IndexError, ValueError) as e:
+                continue
         
         # Return the largest amount found (likely to be total)
         return max(amounts) if amounts else 0.0
     
-    def _extract_phone(self, text: str) -> str:
+    def _extract_phone(self, text: str, hits: Dict = None) -> str:
         """Extract phone number"""
-        for pattern in PHONE_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                phone = match.group(1) if len(match.groups()) > 0 else match.group(0)
-                cleaned = clean_phone(phone)
-                if len(cleaned) >= 10:
-                    return cleaned
+        for match in self.engine.search("phone", text, hits):
+            phone = match.group(1) if len(match.groups()) > 0 else match.group(0)
+            cleaned = clean_phone(phone)
+            if len(cleaned) >= 10:
+                return cleaned
         
         return ""
     
-    def _extract_address(self, text: str) -> str:
+    def _extract_address(self, text: str, hits: Dict = None) -> str:
         """Extract address"""
-        for pattern in ADDRESS_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                address = match.group(1).strip()
-                if len(address) > 10:
-                    return address[:200]
+        for match in self.engine.search("address", text, hits):
+            address = match.group(1).strip()
+            if len(address) > 10:
+                return address[:200]
         
         return ""
     
-    def _extract_items(self, text: str) -> List[str]:
+    def _extract_items(self, text: str, hits: Dict = None) -> List[str]:
         """Extract line items from receipt"""
         items = []
         
-        for pattern in ITEM_PATTERNS:
-            matches = re.finditer(pattern, text, re.MULTILINE)
-            for match in matches:
-                try:
-                    # Get item name (usually first group)
-                    item_name = match.group(1).strip()
-                    
-                    # Clean item name
-                    item_name = self._clean_item_name(item_name)
-                    
-                    if item_name and len(item_name) > 2:
-                        items.append(item_name)
-                except Exception as e:
-                    continue
+        for match in self.engine.finditer("item", text, hits):
+            try:
+                # Get item name (usually first group)
+                item_name = match.group(1).strip()
+                
+                # Clean item name
+                item_name = self._clean_item_name(item_name)
+                
+                if item_name and len(item_name) > 2:
+                    items.append(item_name)
+            except Exception as e:
+                continue
         
         # Deduplicate while preserving order
         seen = set()
@@ -191,25 +322,23 @@ class ReceiptProcessor:
     def _clean_item_name(self, name: str) -> str:
         """Clean item name"""
         # Remove numbers at the end
-        name = re.sub(r'\s*\d+[\.,]?\d*\s*$', '', name)
+        name = TRAILING_NUMBER.sub('', name)
         
         # Remove special characters
-        name = re.sub(r'[^\w\s\u00C0-\u1EF9]', ' ', name)
+        name = NON_NAME_CHARS.sub(' ', name)
         
         # Clean whitespace
         name = ' '.join(name.split())
         
         return name.strip()
     
-    def _extract_tax(self, text: str) -> float:
+    def _extract_tax(self, text: str, hits: Dict = None) -> float:
         """Extract tax/VAT amount"""
-        for pattern in TAX_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    tax_str = match.group(1)
-                    return clean_amount(tax_str)
-                except Exception:
-                    continue
+        for match in self.engine.search("tax", text, hits):
+            try:
+                tax_str = match.group(1)
+                return clean_amount(tax_str)
+            except Exception:
+                continue
         
         return 0.0
\ No newline at end of file
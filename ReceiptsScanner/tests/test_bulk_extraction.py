@@ -0,0 +1,138 @@
+"""
+Tests for bulk entity extraction over stored receipt text
+"""
+import shutil
+import tempfile
+
+import pandas as pd
+import pytest
+
+from data_manager.json_adapter import JSONDataAdapter
+from processing.bulk_extraction import (
+    BULK_FIELDS, extract_entities_bulk, reextract_receipts,
+    clean_amount_array, clean_date_array
+)
+from processing.patterns import clean_amount, clean_date
+from processing.receipt_processor import ReceiptProcessor
+from tests.test_processor import MockOCRAdapter
+
+
+RECEIPT_TEXTS = [
+    MockOCRAdapter().extract_text(None)["text"],
+    "Cửa hàng: Circle K Lê Lợi\nSDT 0909 888 999\n21-07-2024\nThuế: 3.400\nTỔNG: 34.000 đ",
+    "THE COFFEE HOUSE\nPhone: +84 901234567\n2024-01-28\nTotal: 159,500 VND",
+    "no entities here",
+    ""
+]
+
+
+@pytest.fixture
+def data_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def test_clean_arrays_match_scalar():
+    """Test that array cleaners agree with clean_amount/clean_date"""
+    amounts = ["1.234.567", "1.234.567,89", "1,234,567", "123,45", "1,2.3", "", "352000"]
+    assert clean_amount_array(pd.Series(amounts)).tolist() == [clean_amount(a) for a in amounts]
+    
+    dates = ["15/10/2024", "2024-01-28", "31/02/2024", "15/10/2024"]
+    assert clean_date_array(pd.Series(dates)).tolist() == [clean_date(d) for d in dates]
+
+
+def test_extract_entities_bulk_matches_processor():
+    """Test that bulk extraction equals extract_entities field by field"""
+    processor = ReceiptProcessor(MockOCRAdapter())
+    texts = pd.Series(RECEIPT_TEXTS, index=[5, 5, 9, 1, 0])
+    
+    entities = extract_entities_bulk(texts, chunk_size=2)
+    
+    assert list(entities.index) == [5, 5, 9, 1, 0]
+    for text, (_, row) in zip(RECEIPT_TEXTS, entities.iterrows()):
+        expected = processor.extract_entities(text)
+        assert {field: row[field] for field in BULK_FIELDS} == \
+            {field: expected[field] for field in BULK_FIELDS}
+
+
+@pytest.mark.parametrize("backend", ["auto", "re"])
+def test_extract_entities_bulk_matches_processor_on_long_lines(backend):
+    """Test that both paths apply the same length guard, whatever the regex backend"""
+    from processing.extraction_engine import ExtractionEngine, EXTRACTION_MAX_LINE_LENGTH
+    
+    processor = ReceiptProcessor(MockOCRAdapter(), engine=ExtractionEngine(backend=backend))
+    text = ("Cửa hàng: Circle K Lê Lợi\nTotal: 352000 VND\n"
+            + "x" * EXTRACTION_MAX_LINE_LENGTH + " Total: 999999 VND 0909 888 999")
+    
+    expected = processor.extract_entities(text)
+    row = extract_entities_bulk([text]).iloc[0]
+    
+    assert expected["total_amount"] == 352000.0
+    assert {field: row[field] for field in BULK_FIELDS} == {field: expected[field] for field in BULK_FIELDS}
+
+
+def test_extract_entities_bulk_rejects_unknown_field():
+    """Test that unsupported fields are rejected"""
+    with pytest.raises(ValueError):
+        extract_entities_bulk(RECEIPT_TEXTS, fields=["items"])
+
+
+def test_extract_entities_bulk_guards_long_lines():
+    """Test that pathological lines are truncated and pattern time is recorded"""
+    from prometheus_client import REGISTRY
+    from processing.extraction_engine import EXTRACTION_MAX_LINE_LENGTH
+    
+    labels = {"group": "amount", "pattern": "0"}
+    before = REGISTRY.get_sample_value("extraction_pattern_seconds_count", labels) or 0
+    garbage = "Ab" + "1," * 20000
+    text = "Total: 352000 VND\n" + garbage + "\n" + "x" * EXTRACTION_MAX_LINE_LENGTH + " Total: 999999 VND"
+    
+    entities = extract_entities_bulk([text], fields=["total_amount"])
+    
+    assert entities["total_amount"].tolist() == [352000.0]
+    assert REGISTRY.get_sample_value("extraction_pattern_seconds_count", labels) == before + 1
+
+
+def test_reextract_receipts_updates_in_batches(data_dir):
+    """Test that changed receipts are saved back and corrected ones skipped"""
+    adapter = JSONDataAdapter(data_dir)
+    adapter.save_receipts([
+        {"id": "a", "raw_text": RECEIPT_TEXTS[1], "total_amount": 0.0,
+         "receipt_date": "2020-01-01", "corrected": False},
+        {"id": "b", "raw_text": RECEIPT_TEXTS[2], "total_amount": 1.0, "corrected": True},
+        {"id": "c", "raw_text": "no entities here", "receipt_date": "2020-01-01"}
+    ])
+    
+    stats = reextract_receipts(adapter, batch_size=1)
+    
+    assert stats == {"scanned": 2, "updated": 2, "failed": 0}
+    assert adapter.get_receipt("a")["total_amount"] == 34.0
+    assert adapter.get_receipt("a")["receipt_date"] == "2024-07-21"
+    assert adapter.get_receipt("b")["total_amount"] == 1.0
+    # No date in the text: the stored date is kept
+    assert adapter.get_receipt("c")["receipt_date"] == "2020-01-01"
+    assert len(adapter.list_receipts()) == 3
+
+
+def test_reextract_receipts_resolves_merchants(data_dir):
+    """Test that re-extracted merchants go through the attached index"""
+    import os
+    from data_manager.merchant_index import MerchantIndex
+    
+    adapter = JSONDataAdapter(data_dir)
+    adapter.merchant_index = MerchantIndex(os.path.join(data_dir, "merchant_index.json"))
+    adapter.merchant_index.add("Circle K - Le Loi", corrected=True)
+    adapter.merchant_index.add("Circle K Lê Lợi")
+    adapter.save_receipts([
+        {"id": "a", "raw_text": RECEIPT_TEXTS[1], "merchant_name": "CIRCLE K", "merchant_id": "stale"},
+        {"id": "b", "raw_text": RECEIPT_TEXTS[2], "merchant_name": "Unknown"}
+    ])
+    
+    reextract_receipts(adapter, fields=["merchant_name"])
+    
+    assert adapter.get_receipt("a")["merchant_name"] == "Circle K - Le Loi"
+    assert adapter.get_receipt("a")["merchant_id"] == "circle-k-le-loi"
+    assert adapter.get_receipt("b")["merchant_source"] == "line"
+    assert adapter.get_receipt("b").get("merchant_id") is None
+    assert adapter.merchant_index.lookup(adapter.get_receipt("b")["merchant_name"]) is None
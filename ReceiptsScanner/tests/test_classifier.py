@@ -6,8 +6,10 @@ import tempfile
 import os
 import shutil
 
+import numpy as np
+
 from ml.category_classifier import CategoryClassifier
-from ml.config import CATEGORIES
+from ml.config import CATEGORIES, CATEGORY_KEYWORDS
 
 
 @pytest.fixture
@@ -157,5 +159,90 @@ def test_low_confidence_prediction():
     assert result["category"] in CATEGORIES
 
 
+def test_predict_batch_matches_predict():
+    """Test that batched prediction agrees with one-at-a-time prediction"""
+    classifier = CategoryClassifier()
+    
+    X_train = [
+        "siêu thị thức ăn rau củ",
+        "nhà hàng phở bún",
+        "điện thoại laptop máy tính",
+        "áo quần giày dép thời trang"
+    ]
+    y_train = ["Thực Phẩm", "Thực Phẩm", "Điện Tử", "Quần Áo"]
+    classifier.train(X_train, y_train)
+    
+    texts = ["mua rau củ ở siêu thị", "tai nghe điện thoại", "áo khoác", "xyz 123"]
+    entities_list = [{"merchant_name": "Co.op Mart", "items": ["rau", "thịt"]}, None, None, None]
+    
+    batched = classifier.predict_batch(texts, entities_list, batch_size=2)
+    single = [classifier.predict(text, entities) for text, entities in zip(texts, entities_list)]
+    
+    assert [r["category"] for r in batched] == [r["category"] for r in single]
+    for batch_result, single_result in zip(batched, single):
+        assert batch_result["confidence"] == pytest.approx(single_result["confidence"], abs=1e-5)
+        # Probabilities are keyed by the categories the model was trained on
+        assert set(batch_result["all_probabilities"]) == {"Thực Phẩm", "Điện Tử", "Quần Áo"}
+    
+    assert classifier.predict_batch([]) == []
+
+
+def test_keyword_prior_skips_encoder():
+    """Test that decisive keyword matches are not encoded unless audited"""
+    classifier = CategoryClassifier(keyword_prior=True)
+    classifier.train(["siêu thị rau củ", "điện thoại laptop"], ["Thực Phẩm", "Điện Tử"])
+    
+    encoded = []
+    encode = classifier.encode
+    classifier.encode = lambda texts, **kwargs: encoded.extend(texts) or encode(texts, **kwargs)
+    
+    texts = ["NHÀ THUỐC LONG CHÂU\nVitamin C 500mg\nThuốc ho", "xyz 123"]
+    classifier.audit_rate = 0.0
+    results = classifier.predict_batch(texts)
+    
+    assert results[0]["category"] == "Y Tế"
+    assert encoded == [classifier._prepare_text("xyz 123")]
+    
+    # Audited decisions are encoded too, but the keyword result is kept
+    classifier.audit_rate = 1.0
+    assert classifier.predict_batch(texts)[0]["category"] == "Y Tế"
+    assert len(encoded) == 3
+
+
+def test_onnx_encoder_parity(temp_models_dir, monkeypatch):
+    """Test that the int8 ONNX encoder predicts the same categories as PyTorch"""
+    pytest.importorskip("onnxruntime")
+    from ml.encoders import export_onnx
+    
+    monkeypatch.setenv("MODELS_DIR", temp_models_dir)
+    monkeypatch.setenv("EMBEDDING_CACHE_BACKEND", "none")
+    
+    # Even keywords train, odd keywords are held out
+    keywords = [(category, words) for category, words in CATEGORY_KEYWORDS.items()]
+    X_train = [f"hóa đơn {word}" for _, words in keywords for word in words[::2]]
+    y_train = [category for category, words in keywords for _ in words[::2]]
+    X_test = [f"{word} 125.000 VND" for _, words in keywords for word in words[1::2]]
+    
+    torch_classifier = CategoryClassifier(encoder_backend="torch")
+    torch_classifier.train(X_train, y_train)
+    model_path = torch_classifier.save_model("parity_model")
+    export_onnx(model_path)
+    
+    onnx_classifier = CategoryClassifier(model_dir=model_path, encoder_backend="onnx")
+    assert onnx_classifier.encoder.backend == "onnx"
+    
+    torch_embeddings = torch_classifier.encode(X_test)
+    onnx_embeddings = onnx_classifier.encode(X_test)
+    cosine = (torch_embeddings * onnx_embeddings).sum(axis=1) / (
+        np.linalg.norm(torch_embeddings, axis=1) * np.linalg.norm(onnx_embeddings, axis=1)
+    )
+    assert cosine.min() > 0.95
+    
+    torch_categories = [r["category"] for r in torch_classifier.predict_batch(X_test)]
+    onnx_categories = [r["category"] for r in onnx_classifier.predict_batch(X_test)]
+    agreement = np.mean([a == b for a, b in zip(torch_categories, onnx_categories)])
+    assert agreement >= 0.95
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Tests for the two-level sentence embedding cache
+"""
+import os
+import tempfile
+import shutil
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+
+from data_manager.embedding_cache import (
+    EmbeddingCache, create_embedding_cache, encoder_fingerprint, normalize_text
+)
+
+
+class FakeEncoder:
+    """Deterministic 8-dimensional embeddings; records every text it encodes"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text), sum(map(ord, text)) % 97] + [i] * 6 for i, text in enumerate(texts)],
+                        dtype=np.float32)
+
+
+@pytest.fixture
+def cache_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def hits(level: str) -> float:
+    return REGISTRY.get_sample_value("embedding_cache_hits_total", {"level": level}) or 0.0
+
+
+def test_normalized_duplicates_encoded_once():
+    """Test that whitespace and Unicode variants share one encoder call"""
+    encoder = FakeEncoder()
+    cache = EmbeddingCache("fp", memory_items=100)
+    texts = ["Cà phê  sữa\n25.000", "Cà phê sữa 25.000", "Bánh mì"]
+    
+    first = cache.encode(texts, encoder.encode)
+    assert encoder.calls == [["Cà phê sữa 25.000", "Bánh mì"]]
+    assert np.array_equal(first[0], first[1])
+    
+    memory_hits = hits("memory")
+    second = cache.encode(texts[::-1], encoder.encode)
+    assert len(encoder.calls) == 1
+    assert np.array_equal(second, first[::-1])
+    assert hits("memory") == memory_hits + 3
+    assert cache.hit_ratio() == 4 / 6
+    assert normalize_text(" a \t b ") == "a b"
+
+
+def test_disk_level_survives_restart(cache_dir):
+    """Test that a new process reads vectors another one appended"""
+    writer = EmbeddingCache("fp", cache_dir=cache_dir)
+    reader = EmbeddingCache("fp", cache_dir=cache_dir)
+    encoder = FakeEncoder()
+    
+    expected = writer.encode(["one", "two"], encoder.encode)
+    disk_hits = hits("disk")
+    
+    # reader was opened before the write and picks up the index tail
+    assert np.array_equal(reader.encode(["two", "one"], encoder.encode), expected[::-1])
+    assert hits("disk") == disk_hits + 2
+    assert len(encoder.calls) == 1
+    
+    restarted = EmbeddingCache("fp", cache_dir=cache_dir)
+    assert np.array_equal(restarted.encode(["one", "three", "two"], encoder.encode)[[0, 2]], expected)
+    assert encoder.calls[-1] == ["three"]
+    assert restarted.disk.nbytes() == 3 * (8 * 4 + 24)
+    
+    # Another encoder fingerprint starts empty
+    EmbeddingCache("other", cache_dir=cache_dir).encode(["one"], encoder.encode)
+    assert encoder.calls[-1] == ["one"]
+
+
+def test_disk_level_stops_at_size_limit(cache_dir):
+    """Test that writes past max_bytes stay in memory only"""
+    encoder = FakeEncoder()
+    cache = EmbeddingCache("fp", cache_dir=cache_dir, max_bytes=2 * (8 * 4 + 24))
+    
+    cache.encode(["a", "b"], encoder.encode)
+    cache.encode(["c"], encoder.encode)
+    assert cache.disk.nbytes() == 2 * (8 * 4 + 24)
+    
+    restarted = EmbeddingCache("fp", cache_dir=cache_dir)
+    restarted.encode(["a", "b", "c"], encoder.encode)
+    assert encoder.calls[-1] == ["c"]
+
+
+def test_create_embedding_cache(cache_dir, monkeypatch):
+    """Test backend selection and fingerprinting of a non-torch encoder"""
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", cache_dir)
+    fingerprint = encoder_fingerprint(FakeEncoder())
+    
+    assert fingerprint == encoder_fingerprint(FakeEncoder())
+    assert create_embedding_cache(fingerprint, "disk").disk.path == os.path.join(cache_dir, fingerprint)
+    assert create_embedding_cache(fingerprint, "memory").disk is None
+    assert create_embedding_cache(fingerprint, "none") is None
+    with pytest.raises(ValueError):
+        create_embedding_cache(fingerprint, "faiss")
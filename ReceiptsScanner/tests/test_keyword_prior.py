@@ -0,0 +1,55 @@
+"""
+Tests for the keyword pre-classifier
+"""
+from ml.keyword_prior import KeywordAutomaton, KeywordPrior, prepare
+
+
+def test_automaton_finds_overlapping_patterns():
+    """Test the classic Aho-Corasick example"""
+    automaton = KeywordAutomaton(["he", "she", "his", "hers"])
+    
+    assert sorted(automaton.search("ushers")) == [(1, 1), (2, 0), (2, 3)]
+    assert automaton.search("xyz") == []
+
+
+def test_prepare_keeps_offsets():
+    """Test that folding maps one character to one character"""
+    lowered, folded = prepare("ĐIỆN THOẠI Thực Phẩm")
+    
+    assert lowered == "điện thoại thực phẩm"
+    assert folded == "dien thoai thuc pham"
+
+
+def test_accent_aware_matching():
+    """Test exact, accentless and wrongly accented text"""
+    prior = KeywordPrior({"Gia Dụng": ["bàn", "ghế"], "Thực Phẩm": ["cá"]})
+    
+    assert prior.scores("Bàn gỗ, ghế nhựa") == {"Gia Dụng": 2.0}
+    assert prior.scores("BAN GO, GHE NHUA") == {"Gia Dụng": 1.0}
+    
+    # "bán" is a different word; "các" only contains "cá"
+    assert prior.scores("Hóa đơn bán lẻ các mặt hàng") == {}
+
+
+def test_longest_match_wins():
+    """Test that a multi-word keyword hides the shorter one inside it"""
+    prior = KeywordPrior()
+    
+    assert [form for form, _ in prior.matches("Thực phẩm chức năng Omega 3")] == ["thực phẩm chức năng"]
+    assert prior.scores("Thực phẩm chức năng Omega 3") == {"Y Tế": 4.0}
+
+
+def test_classify_needs_decisive_margin():
+    """Test short-circuit, fallback on close scores and the ignored "Khác" keywords"""
+    prior = KeywordPrior(min_score=2.0, margin=0.6)
+    
+    result = prior.classify("NHÀ THUỐC LONG CHÂU\nVitamin C\nHóa đơn")
+    assert result["category"] == "Y Tế"
+    assert result["confidence"] == 1.0
+    
+    # Coffee and a laptop on one receipt: no clear winner
+    assert prior.classify("Cà phê sữa\nLaptop Dell\nTai nghe") is None
+    
+    # Utility bills are left to the model
+    assert prior.classify("Thanh toán hóa đơn tiền điện") is None
+    assert prior.classify("") is None
@@ -0,0 +1,73 @@
+"""
+Tests for layout-aware total extraction from OCR word boxes
+"""
+import numpy as np
+
+from ocr_engines.boxes import OCRBoxes
+from processing.layout_extraction import ReceiptLayout, find_layout_total
+from processing.receipt_processor import ReceiptProcessor
+from tests.test_processor import MockOCRAdapter
+
+
+def make_boxes(rows, skew=0.0):
+    """OCRBoxes from (y, [(x, word), ...]) rows; 12 px per character"""
+    words, xs, ys = [], [], []
+    for y, row in rows:
+        for x, word in row:
+            words.append(word)
+            xs.append(x)
+            ys.append(y + skew * x)
+    return OCRBoxes(words, xs, np.rint(ys), [12 * len(word) for word in words],
+                    [20] * len(words), [0.9] * len(words))
+
+
+RECEIPT_ROWS = [
+    (10, [(20, "SIÊU"), (80, "THỊ"), (130, "CO.OP")]),
+    (40, [(20, "Cà"), (50, "phê"), (100, "2"), (120, "x"), (500, "25.000")]),
+    (70, [(20, "Bia"), (70, "Sài"), (120, "Gòn"), (500, "150.000")]),
+    (100, [(20, "Cộng"), (80, "tiền"), (140, "hàng:"), (512, "200000")]),
+    (130, [(20, "Tổng"), (80, "cộng:"), (476, "187000"), (566, "VNĐ")]),
+    (160, [(20, "Tiền"), (80, "khách"), (150, "đưa:"), (512, "500000")]),
+]
+
+
+def test_lines_in_reading_order():
+    """Test that shuffled boxes come back grouped into lines, left to right"""
+    boxes = make_boxes(RECEIPT_ROWS)
+    shuffled = boxes[np.random.default_rng(0).permutation(len(boxes))]
+    
+    layout = ReceiptLayout(shuffled)
+    assert len(layout) == len(RECEIPT_ROWS)
+    assert layout.line_text(4)[0] == "Tổng cộng: 187000 VNĐ"
+    assert list(layout.lines_between(125, 155)) == [4]
+
+
+def test_total_is_amount_on_total_line():
+    """Test that the total line wins over the larger cash-paid amount"""
+    boxes = make_boxes(RECEIPT_ROWS)
+    
+    assert ReceiptLayout(boxes).amount_column() == 584
+    assert find_layout_total(boxes) == 187000.0
+    assert find_layout_total(boxes.to_dicts()) == 187000.0
+    assert find_layout_total(OCRBoxes()) == 0.0
+
+
+def test_total_survives_skew_and_split_digits():
+    """Test pairing across skewed lines and re-joining a split amount"""
+    rows = RECEIPT_ROWS[:4] + [(130, [(20, "TOTAL:")]), (144, [(464, "4"), (480, "02600")])]
+    layout = ReceiptLayout(make_boxes(rows, skew=0.01))
+    
+    assert len(layout) == 6
+    assert layout.find_total() == 402600.0
+
+
+def test_processor_layout_mode():
+    """Test that layout mode overrides the regex total only when boxes are given"""
+    text = MockOCRAdapter().extract_text(None)["text"]
+    boxes = make_boxes(RECEIPT_ROWS)
+    
+    regex = ReceiptProcessor(MockOCRAdapter(), layout=False)
+    layout = ReceiptProcessor(MockOCRAdapter(), layout=True)
+    
+    assert layout.extract_entities(text)["total_amount"] == regex.extract_entities(text)["total_amount"]
+    assert layout.extract_entities(text, boxes=boxes)["total_amount"] == 187000.0
@@ -0,0 +1,171 @@
+"""
+Tests for the known-merchant index
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from data_manager.json_adapter import JSONDataAdapter
+from data_manager.merchant_index import MerchantIndex, create_merchant_index, fold_merchant_name
+from processing.receipt_processor import ReceiptProcessor
+from tests.test_processor import MockOCRAdapter
+
+
+@pytest.fixture
+def data_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def index(data_dir):
+    index = MerchantIndex(os.path.join(data_dir, "merchant_index.json"))
+    index.add("Co.op Mart Xa Lộ Hà Nội")
+    index.add("CO.OP MART XA LO HA NOI")
+    index.add("Circle K Lê Lợi")
+    return index
+
+
+def test_fold_merchant_name():
+    """Test accent, case and punctuation folding"""
+    assert fold_merchant_name("SIÊU THỊ CO.OP MART Đà Nẵng") == "sieu thi co op mart da nang"
+    assert fold_merchant_name("  Phở   Hòa!! ") == "pho hoa"
+
+
+def test_spellings_share_merchant(index):
+    """Test that accent/case variants map to one merchant"""
+    assert len(index) == 2
+    assert index.lookup("co op mart xa lo ha noi")["id"] == "co-op-mart-xa-lo-ha-noi"
+
+
+def test_resolve_exact_and_fuzzy(index):
+    """Test header resolution by alias and by trigram similarity"""
+    exact = index.resolve("HÓA ĐƠN\nSIÊU THỊ CO.OP MART XA LỘ HÀ NỘI\n191 Quang Trung")
+    assert exact["id"] == "co-op-mart-xa-lo-ha-noi"
+    assert exact["score"] == 1.0
+    
+    fuzzy = index.resolve("Cửa hàng: Circle K Le Loj\nSDT 0909 888 999")
+    assert fuzzy["id"] == "circle-k-le-loi"
+    assert fuzzy["score"] < 1.0
+    
+    assert index.resolve("NHÀ HÀNG PHỐ BIỂN\nĐịa chỉ: 45 Trần Phú") is None
+
+
+def test_corrected_name_is_canonical(index):
+    """Test that a user-corrected spelling becomes the display name"""
+    index.add("Circle K - Le Loi", corrected=True)
+    
+    assert index.lookup("CIRCLE K LÊ LỢI")["name"] == "Circle K - Le Loi"
+
+
+def test_persisted_and_updated_on_save(data_dir):
+    """Test incremental updates through save_receipt and reloading from disk"""
+    adapter = JSONDataAdapter(data_dir)
+    adapter.merchant_index = MerchantIndex(os.path.join(data_dir, "merchant_index.json"))
+    
+    adapter.save_receipt({"id": "r1", "merchant_name": "The Coffee House Nguyen Hue"})
+    adapter.save_receipt({"id": "r2", "merchant_name": "Unknown"})
+    
+    reloaded = MerchantIndex(os.path.join(data_dir, "merchant_index.json"))
+    assert len(reloaded) == 1
+    assert reloaded.lookup("THE COFFEE HOUSE NGUYEN HUE")["name"] == "The Coffee House Nguyen Hue"
+
+
+def test_processor_uses_merchant_index(index):
+    """Test that extract_entities reports the canonical merchant"""
+    processor = ReceiptProcessor(MockOCRAdapter(), merchant_index=index)
+    
+    entities = processor.extract_entities("CO-OP MART Xa Lo Ha Noi\nTotal: 100000 VND")
+    
+    assert entities["merchant_id"] == "co-op-mart-xa-lo-ha-noi"
+    assert entities["merchant_name"] == "Co.op Mart Xa Lộ Hà Nội"
+
+
+def test_header_alias_does_not_override_keyword_merchant(data_dir):
+    """Test that a header alias loses to a keyword match and heuristic names are not learned"""
+    adapter = JSONDataAdapter(data_dir)
+    adapter.merchant_index = MerchantIndex(os.path.join(data_dir, "merchant_index.json"))
+    adapter.save_receipt({"id": "r1", "merchant_name": "HÓA ĐƠN BÁN HÀNG"})
+    processor = ReceiptProcessor(MockOCRAdapter(), merchant_index=adapter.merchant_index)
+    
+    entities = processor.extract_entities("HÓA ĐƠN BÁN HÀNG\nCửa hàng: Phúc Long Coffee\nTotal: 55000 VND")
+    
+    assert entities["merchant_name"] == "Phúc Long Coffee"
+    assert entities["merchant_source"] == "keyword"
+    assert entities["merchant_id"] is None
+    
+    heuristic = processor.extract_entities("GIAO DỊCH BÁN LẺ\nTotal: 55000 VND")
+    assert heuristic["merchant_source"] == "line"
+    adapter.save_receipt({"id": "r2", "merchant_name": heuristic["merchant_name"],
+                          "merchant_source": heuristic["merchant_source"]})
+    
+    assert len(adapter.merchant_index) == 1
+    assert adapter.merchant_index.lookup(heuristic["merchant_name"]) is None
+
+
+def _add_merchants(path, prefix, barrier):
+    index = MerchantIndex(path)
+    barrier.wait()
+    for i in range(50):
+        index.add_receipts([{"merchant_name": f"{prefix} Store Number {i:02d}"}])
+
+
+def test_concurrent_updates_keep_all_aliases(data_dir):
+    """Test that processes saving at the same time do not drop each other's aliases"""
+    import multiprocessing
+    
+    path = os.path.join(data_dir, "merchant_index.json")
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(3)
+    workers = [context.Process(target=_add_merchants, args=(path, prefix, barrier))
+               for prefix in ("Alpha", "Bravo", "Charlie")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    
+    index = MerchantIndex(path)
+    assert all(fold_merchant_name(f"{prefix} Store Number {i:02d}") in index.aliases
+               for prefix in ("Alpha", "Bravo", "Charlie") for i in range(50))
+
+
+def test_updates_are_not_recounted(data_dir):
+    """Test that re-saving a receipt does not count its name again and corrections set the ID"""
+    adapter = JSONDataAdapter(data_dir)
+    adapter.merchant_index = MerchantIndex(os.path.join(data_dir, "merchant_index.json"))
+    receipt = {"id": "r1", "merchant_name": "Highlands Coffee Le Loi"}
+    adapter.save_receipt(receipt)
+    adapter.save_receipt({**receipt, "category": "Ăn uống", "corrected": True})
+    adapter.save_receipts([receipt, {"id": "r2", "merchant_name": "Highlands Coffee Le Loi"}])
+    
+    merchant = adapter.merchant_index.merchants["highlands-coffee-le-loi"]
+    assert merchant["names"] == {"Highlands Coffee Le Loi": 2}
+    assert merchant["corrected_name"] is None
+    
+    merchant_id = adapter.merchant_index.correct("Highlands Coffee - Lê Lợi")
+    
+    assert merchant_id == "highlands-coffee-le-loi"
+    reloaded = MerchantIndex(os.path.join(data_dir, "merchant_index.json"))
+    assert reloaded.lookup("HIGHLANDS COFFEE LE LOI")["name"] == "Highlands Coffee - Lê Lợi"
+
+
+def test_rebuild_ignores_corrections_and_header_guesses(data_dir):
+    """Test that rebuild reads receipts only and skips uncorrected header-line names"""
+    adapter = JSONDataAdapter(data_dir)
+    adapter.save_receipts([
+        {"id": "r1", "merchant_name": "HÓA ĐƠN BÁN HÀNG", "merchant_source": "line"},
+        {"id": "r2", "merchant_name": "Phúc Long Coffee", "merchant_source": "keyword"},
+        {"id": "r3", "merchant_name": "Bách Hóa Xanh", "merchant_source": "line",
+         "merchant_corrected": True}
+    ])
+    adapter.save_correction({"receipt_id": "r1", "original_category": "Khác",
+                             "corrected_category": "Ăn uống", "merchant_name": "HÓA ĐƠN BÁN HÀNG"})
+    
+    index = create_merchant_index(adapter, os.path.join(data_dir, "merchant_index.json"))
+    
+    assert index.lookup("HÓA ĐƠN BÁN HÀNG") is None
+    assert index.merchants["phuc-long-coffee"]["names"] == {"Phúc Long Coffee": 1}
+    assert index.lookup("BACH HOA XANH")["name"] == "Bách Hóa Xanh"
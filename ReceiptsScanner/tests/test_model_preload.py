@@ -0,0 +1,96 @@
+"""
+Tests for classifier preloading and per-child thread pinning
+"""
+import gc
+import multiprocessing
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from workers import model_preload
+
+
+class FakeTensor:
+    def __init__(self):
+        self.requires_grad = True
+    
+    def requires_grad_(self, flag):
+        self.requires_grad = flag
+
+
+class FakeModel:
+    def __init__(self):
+        self.tensors = [FakeTensor(), FakeTensor()]
+        self.training = True
+    
+    def eval(self):
+        self.training = False
+    
+    def parameters(self):
+        return iter(self.tensors[:1])
+    
+    def buffers(self):
+        return iter(self.tensors[1:])
+
+
+def test_threads_per_child(monkeypatch):
+    """Test that pool size divides the cores, with WORKER_THREADS winning"""
+    monkeypatch.setattr(model_preload.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(model_preload, "WORKER_THREADS", 0)
+    
+    assert model_preload.threads_per_child(4) == 2
+    assert model_preload.threads_per_child(16) == 1
+    assert model_preload.threads_per_child(None) == 1
+    
+    monkeypatch.setattr(model_preload, "WORKER_THREADS", 3)
+    assert model_preload.threads_per_child(4) == 3
+
+
+def test_pin_threads(monkeypatch):
+    """Test environment, OpenCV and lazily created ONNX sessions are limited"""
+    cv2 = pytest.importorskip("cv2")
+    encoders = SimpleNamespace(ONNX_NUM_THREADS=0)
+    monkeypatch.setitem(sys.modules, "ml.encoders", encoders)
+    monkeypatch.setattr(model_preload, "WORKER_THREADS", 2)
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        monkeypatch.delenv(name, raising=False)
+    
+    cv2_threads = cv2.getNumThreads()
+    try:
+        model_preload.pin_threads()
+        assert os.environ["OMP_NUM_THREADS"] == "2"
+        assert encoders.ONNX_NUM_THREADS == 2
+        assert cv2.getNumThreads() == 2
+    finally:
+        cv2.setNumThreads(cv2_threads)
+
+
+def _child_classifier_id(queue):
+    queue.put(id(model_preload.get_classifier()))
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_preloaded_classifier_is_inherited(monkeypatch):
+    """Test freezing the model and that forked children reuse the parent's instance"""
+    classifier = SimpleNamespace(encoder=SimpleNamespace(model=FakeModel()))
+    monkeypatch.setattr(model_preload, "_classifier", classifier)
+    
+    try:
+        model_preload.freeze_for_fork(classifier)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+    
+    model = classifier.encoder.model
+    assert not model.training
+    assert not any(tensor.requires_grad for tensor in model.tensors)
+    
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    child = context.Process(target=_child_classifier_id, args=(queue,))
+    child.start()
+    child.join(10)
+    
+    assert queue.get(timeout=5) == id(classifier)
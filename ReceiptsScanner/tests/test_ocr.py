@@ -0,0 +1,496 @@
+"""
+Tests for OCR adapters
+"""
+import pytest
+import numpy as np
+import asyncio
+import os
+import stat
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from ocr_engines.base import OCRAdapter
+from ocr_engines.tesseract_adapter import TesseractOCRAdapter
+from ocr_engines.factory import create_ocr_adapter
+from ocr_engines.strip_adapter import StripOCRAdapter, find_band_cuts
+from ocr_engines.cascade_adapter import CascadeOCRAdapter, entity_coverage
+from ocr_engines.boxes import OCRBoxes, format_boxes
+from prometheus_client import REGISTRY
+from processing.receipt_processor import ReceiptProcessor
+
+
+def make_tsv_data(rows):
+    """Build a pytesseract DICT output from (block, par, line, text, conf) word rows"""
+    data = {key: [] for key in [
+        "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+        "left", "top", "width", "height", "conf", "text"
+    ]}
+    
+    # Page-level row, as emitted by Tesseract
+    for key, value in zip(data.keys(), [1, 1, 0, 0, 0, 0, 0, 0, 100, 100, -1, ""]):
+        data[key].append(value)
+    
+    for i, (block, par, line, text, conf) in enumerate(rows):
+        values = [5, 1, block, par, line, i + 1, 10 * i, 20 * line, 10, 12, conf, text]
+        for key, value in zip(data.keys(), values):
+            data[key].append(value)
+    
+    return data
+
+
+SAMPLE_DATA = make_tsv_data([
+    (1, 1, 1, "SIÊU", 90),
+    (1, 1, 1, "THỊ", 80),
+    (1, 1, 2, "Total:", 70),
+    (1, 1, 2, "352000", 60),
+    (1, 2, 1, "Thank", 50),
+    (1, 2, 1, "you", 40),
+])
+
+
+def test_text_from_data_reading_order():
+    """Test that text is rebuilt line by line with paragraph breaks"""
+    adapter = TesseractOCRAdapter(single_pass=True)
+    
+    text = adapter._text_from_data(SAMPLE_DATA)
+    
+    assert text == "SIÊU THỊ\nTotal: 352000\n\nThank you"
+
+
+def test_mean_confidence_ignores_non_words():
+    """Test that -1 confidence rows are excluded from the average"""
+    adapter = TesseractOCRAdapter(single_pass=True)
+    
+    assert adapter._mean_confidence(SAMPLE_DATA) == pytest.approx(0.65)
+
+
+def test_single_pass_runs_tesseract_once():
+    """Test that single-pass mode only calls image_to_data"""
+    adapter = TesseractOCRAdapter(single_pass=True)
+    image = np.zeros((50, 50), dtype=np.uint8)
+    
+    with patch("pytesseract.image_to_data", return_value=SAMPLE_DATA) as to_data, \
+         patch("pytesseract.image_to_string") as to_string:
+        result = adapter.extract_text(image)
+    
+    assert to_data.call_count == 1
+    assert to_string.call_count == 0
+    assert result["text"].startswith("SIÊU THỊ")
+    assert result["confidence"] == pytest.approx(0.65)
+    assert len(result["boxes"]) == 6
+
+
+def test_create_ocr_adapter():
+    """Test OCR engine selection by name"""
+    adapter = create_ocr_adapter("tesseract")
+    
+    assert isinstance(adapter, TesseractOCRAdapter)
+    
+    with pytest.raises(ValueError):
+        create_ocr_adapter("unknown")
+
+
+def test_receipt_processor_ocr_engine_config():
+    """Test that ReceiptProcessor builds its adapter from configuration"""
+    processor = ReceiptProcessor(ocr_engine="tesseract")
+    
+    assert isinstance(processor.ocr_adapter, TesseractOCRAdapter)
+
+
+def test_tesserocr_adapter_handles_per_thread():
+    """Test that tesserocr handles are reused within a thread"""
+    pytest.importorskip("tesserocr")
+    from ocr_engines.tesserocr_adapter import TesserOCRAdapter
+    import threading
+    
+    adapter = TesserOCRAdapter()
+    try:
+        first = adapter._get_api()
+        assert adapter._get_api() is first
+        
+        other = []
+        thread = threading.Thread(target=lambda: other.append(adapter._get_api()))
+        thread.start()
+        thread.join()
+        
+        assert other[0] is not first
+        assert len(adapter._handles) == 2
+    finally:
+        adapter.close()
+
+
+def test_tesserocr_adapter_clears_after_failure(monkeypatch):
+    """Test that the reused handle drops its image even when recognition fails"""
+    pytest.importorskip("tesserocr")
+    from ocr_engines.tesserocr_adapter import TesserOCRAdapter
+    
+    class FailingAPI:
+        cleared = False
+        
+        def SetImageBytes(self, *args):
+            pass
+        
+        def Recognize(self):
+            raise RuntimeError("recognition failed")
+        
+        def Clear(self):
+            self.cleared = True
+    
+    api = FailingAPI()
+    adapter = TesserOCRAdapter()
+    monkeypatch.setattr(adapter, "_get_api", lambda: api)
+    
+    result = adapter.extract_text(np.zeros((20, 20), dtype=np.uint8))
+    
+    assert result["text"] == ""
+    assert api.cleared
+
+
+class BandOCRAdapter(OCRAdapter):
+    """Fake OCR adapter returning one word box per band"""
+    
+    def extract_text(self, image):
+        return {
+            "text": f"band {image.shape[0]}",
+            "confidence": 0.5 if image.shape[0] > 400 else 1.0,
+            "boxes": [{"text": "band", "x": 0, "y": 5, "width": 10, "height": 10,
+                       "confidence": 0.9}]
+        }
+    
+    def get_config(self):
+        return {"engine": "Band"}
+
+
+def make_tall_receipt(lines=60, line_height=20, gap=10, width=200):
+    """White page with black text-like rows separated by blank gaps"""
+    image = np.full((lines * (line_height + gap), width), 255, dtype=np.uint8)
+    for i in range(lines):
+        top = i * (line_height + gap)
+        image[top:top + line_height, 10:width - 10] = 0
+    return image
+
+
+def test_find_band_cuts_in_whitespace():
+    """Test that band cuts never split a text row"""
+    image = make_tall_receipt()
+    
+    bands = find_band_cuts(image, band_height=300)
+    
+    assert bands[0][0] == 0
+    assert bands[-1][1] == image.shape[0]
+    assert len(bands) > 1
+    for top, _ in bands[1:]:
+        assert image[top].min() == 255
+
+
+def test_strip_adapter_merges_bands():
+    """Test that band results are stitched with page-space y offsets"""
+    image = make_tall_receipt()
+    adapter = StripOCRAdapter(BandOCRAdapter(), workers=3, min_height=500, band_height=300)
+    
+    try:
+        result = adapter.extract_text(image)
+    finally:
+        adapter.close()
+    
+    bands = find_band_cuts(image, 600)
+    assert len(result["boxes"]) == len(bands)
+    assert [box["y"] for box in result["boxes"]] == [top + 5 for top, _ in bands]
+    assert result["text"].count("band") == len(bands)
+    assert 0.5 <= result["confidence"] <= 1.0
+
+
+def test_strip_adapter_skips_short_images():
+    """Test that short images go straight to the wrapped adapter"""
+    adapter = StripOCRAdapter(BandOCRAdapter(), workers=3, min_height=5000)
+    
+    try:
+        result = adapter.extract_text(make_tall_receipt())
+    finally:
+        adapter.close()
+    
+    assert len(result["boxes"]) == 1
+
+
+def test_strip_adapter_closes_wrapped_adapter(monkeypatch):
+    """Test that closing the strip adapter releases the wrapped adapter too"""
+    inner = BandOCRAdapter()
+    closed = []
+    monkeypatch.setattr(inner, "close", lambda: closed.append(True))
+    
+    StripOCRAdapter(inner, workers=2).close()
+    
+    assert closed == [True]
+
+
+class SlowOCRAdapter(OCRAdapter):
+    """Fake OCR adapter that records how many calls run at once"""
+    
+    batch_workers = 2
+    
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+    
+    def extract_text(self, image):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return {"text": str(int(image[0, 0])), "confidence": 1.0, "boxes": []}
+    
+    def get_config(self):
+        return {"engine": "slow"}
+
+
+def test_default_batch_and_async_are_bounded():
+    """Test that default batch/async helpers keep order and bound concurrency"""
+    adapter = SlowOCRAdapter()
+    images = [np.full((5, 5), i, dtype=np.uint8) for i in range(6)]
+    
+    async def run_async():
+        return await asyncio.gather(*(adapter.extract_text_async(image) for image in images))
+    
+    try:
+        batch = adapter.extract_text_batch(images)
+        concurrent = asyncio.run(run_async())
+    finally:
+        adapter.close()
+    
+    assert [r["text"] for r in batch] == [str(i) for i in range(6)]
+    assert [r["text"] for r in concurrent] == [str(i) for i in range(6)]
+    assert adapter.max_active == 2
+
+
+def make_multipage_data(pages):
+    """Concatenate make_tsv_data outputs as pages of one Tesseract run"""
+    data = {key: [] for key in SAMPLE_DATA}
+    for page_num, rows in enumerate(pages, start=1):
+        page = make_tsv_data(rows)
+        page["page_num"] = [page_num] * len(page["page_num"])
+        for key, values in page.items():
+            data[key].extend(values)
+    return data
+
+
+def test_tesseract_batch_uses_one_run_per_chunk():
+    """Test that batch OCR runs Tesseract once per chunk and splits pages"""
+    adapter = TesseractOCRAdapter(single_pass=True)
+    adapter.batch_workers = 1
+    images = [np.zeros((20, 20), dtype=np.uint8) for _ in range(3)]
+    data = make_multipage_data([
+        [(1, 1, 1, "first", 90)],
+        [],
+        [(1, 1, 1, "third", 70), (1, 1, 1, "page", 50)]
+    ])
+    
+    with patch("pytesseract.image_to_data", return_value=data) as to_data:
+        results = adapter.extract_text_batch(images)
+    adapter.close()
+    
+    assert to_data.call_count == 1
+    assert to_data.call_args[0][0].endswith("images.txt")
+    assert [r["text"] for r in results] == ["first", "", "third page"]
+    assert results[2]["confidence"] == pytest.approx(0.6)
+    assert len(results[2]["boxes"]) == 2
+
+
+def test_tesseract_async_subprocess():
+    """Test async OCR against a stand-in tesseract binary printing TSV"""
+    tsv = "\t".join(SAMPLE_DATA.keys()) + "\n" + "\n".join(
+        "\t".join(str(SAMPLE_DATA[key][i]) for key in SAMPLE_DATA)
+        for i in range(len(SAMPLE_DATA["text"]))
+    )
+    temp_dir = tempfile.mkdtemp()
+    command = os.path.join(temp_dir, "tesseract")
+    tsv_path = os.path.join(temp_dir, "out.tsv")
+    with open(tsv_path, "w", encoding="utf-8") as f:
+        f.write(tsv)
+    with open(command, "w") as f:
+        f.write(f"#!/bin/sh\ncat > /dev/null\ncat '{tsv_path}'\n")
+    os.chmod(command, os.stat(command).st_mode | stat.S_IEXEC)
+    
+    adapter = TesseractOCRAdapter(single_pass=True)
+    adapter.tesseract_cmd = command
+    
+    try:
+        result = asyncio.run(adapter.extract_text_async(np.zeros((20, 20), dtype=np.uint8)))
+    finally:
+        os.remove(command)
+        os.remove(tsv_path)
+        os.rmdir(temp_dir)
+    
+    assert result["text"] == "SIÊU THỊ\nTotal: 352000\n\nThank you"
+    assert result["confidence"] == pytest.approx(0.65)
+
+
+class FixedOCRAdapter(OCRAdapter):
+    """Fake OCR adapter returning a fixed result and recording image sizes"""
+    
+    def __init__(self, text, confidence):
+        self.text = text
+        self.confidence = confidence
+        self.shapes = []
+    
+    def extract_text(self, image):
+        self.shapes.append(image.shape)
+        return {
+            "text": self.text,
+            "confidence": self.confidence,
+            "boxes": [{"text": "x", "x": 30, "y": 60, "width": 15, "height": 9, "confidence": 0.9}]
+        }
+    
+    def get_config(self):
+        return {"engine": "fixed", "text": self.text}
+
+
+RECEIPT_TEXT = "SIÊU THỊ CO.OP\nNgày 12/03/2024\nTổng cộng: 125.000 VNĐ"
+
+
+def cascade_count(tier, reason):
+    return REGISTRY.get_sample_value("ocr_cascade_results_total", {"tier": tier, "reason": reason}) or 0.0
+
+
+def test_entity_coverage():
+    """Test that coverage counts the date and total amount"""
+    assert entity_coverage(RECEIPT_TEXT) == 1.0
+    assert entity_coverage("Ngày 12/03/2024") == 0.5
+    assert entity_coverage("garbled t3xt") == 0.0
+    assert entity_coverage("") == 0.0
+
+
+@pytest.mark.parametrize("backend", ["re", "auto"])
+def test_entity_coverage_pathological_text(backend):
+    """Test that a garbage OCR line cannot stall the cascade gate"""
+    from processing.extraction_engine import ExtractionEngine
+    from ocr_engines.cascade_adapter import COVERAGE_GROUPS
+    
+    engine = ExtractionEngine(COVERAGE_GROUPS, backend=backend)
+    text = "Ngày 12/03/2024\n" + "Ab" + "1," * 20000
+    
+    start = time.perf_counter()
+    assert entity_coverage(text, engine) == 0.5
+    assert time.perf_counter() - start < 5
+
+
+@pytest.mark.parametrize("fast_text, fast_confidence, tier, reason", [
+    (RECEIPT_TEXT, 0.9, "fast", "accepted"),
+    (RECEIPT_TEXT, 0.5, "full", "low_confidence"),
+    ("garbled t3xt", 0.9, "full", "low_coverage"),
+])
+def test_cascade_gate(fast_text, fast_confidence, tier, reason):
+    """Test that the full tier only runs when the fast result is not trusted"""
+    fast = FixedOCRAdapter(fast_text, fast_confidence)
+    full = FixedOCRAdapter("full result", 0.8)
+    adapter = CascadeOCRAdapter(fast, full, min_confidence=0.75, min_coverage=0.5, fast_scale=0.5)
+    before = cascade_count(tier, reason)
+    
+    result = adapter.extract_text(np.zeros((200, 100), dtype=np.uint8))
+    
+    assert result["tier"] == tier
+    assert fast.shapes == [(100, 50)]
+    assert len(full.shapes) == (1 if tier == "full" else 0)
+    assert cascade_count(tier, reason) == before + 1
+    
+    if tier == "fast":
+        # Boxes from the downscaled image map back to original coordinates
+        assert result["boxes"][0]["x"] == 60
+        assert result["boxes"][0]["height"] == 18
+    else:
+        assert result["text"] == "full result"
+
+
+def test_create_ocr_adapter_cascade(monkeypatch):
+    """Test that the factory builds a cascade with a single-language fast tier"""
+    monkeypatch.setenv("OCR_CASCADE_FAST_LANG", "vie")
+    monkeypatch.setenv("OCR_CASCADE_FAST_WHITELIST", "0123456789")
+    
+    adapter = create_ocr_adapter("tesseract", strips=False, cascade=True)
+    
+    assert isinstance(adapter, CascadeOCRAdapter)
+    assert adapter.fast_adapter.lang == "vie"
+    assert adapter.fast_adapter.whitelist == "0123456789"
+    assert "tessedit_char_whitelist=0123456789" in adapter.fast_adapter._config_args()
+    assert adapter.full_adapter.lang == os.getenv("TESSERACT_LANG", "eng+vie")
+    assert adapter.full_adapter.whitelist is None
+
+
+def test_columnar_boxes_match_dict_boxes():
+    """Test that columnar boxes hold the same words as the dict format"""
+    data = make_tsv_data([
+        (1, 1, 1, "SIÊU", 91.5), (1, 1, 1, "THỊ", 0.4), (1, 1, 2, "Total:", 88.0),
+        (1, 1, 2, "352000", 76.25),
+    ])
+    dict_adapter = TesseractOCRAdapter(box_format="dicts")
+    columnar_adapter = TesseractOCRAdapter(box_format="columnar")
+    
+    dict_boxes = dict_adapter._extract_boxes(data)
+    boxes = columnar_adapter._extract_boxes(data)
+    
+    assert isinstance(boxes, OCRBoxes)
+    assert boxes.text == ["SIÊU", "Total:", "352000"]
+    assert boxes.to_dicts() == dict_boxes
+    assert boxes[1] == dict_boxes[1]
+    assert boxes[boxes.confidence > 0.8].text == ["SIÊU", "Total:"]
+    
+    with pytest.raises(ValueError):
+        TesseractOCRAdapter(box_format="xml")
+
+
+def test_columnar_boxes_compact_encoding():
+    """Test that the binary encoding roundtrips and is much smaller than JSON dicts"""
+    boxes = OCRBoxes(
+        ["Cà", "phê", "sữa", ""] * 50,
+        np.arange(200) * 7, np.arange(200) * 3, [40] * 200, [20] * 200,
+        [0.9123, 0.5, 1.0, 0.0] * 50
+    )
+    
+    decoded = OCRBoxes.decode(boxes.encode())
+    assert decoded.text == boxes.text
+    assert np.array_equal(decoded.x, boxes.x)
+    assert np.allclose(decoded.confidence, boxes.confidence, atol=1e-4)
+    assert len(boxes.encode()) * 4 < len(str(boxes.to_dicts()))
+    
+    # Coordinates outside uint16 fall back to wide storage
+    wide = boxes.shifted(dx=70000, dy=-5)
+    assert OCRBoxes.from_bytes(wide.to_bytes(compress=False)) == OCRBoxes.from_bytes(wide.to_bytes())
+    assert np.array_equal(OCRBoxes.from_bytes(wide.to_bytes()).y, boxes.y - 5)
+    
+    assert len(OCRBoxes.decode(OCRBoxes().encode())) == 0
+    with pytest.raises(ValueError):
+        OCRBoxes.from_bytes(b"JUNK" + bytes(8))
+
+
+def test_wrappers_keep_columnar_boxes():
+    """Test that strip merging and cascade rescaling work on columnar boxes"""
+    class ColumnarAdapter(FixedOCRAdapter):
+        box_format = "columnar"
+        
+        def extract_text(self, image):
+            result = super().extract_text(image)
+            return dict(result, boxes=format_boxes(result["boxes"], "columnar"))
+    
+    strips = StripOCRAdapter(ColumnarAdapter(RECEIPT_TEXT, 0.9), workers=2,
+                             min_height=10, band_height=10)
+    merged = strips._merge_results([(0, 100), (100, 200)], [
+        strips.ocr_adapter.extract_text(np.zeros((100, 50), dtype=np.uint8)) for _ in range(2)
+    ])
+    assert isinstance(merged["boxes"], OCRBoxes)
+    assert merged["boxes"].y.tolist() == [60, 160]
+    strips.close()
+    
+    cascade = CascadeOCRAdapter(ColumnarAdapter(RECEIPT_TEXT, 0.9), ColumnarAdapter("", 0.0),
+                                min_confidence=0.5, min_coverage=0.5, fast_scale=0.5)
+    result = cascade.extract_text(np.zeros((200, 100), dtype=np.uint8))
+    assert result["tier"] == "fast"
+    assert result["boxes"].x.tolist() == [60]
+    assert result["boxes"].height.tolist() == [18]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,120 @@
+"""
+Tests for the content-addressed OCR result cache
+"""
+import os
+import json
+import tempfile
+import shutil
+
+import pytest
+from prometheus_client import REGISTRY
+
+from data_manager.ocr_cache import (
+    DiskOCRCache, RedisOCRCache, create_ocr_cache, cache_key, settings_fingerprint
+)
+
+
+SAMPLE_RESULT = {
+    "text": "SIÊU THỊ CO.OP\nTỔNG CỘNG 125.000",
+    "confidence": 0.91,
+    "boxes": [{"text": "TỔNG", "confidence": 0.95, "x": 10, "y": 20, "width": 40, "height": 12}],
+    "preprocessing": {"recipe": "median", "scale": 1.2}
+}
+
+
+@pytest.fixture
+def cache_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def cache_count(name: str, backend: str) -> float:
+    return REGISTRY.get_sample_value(name, {"backend": backend}) or 0.0
+
+
+def test_cache_key_depends_on_content_and_settings():
+    """Test that keys change with image bytes and with any setting"""
+    fingerprint = settings_fingerprint({"language": "vie", "psm": 6}, {"denoise_recipe": "auto"})
+    
+    assert cache_key(b"image", fingerprint) == cache_key(memoryview(b"image"), fingerprint)
+    assert cache_key(b"image", fingerprint) != cache_key(b"other", fingerprint)
+    assert fingerprint == settings_fingerprint({"psm": 6, "language": "vie"}, {"denoise_recipe": "auto"})
+    assert fingerprint != settings_fingerprint({"language": "vie", "psm": 4}, {"denoise_recipe": "auto"})
+    assert fingerprint != settings_fingerprint({"language": "vie", "psm": 6}, {"denoise_recipe": "nlm"})
+
+
+def test_disk_cache_roundtrip_and_metrics(cache_dir):
+    """Test that stored results come back and hits/misses are counted"""
+    cache = DiskOCRCache(cache_dir=cache_dir)
+    key = cache_key(b"receipt bytes", "fp")
+    hits = cache_count("ocr_cache_hits_total", "disk")
+    misses = cache_count("ocr_cache_misses_total", "disk")
+    
+    assert cache.get(key) is None
+    assert cache.set(key, SAMPLE_RESULT)
+    assert cache.get(key) == SAMPLE_RESULT
+    
+    assert cache_count("ocr_cache_hits_total", "disk") == hits + 1
+    assert cache_count("ocr_cache_misses_total", "disk") == misses + 1
+    
+    # A new instance (e.g. another worker process) sees the same entries
+    assert DiskOCRCache(cache_dir=cache_dir).get(key) == SAMPLE_RESULT
+
+
+def test_disk_cache_evicts_least_recently_used(cache_dir):
+    """Test that the size limit evicts the least recently read entries"""
+    entry = dict(SAMPLE_RESULT, text="x" * 1000)
+    size = len(json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+    cache = DiskOCRCache(cache_dir=cache_dir, max_bytes=int(3.5 * size))
+    keys = [cache_key(str(i).encode(), "fp") for i in range(3)]
+    
+    for i, key in enumerate(keys):
+        cache.set(key, entry)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get(keys[0]) is not None
+    cache.set(cache_key(b"new", "fp"), entry)
+    
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(cache_key(b"new", "fp")) is not None
+    assert sum(entry_size for _, entry_size, _ in cache._entries()) <= 3.5 * size
+
+
+def test_redis_cache_roundtrip():
+    """Test Redis cache with an in-memory client"""
+    class MemoryRedis:
+        def __init__(self):
+            self.store = {}
+        
+        def get(self, key):
+            return self.store.get(key)
+        
+        def set(self, key, value, ex=None):
+            self.store[key] = value
+    
+    pytest.importorskip("redis")
+    cache = RedisOCRCache(redis_url="redis://localhost:6379/0", ttl=60)
+    cache.client = MemoryRedis()
+    
+    assert cache.get("missing") is None
+    assert cache.set("key", SAMPLE_RESULT)
+    assert cache.get("key") == SAMPLE_RESULT
+    assert "ocr:key" in cache.client.store
+
+
+def test_create_ocr_cache(cache_dir, monkeypatch):
+    """Test backend selection from configuration"""
+    monkeypatch.setenv("OCR_CACHE_DIR", cache_dir)
+    
+    assert isinstance(create_ocr_cache("disk"), DiskOCRCache)
+    assert create_ocr_cache("none") is None
+    
+    with pytest.raises(ValueError):
+        create_ocr_cache("memcached")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
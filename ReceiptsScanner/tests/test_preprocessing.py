@@ -0,0 +1,271 @@
+"""
+Tests for image preprocessing
+"""
+import pytest
+import numpy as np
+import cv2
+import os
+import tempfile
+
+from processing.preprocessing import (
+    preprocess_image, estimate_glyph_height, estimate_scale, resize_to_scale,
+    estimate_image_quality, choose_denoise_recipe, denoise_image,
+    estimate_skew, deskew_image, load_grayscale, choose_decode_reduction,
+    detect_receipt_region, crop_to_region
+)
+
+
+def make_receipt_image(width=800, lines=20, font_scale=1.0, thickness=2):
+    """Render a synthetic receipt with cv2.putText; returns (image, cap height)"""
+    (_, cap_height), _ = cv2.getTextSize("TOTAL", cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    line_step = int(cap_height * 2.2)
+    image = np.full((line_step * (lines + 2), width), 255, dtype=np.uint8)
+    
+    for i in range(lines):
+        y = line_step * (i + 1) + cap_height
+        cv2.putText(image, f"ITEM {i:02d} QTY 2 X 15000 VND", (20, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, 0, thickness)
+    
+    return image, cap_height
+
+
+def test_estimate_glyph_height():
+    """Test glyph height measurement on rendered text"""
+    image, cap_height = make_receipt_image(font_scale=1.0)
+    
+    glyph_height = estimate_glyph_height(image)
+    
+    assert glyph_height is not None
+    assert abs(glyph_height - cap_height) <= cap_height * 0.35
+
+
+def test_estimate_glyph_height_blank_image():
+    """Test that images without text give no estimate"""
+    image = np.full((500, 500), 255, dtype=np.uint8)
+    
+    assert estimate_glyph_height(image) is None
+
+
+def test_estimate_scale_respects_pixel_budget():
+    """Test that the scale never exceeds the pixel budget"""
+    image, _ = make_receipt_image(font_scale=0.5, thickness=1)
+    max_pixels = image.size // 4
+    
+    scale, source = estimate_scale(image, max_pixels=max_pixels)
+    
+    assert source.endswith("budget")
+    assert (image.shape[0] * scale) * (image.shape[1] * scale) <= max_pixels * 1.01
+
+
+def test_estimate_scale_uses_dpi_fallback():
+    """Test DPI metadata fallback when no text is measurable"""
+    image = np.full((400, 400), 255, dtype=np.uint8)
+    
+    scale, source = estimate_scale(image, image_dpi=150, target_dpi=300)
+    
+    assert source == "dpi"
+    assert scale == pytest.approx(2.0)
+
+
+def test_resize_to_scale_tolerance():
+    """Test that near-unity scales skip resampling"""
+    image = np.zeros((100, 200), dtype=np.uint8)
+    
+    assert resize_to_scale(image, 1.05) is image
+    assert resize_to_scale(image, 0.5).shape == (50, 100)
+
+
+def test_preprocess_image_bounded_output():
+    """Test that preprocessing keeps large inputs within the pixel budget"""
+    image, _ = make_receipt_image(width=1600, lines=30, font_scale=3.0, thickness=6)
+    
+    temp_dir = tempfile.mkdtemp()
+    path = os.path.join(temp_dir, "receipt.png")
+    cv2.imwrite(path, image)
+    
+    try:
+        result = preprocess_image(path, max_pixels=500000)
+    finally:
+        os.remove(path)
+        os.rmdir(temp_dir)
+    
+    assert result.ndim == 2
+    assert result.size <= 500000 * 1.01
+
+
+def test_estimate_image_quality_noise():
+    """Test that added Gaussian noise is measured"""
+    image, _ = make_receipt_image()
+    image = (image // 2 + 64).astype(np.uint8)  # Keep noise away from clipping
+    rng = np.random.default_rng(0)
+    noisy = np.clip(image + rng.normal(0, 12, image.shape), 0, 255).astype(np.uint8)
+    
+    clean_quality = estimate_image_quality(image)
+    noisy_quality = estimate_image_quality(noisy)
+    
+    assert clean_quality["noise_sigma"] < 1.0
+    assert 8.0 < noisy_quality["noise_sigma"] < 16.0
+    assert noisy_quality["contrast"] > 0
+
+
+def test_choose_denoise_recipe():
+    """Test recipe selection from quality measurements"""
+    assert choose_denoise_recipe({"relative_noise": 0.5, "blur": 500.0}) == "none"
+    assert choose_denoise_recipe({"relative_noise": 2.0, "blur": 500.0}) == "median"
+    assert choose_denoise_recipe({"relative_noise": 4.0, "blur": 500.0}) == "bilateral"
+    assert choose_denoise_recipe({"relative_noise": 10.0, "blur": 500.0}) == "nlm"
+    assert choose_denoise_recipe({"relative_noise": 10.0, "blur": 10.0}) == "bilateral"
+
+
+def test_denoise_image_unknown_recipe():
+    """Test that unknown recipes are rejected"""
+    with pytest.raises(ValueError):
+        denoise_image(np.zeros((10, 10), dtype=np.uint8), "unknown")
+
+
+def test_preprocess_image_records_recipe():
+    """Test that the chosen recipe is returned with the image"""
+    image, _ = make_receipt_image()
+    
+    temp_dir = tempfile.mkdtemp()
+    path = os.path.join(temp_dir, "receipt.png")
+    cv2.imwrite(path, image)
+    
+    try:
+        result, info = preprocess_image(path, return_info=True)
+        _, forced = preprocess_image(path, recipe="median", return_info=True)
+    finally:
+        os.remove(path)
+        os.rmdir(temp_dir)
+    
+    assert result.ndim == 2
+    assert info["recipe"] == "none"
+    assert forced["recipe"] == "median"
+
+
+@pytest.mark.parametrize("angle", [-7.0, -2.0, 3.0, 10.0])
+def test_estimate_skew_recovers_rotation(angle):
+    """Test that the estimate undoes a known rotation"""
+    image, _ = make_receipt_image()
+    h, w = image.shape
+    M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    rotated = cv2.warpAffine(image, M, (w, h), borderValue=255)
+    
+    estimated, confidence = estimate_skew(rotated)
+    
+    assert estimated == pytest.approx(-angle, abs=0.5)
+    assert confidence >= 0.5
+
+
+def test_deskew_image_skips_unconfident_estimates():
+    """Test that blank and noise images are left unrotated"""
+    blank = np.full((400, 300), 255, dtype=np.uint8)
+    noise = np.random.default_rng(0).integers(0, 256, (400, 300), dtype=np.uint8)
+    
+    assert estimate_skew(blank) == (0.0, 0.0)
+    assert estimate_skew(noise)[1] < 0.5
+    assert deskew_image(noise) is noise
+
+
+def test_preprocess_image_accepts_memory_sources():
+    """Test that paths, bytes, memoryviews and arrays give the same result"""
+    image, _ = make_receipt_image()
+    ok, encoded = cv2.imencode(".png", image)
+    assert ok
+    
+    temp_dir = tempfile.mkdtemp()
+    path = os.path.join(temp_dir, "receipt.png")
+    cv2.imwrite(path, image)
+    
+    try:
+        from_path = preprocess_image(path)
+    finally:
+        os.remove(path)
+        os.rmdir(temp_dir)
+    
+    data = encoded.tobytes()
+    for source in (data, bytearray(data), memoryview(data), encoded.ravel(), image,
+                   cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)):
+        np.testing.assert_array_equal(preprocess_image(source), from_path)
+
+
+def test_load_grayscale_reduced_decode():
+    """Test that large encoded images are decoded at reduced resolution"""
+    image = np.full((800, 600), 255, dtype=np.uint8)
+    _, encoded = cv2.imencode(".jpg", image)
+    
+    gray, _, reduction = load_grayscale(encoded.tobytes(), max_pixels=30000)
+    assert reduction == 4
+    assert gray.shape == (200, 150)
+    
+    gray, _, reduction = load_grayscale(encoded.tobytes(), max_pixels=30000, reduced_decode=False)
+    assert reduction == 1
+    assert gray.shape == (800, 600)
+    
+    assert choose_decode_reduction((600, 800), max_pixels=120000) == 2
+    assert choose_decode_reduction((600, 800), max_pixels=120001) == 1
+    assert choose_decode_reduction(None) == 1
+
+
+def test_preprocess_image_undecodable_bytes():
+    """Test that undecodable input falls back without raising"""
+    result, info = preprocess_image(b"not an image", return_info=True)
+    
+    assert result.shape == (100, 100)
+    assert info["recipe"] == "fallback"
+
+
+def make_receipt_photo():
+    """Receipt pasted onto a dark background with a perspective tilt"""
+    receipt, _ = make_receipt_image(width=400, lines=12, font_scale=0.6, thickness=1)
+    h, w = receipt.shape
+    corners = np.array([[230, 120], [630, 140], [650, 140 + h], [210, 120 + h]], dtype=np.float32)
+    source = np.array([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]], dtype=np.float32)
+    M = cv2.getPerspectiveTransform(source, corners)
+    
+    photo = np.full((h + 260, 860), 60, dtype=np.uint8)
+    warped = cv2.warpPerspective(receipt, M, photo.shape[::-1], borderValue=0)
+    paper = cv2.warpPerspective(np.full_like(receipt, 255), M, photo.shape[::-1]) > 0
+    photo[paper] = warped[paper]
+    return photo, corners, (w, h)
+
+
+def test_detect_receipt_region_quadrilateral():
+    """Test that the receipt quadrilateral is found and warped upright"""
+    photo, corners, (w, h) = make_receipt_photo()
+    
+    found = detect_receipt_region(photo)
+    
+    assert found is not None
+    assert np.abs(found - corners).max() < 8
+    
+    # The warp keeps the longer of opposite edges (the 440px bottom edge)
+    cropped = crop_to_region(photo, found)
+    assert cropped.shape[0] == pytest.approx(h, rel=0.05)
+    assert cropped.shape[1] == pytest.approx(440, rel=0.05)
+    assert cropped.size < photo.size
+
+
+def test_detect_receipt_region_skips_scans():
+    """Test that full-frame white scans and blank images are not cropped"""
+    scan, _ = make_receipt_image()
+    blank = np.zeros((300, 200), dtype=np.uint8)
+    
+    assert detect_receipt_region(scan) is None
+    assert detect_receipt_region(blank) is None
+    assert crop_to_region(scan, None) is scan
+
+
+def test_preprocess_image_reports_crop():
+    """Test that the pixels removed by cropping are reported"""
+    photo, _, _ = make_receipt_photo()
+    
+    _, info = preprocess_image(photo, return_info=True)
+    _, uncropped = preprocess_image(photo, crop=False, return_info=True)
+    
+    assert info["crop_pixels_saved"] > photo.size // 3
+    assert uncropped["crop_pixels_saved"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
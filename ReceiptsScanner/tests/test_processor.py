@@ -3,6 +3,7 @@ Tests for receipt processor and entity extraction
 """
 import pytest
 import numpy as np
+import threading
 from unittest.mock import Mock, MagicMock
 
 from processing.receipt_processor import ReceiptProcessor
@@ -136,5 +137,155 @@ def test_extract_entities_comprehensive():
     assert entities["merchant_name"] != "Unknown"
 
 
+class BandTextOCRAdapter(OCRAdapter):
+    """Fake OCR adapter answering by band: ink value 10 = header, 20 = footer"""
+    
+    def __init__(self):
+        self.release_full = threading.Event()
+    
+    def extract_text(self, image):
+        values = set(np.unique(image)) - {255}
+        if values == {10}:
+            text = "SIÊU THỊ ABC\nDate: 15/10/2024"
+        elif values == {20}:
+            text = "Total: 352000 VND\nThank you!"
+        else:
+            # Full page: only finishes once the partial result was published
+            self.release_full.wait(timeout=5)
+            text = "SIÊU THỊ ABC\nDate: 15/10/2024\nItems\nTotal: 352000 VND"
+        return {"text": text, "confidence": 0.9, "boxes": []}
+    
+    def get_config(self):
+        return {"engine": "BandText"}
+
+
+def make_banded_image():
+    """White page with header, middle and footer text lines separated by gaps"""
+    image = np.full((1000, 200), 255, dtype=np.uint8)
+    for top in range(20, 1000, 50):
+        value = 10 if top < 200 else 20 if top >= 700 else 30
+        image[top:top + 20, 10:190] = value
+    return image
+
+
+def test_extract_text_progressive_publishes_partial():
+    """Test that header/footer entities are published before the full result"""
+    ocr_adapter = BandTextOCRAdapter()
+    processor = ReceiptProcessor(ocr_adapter)
+    partials = []
+    
+    def on_partial(partial):
+        partials.append(partial)
+        ocr_adapter.release_full.set()
+    
+    result = processor.extract_text_progressive(make_banded_image(), on_partial)
+    
+    assert len(partials) == 1
+    assert partials[0]["partial"] is True
+    assert partials[0]["merchant_name"] == "SIÊU THỊ ABC"
+    assert partials[0]["receipt_date"] == "2024-10-15"
+    assert partials[0]["total_amount"] == 352000
+    assert "Items" in result["text"]
+
+
+def test_extract_partial_entities_short_image():
+    """Test that no partial result is produced when bands would overlap"""
+    processor = ReceiptProcessor(BandTextOCRAdapter())
+    
+    assert processor.extract_partial_entities(np.full((40, 100), 255, dtype=np.uint8)) is None
+
+
+def test_extraction_engine_matches_plain_regex():
+    """Test that the keyword-anchored engine finds the same matches as re"""
+    import re
+    from processing.extraction_engine import ExtractionEngine, RECEIPT_PATTERN_GROUPS
+    
+    text = MockOCRAdapter().extract_text(None)["text"] + "\nTỔNG: 99.000 đ\nĐT 0909 888 999"
+    engine = ExtractionEngine()
+    hits = engine.scan(text)
+    
+    for group, (patterns, flags) in RECEIPT_PATTERN_GROUPS.items():
+        expected = [m.span() for p in patterns for m in re.finditer(p, text, flags)]
+        assert [m.span() for m in engine.finditer(group, text, hits)] == expected
+        
+        expected = [m.span() for p in patterns for m in [re.search(p, text, flags)] if m]
+        assert [m.span() for m in engine.search(group, text, hits)] == expected
+
+
+def test_extraction_engine_keyword_prefixes():
+    """Test literal keyword expansion of pattern prefixes"""
+    from processing.extraction_engine import keyword_prefixes
+    
+    assert keyword_prefixes(r'(?:VAT|Tax|Thu[ếe])[:\s]*([0-9,.]+)') == {"vat", "tax", "thuế", "thue"}
+    assert keyword_prefixes(r'\b(0\d{9,10})\b') is None
+
+
+def test_clean_date_formats():
+    """Test date normalization across supported formats"""
+    from processing.patterns import clean_date
+    
+    assert clean_date("15/10/2024") == "2024-10-15"
+    assert clean_date(" 5-3-24 ") == "2024-03-05"
+    assert clean_date("2024/10/15") == "2024-10-15"
+    assert clean_date("10/25/2024") == "2024-10-25"
+    assert clean_date("15 Tháng 10 2024") == "2024-10-15"
+    assert clean_date("29/02/2023") == "29/02/2023"
+    assert clean_date("32/13/2024") == "32/13/2024"
+    assert clean_date("") == ""
+
+
+def test_clean_date_monthfirst():
+    """Test month-first disambiguation with day-first fallback"""
+    from processing.patterns import clean_date
+    
+    assert clean_date("03/04/2024", dayfirst=False) == "2024-03-04"
+    assert clean_date("13/04/2024", dayfirst=False) == "2024-04-13"
+    assert clean_date("03/04/2024") == "2024-04-03"
+
+
+def test_extraction_engine_guards_long_lines():
+    """Test that over-long lines are truncated on the Python re backend"""
+    from processing.extraction_engine import ExtractionEngine, EXTRACTION_MAX_LINE_LENGTH
+    
+    engine = ExtractionEngine(backend="re")
+    text = "Total: 352000 VND\n" + "1." * EXTRACTION_MAX_LINE_LENGTH
+    
+    guarded = engine.guard(text)
+    
+    assert guarded.split("\n")[0] == "Total: 352000 VND"
+    assert len(guarded.split("\n")[1]) == EXTRACTION_MAX_LINE_LENGTH
+    assert engine.guard("Total: 352000 VND") == "Total: 352000 VND"
+
+
+def test_extraction_engine_time_budget():
+    """Test that a pattern stops yielding matches once over its budget"""
+    from prometheus_client import REGISTRY
+    from processing.extraction_engine import ExtractionEngine
+    
+    engine = ExtractionEngine(backend="re", budget_ms=0)
+    before = REGISTRY.get_sample_value(
+        "extraction_pattern_budget_exceeded_total", {"group": "amount", "pattern": "2"}) or 0
+    
+    matches = list(engine.finditer("amount", "1 VND 2 VND 3 VND"))
+    
+    assert len(matches) == 1
+    assert REGISTRY.get_sample_value(
+        "extraction_pattern_budget_exceeded_total", {"group": "amount", "pattern": "2"}) == before + 1
+
+
+def test_extraction_engine_re2_backend():
+    """Test that the RE2 backend matches like Python re"""
+    pytest.importorskip("re2")
+    from processing.extraction_engine import ExtractionEngine, RECEIPT_PATTERN_GROUPS
+    
+    text = MockOCRAdapter().extract_text(None)["text"] + "\nTỔNG: 99.000 đ\nĐT 0909 888 999"
+    python_re, re2 = ExtractionEngine(backend="re"), ExtractionEngine(backend="re2")
+    
+    assert re2.linear
+    for group in RECEIPT_PATTERN_GROUPS:
+        assert [m.groups() for m in re2.finditer(group, text)] == \
+            [m.groups() for m in python_re.finditer(group, text)]
+
+
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])
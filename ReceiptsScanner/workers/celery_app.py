@@ -2,7 +2,7 @@
 Celery application configuration and Prometheus metrics server
 """
 from celery import Celery
-from celery.signals import task_prerun, task_postrun, task_failure
+from celery.signals import task_prerun, task_postrun, task_failure, worker_init, worker_process_init
 import os
 from prometheus_client import start_http_server, Counter, Histogram, Gauge
 from monitoring.logging_config import get_logger
@@ -45,6 +45,21 @@ celery_app.conf.update(
 
 logger.info(f"Celery configured with broker: {CELERY_BROKER_URL}")
 
+# Model sharing across prefork children (see workers.model_preload)
+@worker_init.connect
+def worker_init_handler(sender=None, **kwargs):
+    """Preload the classifier in the parent before the pool forks"""
+    from workers.model_preload import on_worker_init
+    
+    on_worker_init(getattr(sender, "concurrency", None))
+
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs):
+    """Pin per-child thread counts after fork"""
+    from workers.model_preload import pin_threads
+    
+    pin_threads()
+
 # Metrics tracking
 @task_prerun.connect
 def task_prerun_handler(sender=None, task_id=None, task=None, **kwargs):
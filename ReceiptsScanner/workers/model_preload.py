@@ -0,0 +1,154 @@
+"""
+Category model shared by Celery prefork workers
+
+With MODEL_PRELOAD on, the worker's parent process loads the classifier
+(encoder and logistic-regression head) before the pool forks, runs one
+warm-up prediction single-threaded and freezes the garbage collector.
+Children then share the parent's pages copy-on-write instead of holding a
+copy each, and a child recycled after worker_max_tasks_per_child starts
+with the model already loaded.
+
+Each child pins torch/OpenMP to WORKER_THREADS threads (default: cores
+divided by pool concurrency), so concurrency x threads stays within the
+machine.
+
+A model retrained by a child is picked up by new children only after the
+worker restarts; the parent keeps the version it preloaded.
+"""
+import gc
+import os
+import sys
+from itertools import chain
+
+from monitoring.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Load the classifier in the Celery parent before forking the pool
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+
+# torch/OpenMP threads per pool child (0 = cores // concurrency)
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "0"))
+
+_classifier = None
+_concurrency = None
+
+
+def get_classifier():
+    """
+    The process's CategoryClassifier, loaded on first use
+    
+    Returns:
+        CategoryClassifier: Preloaded instance in forked children, else a
+            freshly loaded one
+    """
+    global _classifier
+    if _classifier is None:
+        from ml.category_classifier import CategoryClassifier
+        _classifier = CategoryClassifier()
+    return _classifier
+
+
+def threads_per_child(concurrency: int = None) -> int:
+    """Threads each pool child may use (WORKER_THREADS, else cores // concurrency)"""
+    if WORKER_THREADS > 0:
+        return WORKER_THREADS
+    return max(1, (os.cpu_count() or 1) // max(1, concurrency or os.cpu_count() or 1))
+
+
+def freeze_for_fork(classifier):
+    """
+    Make the loaded model cheap to share with forked children
+    
+    Inference mode without gradients keeps children from writing to the
+    weights, and the GC is frozen so collections in children do not touch
+    every preloaded object's header and copy its page. The weights are not
+    moved to shared memory: fork already shares them copy-on-write, and
+    /dev/shm is only 64 MB in a default container.
+    
+    Args:
+        classifier: Loaded CategoryClassifier
+    """
+    model = getattr(classifier.encoder, "model", None)
+    if model is not None and hasattr(model, "parameters"):
+        model.eval()
+        for tensor in chain(model.parameters(), model.buffers()):
+            tensor.requires_grad_(False)
+    
+    gc.collect()
+    gc.freeze()
+
+
+def preload_classifier(concurrency: int = None):
+    """
+    Load, warm up and freeze the classifier in the Celery parent
+    
+    The ONNX backend is left to the children: ONNX Runtime thread pools do
+    not survive fork, and its int8 model loads quickly.
+    
+    Args:
+        concurrency: Pool size, used for the log message
+    """
+    from ml.encoders import ENCODER_BACKEND
+    if ENCODER_BACKEND == "onnx":
+        logger.info("Model preload skipped for the onnx encoder backend; children load it lazily")
+        return
+    
+    # One thread in the parent: an OpenMP pool started before fork can hang children
+    import torch
+    torch.set_num_threads(1)
+    
+    classifier = get_classifier()
+    classifier.predict_batch(["warm up"])
+    freeze_for_fork(classifier)
+    
+    logger.info(f"Classifier preloaded for {concurrency or 'default'} workers "
+               f"({threads_per_child(concurrency)} threads each)")
+
+
+def on_worker_init(concurrency: int = None):
+    """
+    Celery worker_init hook (parent process, before the pool forks)
+    
+    Args:
+        concurrency: Pool size, remembered for pin_threads in the children
+    """
+    global _concurrency
+    _concurrency = concurrency
+    
+    if MODEL_PRELOAD:
+        preload_classifier(concurrency)
+
+
+def pin_threads(concurrency: int = None):
+    """
+    Limit torch, OpenCV and ONNX Runtime threads in a pool child
+    
+    torch.set_num_threads is what applies to an already loaded torch; the
+    OMP/MKL/OpenBLAS variables are read only by runtimes initialized later
+    in the child and by subprocesses it starts (e.g. the tesseract CLI).
+    
+    Args:
+        concurrency: Pool size (defaults to the value seen by on_worker_init)
+    """
+    threads = threads_per_child(concurrency or _concurrency)
+    # Only for runtimes loaded after this point and for subprocesses
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(threads)
+    
+    # ONNX sessions are created after fork; "all cores" would oversubscribe
+    encoders = sys.modules.get("ml.encoders")
+    if encoders is not None and encoders.ONNX_NUM_THREADS == 0:
+        encoders.ONNX_NUM_THREADS = threads
+    
+    if "cv2" in sys.modules:
+        sys.modules["cv2"].setNumThreads(threads)
+    
+    if "torch" in sys.modules:
+        torch = sys.modules["torch"]
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Already fixed by work done before fork
+            pass
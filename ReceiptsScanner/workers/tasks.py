@@ -8,21 +8,26 @@ import uuid
 import os
 import time
 
-from ocr_engines.tesseract_adapter import TesseractOCRAdapter
-from processing.preprocessing import preprocess_image
+from processing.preprocessing import preprocess_image, preprocessing_settings
 from processing.receipt_processor import ReceiptProcessor
-from ml.category_classifier import CategoryClassifier
 from ml.retrain import retrain_model
 from data_manager.json_adapter import JSONDataAdapter
 from data_manager.s3_adapter import S3DataAdapter
 from data_manager.jobs_adapter import JobsAdapter
+from data_manager.ocr_cache import create_ocr_cache, cache_key, settings_fingerprint
+from data_manager.merchant_index import create_merchant_index
+from workers.model_preload import get_classifier
+from ocr_engines.boxes import OCRBoxes, as_columnar, format_boxes
 from monitoring.logging_config import get_logger
 from monitoring.metrics import (
     receipts_processed_total,
     processing_errors_total,
     ocr_confidence_score,
     classification_confidence_score,
-    celery_task_duration_seconds
+    celery_task_duration_seconds,
+    preprocessing_recipe_total,
+    preprocessing_duration_seconds,
+    preprocessing_crop_pixels_saved
 )
 
 logger = get_logger(__name__)
@@ -36,9 +41,29 @@ else:
     data_adapter = JSONDataAdapter()
 
 jobs_adapter = JobsAdapter()
-ocr_adapter = TesseractOCRAdapter()
-receipt_processor = ReceiptProcessor(ocr_adapter)
-classifier = CategoryClassifier()
+
+# Known merchants: resolved from receipt headers, updated when new receipts are saved
+merchant_index = create_merchant_index(data_adapter)
+data_adapter.merchant_index = merchant_index
+
+receipt_processor = ReceiptProcessor(ocr_engine=os.getenv("OCR_ENGINE", "tesseract"),
+                                     merchant_index=merchant_index)
+ocr_adapter = receipt_processor.ocr_adapter
+
+# Progressive mode publishes a partial result before full-page OCR finishes
+PROGRESSIVE_OCR = os.getenv("OCR_PROGRESSIVE", "false").lower() == "true"
+
+# OCR results are cached by image content and preprocessing/OCR settings
+ocr_cache = create_ocr_cache()
+_ocr_fingerprint = None
+
+
+def get_ocr_fingerprint() -> str:
+    """OCR cache settings fingerprint, computed on first use (get_config may run tesseract --version)"""
+    global _ocr_fingerprint
+    if _ocr_fingerprint is None:
+        _ocr_fingerprint = settings_fingerprint(ocr_adapter.get_config(), preprocessing_settings())
+    return _ocr_fingerprint
 
 # Custom task base class for better tracking
 class CallbackTask(Task):
@@ -47,11 +72,13 @@ class CallbackTask(Task):
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         """Called when task fails"""
         logger.error(f"Task {task_id} failed: {str(exc)}")
+        # Drop a partial result published by progressive OCR before the failure
         jobs_adapter.update_job(
             job_id=task_id,
             status="failed",
             error=str(exc),
-            completed_at=datetime.now().isoformat()
+            completed_at=datetime.now().isoformat(),
+            clear_result=True
         )
     
     def on_success(self, retval, task_id, args, kwargs):
@@ -85,13 +112,52 @@ def process_receipt_task(self, image_path: str, original_filename: str):
         # Update job status
         jobs_adapter.update_job(task_id, status="processing")
         
-        # Step 1: Preprocess image
-        logger.info("Step 1: Preprocessing image")
-        preprocessed_image = preprocess_image(image_path)
+        with open(image_path, "rb") as f:
+            image_bytes = f.read()
+        
+        # Re-uploads of the same photo reuse the cached OCR result
+        key = cache_key(image_bytes, get_ocr_fingerprint()) if ocr_cache else None
+        cached = ocr_cache.get(key) if ocr_cache else None
+        
+        if cached:
+            logger.info("Steps 1-2: Using cached OCR result")
+            ocr_result = dict(cached, boxes=format_boxes(
+                OCRBoxes.decode(cached["boxes"]), ocr_adapter.box_format
+            ))
+            preprocessing_info = cached.get("preprocessing", {})
+        else:
+            # Step 1: Preprocess image
+            logger.info("Step 1: Preprocessing image")
+            preprocess_start = time.time()
+            preprocessed_image, preprocessing_info = preprocess_image(image_bytes, return_info=True)
+            
+            recipe = preprocessing_info["recipe"]
+            preprocessing_recipe_total.labels(recipe=recipe).inc()
+            preprocessing_duration_seconds.labels(recipe=recipe).observe(time.time() - preprocess_start)
+            preprocessing_crop_pixels_saved.observe(preprocessing_info.get("crop_pixels_saved", 0))
+            
+            # Step 2: OCR extraction
+            logger.info("Step 2: OCR extraction")
+            if PROGRESSIVE_OCR:
+                # Publish merchant/date/total from the header and bottom bands
+                # early; the final result overwrites it on completion
+                ocr_result = receipt_processor.extract_text_progressive(
+                    preprocessed_image,
+                    on_partial=lambda partial: jobs_adapter.update_job(task_id, result=partial)
+                )
+            else:
+                ocr_result = receipt_processor.extract_text(preprocessed_image)
+            
+            if ocr_cache and ocr_result.get("text"):
+                ocr_cache.set(key, {
+                    "text": ocr_result["text"],
+                    "confidence": ocr_result.get("confidence", 0),
+                    # Columnar binary encoding keeps entries several times smaller
+                    "boxes": as_columnar(ocr_result.get("boxes")).encode(),
+                    "tier": ocr_result.get("tier"),
+                    "preprocessing": preprocessing_info
+                })
         
-        # Step 2: OCR extraction
-        logger.info("Step 2: OCR extraction")
-        ocr_result = receipt_processor.extract_text(preprocessed_image)
         raw_text = ocr_result.get("text", "")
         ocr_confidence = ocr_result.get("confidence", 0)
         
@@ -103,11 +169,11 @@ def process_receipt_task(self, image_path: str, original_filename: str):
         
         # Step 3: Entity extraction
         logger.info("Step 3: Entity extraction")
-        entities = receipt_processor.extract_entities(raw_text)
+        entities = receipt_processor.extract_entities(raw_text, boxes=ocr_result.get("boxes"))
         
         # Step 4: Category classification
         logger.info("Step 4: Category classification")
-        classification_result = classifier.predict(raw_text, entities)
+        classification_result = get_classifier().predict(raw_text, entities)
         
         category = classification_result["category"]
         classification_conf = classification_result["confidence"]
@@ -124,6 +190,8 @@ def process_receipt_task(self, image_path: str, original_filename: str):
         receipt_data = {
             "id": receipt_id,
             "merchant_name": entities.get("merchant_name"),
+            "merchant_id": entities.get("merchant_id"),
+            "merchant_source": entities.get("merchant_source"),
             "receipt_date": entities.get("receipt_date"),
             "total_amount": entities.get("total_amount"),
             "category": category,
@@ -132,6 +200,8 @@ def process_receipt_task(self, image_path: str, original_filename: str):
             "raw_text": raw_text,
             "image_path": image_url,
             "ocr_confidence": ocr_confidence,
+            "ocr_tier": ocr_result.get("tier"),
+            "preprocessing": preprocessing_info,
             "processed_at": datetime.now().isoformat(),
             "corrected": False
         }